@@ -1,19 +1,54 @@
 __author__ = 'ZhangJingtian'
 import ty
 import il
+import types
 import sym
 import lexer
 import errors
+import context
+
+def lower(task):
+    """ Lower to Inter Language
+
+    Drives the code generation of a node with an explicit stack instead of
+    Python recursion. The gen, reduce and jumping methods of the nodes with
+    children are generators: each yields the call on a child and is sent
+    back that call's result, while the leaves return their result directly.
+
+    Arguments:
+        task: The result of a gen, reduce or jumping call.
+    """
+    if type(task) is not types.GeneratorType:
+        return task
+    stack = []
+    value = None
+    while True:
+        try:
+            sub = task.send(value)
+        except StopIteration as e:
+            if not stack:
+                return e.value
+            task = stack.pop()
+            value = e.value
+            continue
+        if type(sub) is types.GeneratorType:
+            stack.append(task)
+            task = sub
+            value = None
+        else:
+            value = sub
 
 class Node(object):
     """ Node class
 
-    The top class of ast node.
+    The top class of ast node. The code generation methods of the nodes are
+    run through lower().
 
     """
+    __slots__ = ('lexline',)
     def __init__(self):
         super(Node, self).__init__()
-        self.lexline = lexer.Lexer.line
+        self.lexline = context.current().line
 
     def _type_error(self, expected, encountered):
         """ Print Type Error Message
@@ -25,6 +60,7 @@ class Node(object):
             encountered : A string containing the type encountered.
         """
         msg = 'Expected %s type, encounted %s' % (expected, encountered)
+        context.current().error(errors.Diagnostic.TYPE, msg, self.lexline)
         print('Error: "%s", line %d' % (msg, self.lexline))
         return
 
@@ -40,18 +76,33 @@ class Node(object):
         frame.emit_label(label)
         return
 
-    def emit(self, code, frame):
+    def emit(self, op, frame, oper=None, arg1=None, arg2=None, arg3=None):
         """Emit the code
 
         Emits the IL code to frame.
 
         Arguments:
-            code: A three address code.
-            ar: The function table.
+            op: The opcode of the three address code.
+            frame: The function frame.
+            oper: The operator token.
+            arg1, arg2, arg3: The operand nodes.
         """
-        frame.emit_code(code)
+        frame.emit_code(op, oper, arg1, arg2, arg3)
+
+    def emit_jump(self, op, label, frame, oper=None, arg1=None, arg2=None):
+        """Emit the jump
+
+        Emits a goto, or a conditional jump on arg1 oper arg2, to frame.
+
+        Arguments:
+            op: The opcode of the jump.
+            label: The label jumped to.
+            frame: The function frame.
+        """
+        frame.emit_jump(op, label, oper, arg1, arg2)
 
 class Expression(Node):
+    __slots__ = ('_op', '_type')
     def __init__(self, token, expr_type):
         super(Expression, self).__init__()
         self._op    = token
@@ -82,25 +133,43 @@ class Expression(Node):
         """ Generate Expression's Jumping Code
 
         Arguments:
-            true_label: The true branch.
-            false_label: The false branch.
+            true_label: The true branch, None to fall through.
+            false_label: The false branch, None to fall through.
         """
-        const = Constant(lexer.Num(0), ty.Type.Int)
-        self.emitjumps(Rel(lexer.Token('>'), self.reduce(frame), const), true_label, false_label, frame)
+        const = Constant.of_int(0)
+        expr = yield self.reduce(frame)
+        self.emitjumps(lexer.Token.GT, expr, const, true_label, false_label, frame)
 
-    def emitjumps(self, con, t, f, frame):
+    def emitjumps(self, oper, expr1, expr2, t, f, frame):
         """ Emit Jumping Code
 
-        Emit the jumping code to three address code table.
+        Emit the jumping code on the relation expr1 oper expr2 to three
+        address code table.
 
         """
-        if t != 0 and f != 0:
-            self.emit(il.IfTrue(con, t), frame)
-            self.emit(il.Goto(f), frame)
-        elif t != 0:
-            self.emit(il.IfTrue(con, t), frame)
-        elif f != 0:
-            self.emit(il.IfFalse(con, f), frame)
+        if t is not None and f is not None:
+            self.emit_jump(il.Tacode.IFTRUE, t, frame, oper, expr1, expr2)
+            self.emit_jump(il.Tacode.GOTO, f, frame)
+        elif t is not None:
+            self.emit_jump(il.Tacode.IFTRUE, t, frame, oper, expr1, expr2)
+        elif f is not None:
+            self.emit_jump(il.Tacode.IFFALSE, f, frame, oper, expr1, expr2)
+
+    def emit_value(self, dst, frame):
+        """ Emit Value
+
+        Emits the code storing the value of the reduced node into dst.
+
+        """
+        self.emit(il.Tacode.ASSIGN, frame, arg1=self, arg3=dst)
+
+    def emit_store(self, src, frame):
+        """ Emit Store
+
+        Emits the code storing src into the location the node stands for.
+
+        """
+        self.emit(il.Tacode.ASSIGN, frame, arg1=src, arg3=self)
 
     def get_type(self):
         return self._type
@@ -114,9 +183,18 @@ class Symbol(Expression):
     The base class of symbols that have to been stored in identifier table.
 
     """
+    __slots__ = ('_offset',)
     def __init__(self, token, sym_type):
         super(Symbol, self).__init__(token, sym_type)
 
+    def get_word(self):
+        """Get Word
+
+        Gets the interned word naming the symbol.
+
+        """
+        return self._op
+
     def get_offset(self):
         """Get Offset
 
@@ -134,6 +212,7 @@ class Identifier(Symbol):
     Represent the identifier declared in program scope.
 
     """
+    __slots__ = ()
     def __init__(self, token, id_type):
         super(Identifier, self).__init__(token, id_type)
 
@@ -143,18 +222,40 @@ class Constant(Symbol):
     Represent the constant used in the program scope.
 
     """
+    __slots__ = ()
     def __init__(self, token, id_type):
         super(Constant, self).__init__(token, id_type)
 
+    @classmethod
+    def of_int(cls, value):
+        """Integer Constant
+
+        Returns the int constant of the value. Constants are leaves that are
+        never changed, so one node per value is shared by every use.
+
+        """
+        const = Constant.Ints.get(value)
+        if const is None:
+            const = Constant.Ints.setdefault(value, Constant(lexer.Num(value), ty.Type.Int))
+        return const
+
+    def get_value(self):
+        return self._op.value
+
 class Temporary(Symbol):
     """ Temporary class
 
     Represent the temporary generated through the parses.
 
     """
+    __slots__ = ('_num',)
     def __init__(self, num, temp_type):
         super(Temporary, self).__init__(lexer.Word.TEMP, temp_type)
         self._num = num
+
+    def get_num(self):
+        return self._num
+
     def __str__(self):
         return "t" + str(self._num)
 
@@ -164,31 +265,35 @@ class Funcall(Expression):
     Represent the function call node.
 
     """
+    __slots__ = ('_id_expr', '_args')
     def __init__(self, id_expr, args):
-        super(Funcall, self).__init__(lexer.Word("call", lexer.Tag.FUNCTION), None)
+        super(Funcall, self).__init__(lexer.Word.CALL, None)
         self._id_expr = id_expr
         self._args  = args
         self._type  = self.check(id_expr.get_type())
 
     def check(self, t):
+        if t is ty.Type.Error:
+            return t
         ret = t
         if type(t) is ty.Pointer:
             ret = t.get_ref_type()
         if type(ret) is ty.Function:
             return ret.get_ret_type()
         self._type_error("pointer or function", str(t))
+        return ty.Type.Error
 
     def reduce(self, frame):
-        func_call = self.gen(frame)
+        func_call = yield self.gen(frame)
         for arg in func_call.get_args():
-            self.emit(il.Param(param=arg), frame)
+            self.emit(il.Tacode.PARAM, frame, arg1=arg)
         args_count = len(func_call.get_args())
-        const = Constant(lexer.Num(args_count), ty.Type.Int)
-        self.emit(il.Call(call=func_call.get_id_expr(), n=const), frame)
+        const = Constant.of_int(args_count)
+        self.emit(il.Tacode.CALL, frame, arg1=func_call.get_id_expr(), arg2=const)
         if func_call.get_type() is ty.Type.Void:
             return None
         temp = frame.alloc_temp(func_call.get_type())
-        self.emit(il.LoadRet(temp), frame)
+        self.emit(il.Tacode.LDRET, frame, arg3=temp)
         return temp
 
     def get_args(self):
@@ -200,9 +305,10 @@ class Funcall(Expression):
     def gen(self, frame):
         args = []
         for arg in self._args:
-            t = arg.reduce(frame)
+            t = yield arg.reduce(frame)
             args.append(t)
-        return Funcall(self.get_id_expr().reduce(frame), args)
+        id_expr = yield self.get_id_expr().reduce(frame)
+        return Funcall(id_expr, args)
 
 class Operation(Expression):
     """ Operation class
@@ -210,6 +316,7 @@ class Operation(Expression):
     The base class of operations.
 
     """
+    __slots__ = ()
     def __init__(self, token, op_type):
         super(Operation, self).__init__(token, op_type)
 
@@ -217,9 +324,9 @@ class Operation(Expression):
         return str(self._op)
 
     def reduce(self, frame):
-        op   = self.gen(frame)
-        temp = frame.alloc_temp(op.get_type())
-        self.emit(il.Assign(temp, op), frame)
+        op   = yield self.gen(frame)
+        temp = frame.alloc_temp(self.get_type())
+        op.emit_value(temp, frame)
         return temp
 
 class Binary(Operation):
@@ -228,6 +335,7 @@ class Binary(Operation):
     Represent binary operations.
 
     """
+    __slots__ = ('_expr1', '_expr2')
     def __init__(self, token, expr1, expr2):
         super(Binary, self).__init__(token, None)
         self._expr1  = expr1
@@ -235,9 +343,15 @@ class Binary(Operation):
         self._type   = ty.Type.max(expr1.get_type(), expr2.get_type())
         if self._type is None:
             self._type_error('numeric', str(expr1.get_type()))
+            self._type = ty.Type.Error
 
     def gen(self, frame):
-        return Binary(self._op, self._expr1.reduce(frame), self._expr2.reduce(frame))
+        expr1 = yield self._expr1.reduce(frame)
+        expr2 = yield self._expr2.reduce(frame)
+        return Binary(self._op, expr1, expr2)
+
+    def emit_value(self, dst, frame):
+        self.emit(il.Tacode.BINARY, frame, self._op, self._expr1, self._expr2, dst)
 
     def __str__(self):
         return str(self._expr1) + " " + str(self._op) + " " + str(self._expr2)
@@ -248,18 +362,31 @@ class Unary(Operation):
     Represent unary operations.
 
     """
+    __slots__ = ('_expr',)
     def __init__(self, token, expr):
         super(Unary, self).__init__(token, None)
         self._expr = expr
+        expr_type = expr.get_type()
         if token.tag == '&':
-            self.type = ty.Type.UnsignedInt
+            self._type = ty.Type.UnsignedInt
         elif token.tag == '-':
-            self.type = ty.Type.Int
+            self._type = ty.Type.Int
+        elif type(expr_type) is ty.Pointer:
+            self._type = expr_type.get_ref_type()
         else:
-            self.type = self._expr.get_type().get_ref_type()
+            if expr_type is not ty.Type.Error:
+                self._type_error('pointer', str(expr_type))
+            self._type = ty.Type.Error
 
     def gen(self, frame):
-        return Unary(self._op, self._expr.reduce(frame))
+        expr = yield self._expr.reduce(frame)
+        return Unary(self._op, expr)
+
+    def emit_value(self, dst, frame):
+        self.emit(il.Tacode.UNARY, frame, self._op, self._expr, arg3=dst)
+
+    def emit_store(self, src, frame):
+        self.emit(il.Tacode.STOREPTR, frame, self._op, self._expr, arg3=src)
 
     def __str__(self):
         return str(self._op) + str(self._expr)
@@ -268,16 +395,22 @@ class Cast(Operation):
     """ Cast class
 
     """
+    __slots__ = ('_expr',)
     def __init__(self, expr, ty):
-        super(Operation, self).__init__(lexer.Word("cast to", lexer.Tag.CAST), ty)
+        super(Operation, self).__init__(lexer.Word.CAST, ty)
         self._expr = expr
 
+    def gen(self, frame):
+        expr = yield self._expr.reduce(frame)
+        return expr
+
 class Access(Operation):
     """ Access class
 
     Represent the array, pointer and struct access.
 
     """
+    __slots__ = ('_access_id', '_offset')
     def __init__(self, token, id_type, access_id, offset):
         super(Access, self).__init__(token, id_type)
         self._access_id = access_id
@@ -295,7 +428,15 @@ class Access(Operation):
         return self._access_id
 
     def gen(self, frame):
-        return Access(self._op, self.get_type(), self.get_access_id().reduce(frame), self.get_offset().reduce(frame))
+        access_id = yield self.get_access_id().reduce(frame)
+        offset = yield self.get_offset().reduce(frame)
+        return Access(self._op, self.get_type(), access_id, offset)
+
+    def emit_value(self, dst, frame):
+        self.emit(il.Tacode.LOAD, frame, self._op, self._access_id, self._offset, dst)
+
+    def emit_store(self, src, frame):
+        self.emit(il.Tacode.STORE, frame, self._op, self._access_id, self._offset, src)
 
     def __str__(self):
         return str(self._access_id) + " offset " + str(self._offset)
@@ -306,6 +447,7 @@ class Logical(Expression):
     The base class of logical operations.
 
     """
+    __slots__ = ('_expr1', '_expr2')
     def __init__(self, token, expr1, expr2):
         super(Logical, self).__init__(token ,None)
         self._expr1 = expr1
@@ -316,21 +458,25 @@ class Logical(Expression):
         if ty.Type.numeric(ty1) and ty.Type.numeric(ty2):
             return ty.Type.Int
         self._type_error('numeric', str(ty1))
+        return ty.Type.Error
 
     def gen(self, frame):
         f = frame.new_label()
         t = frame.new_label()
         temp = frame.alloc_temp(ty.Type.Int)
-        self.jumping(0, f, frame)
-        const = Constant(lexer.Num(1), ty.Type.Int)
-        self.emit(il.Assign(temp, const), frame)
-        self.emit(il.Goto(t), frame)
+        yield self.jumping(None, f, frame)
+        const = Constant.of_int(1)
+        self.emit(il.Tacode.ASSIGN, frame, arg1=const, arg3=temp)
+        self.emit_jump(il.Tacode.GOTO, t, frame)
         self.emit_label(f, frame)
-        const = Constant(lexer.Num(0), ty.Type.Int)
-        self.emit(il.Assign(temp, const), frame)
+        const = Constant.of_int(0)
+        self.emit(il.Tacode.ASSIGN, frame, arg1=const, arg3=temp)
         self.emit_label(t, frame)
         return temp
 
+    def reduce(self, frame):
+        return self.gen(frame)
+
     def __str__(self):
         return str(self._expr1) + " " + str(self._op) + " " + str(self._expr2)
 
@@ -341,16 +487,17 @@ class And(Logical):
     Represent the '&&' operation
 
     """
+    __slots__ = ()
     def __init__(self, token, expr1, expr2):
         super(And, self).__init__(token, expr1, expr2)
 
     def jumping(self, t, f, frame):
         label = f
-        if label == 0:
+        if label is None:
             label = frame.new_label()
-        self._expr1.jumping(0, label, frame)
-        self._expr2.jumping(t, f, frame)
-        if f == 0:
+        yield self._expr1.jumping(None, label, frame)
+        yield self._expr2.jumping(t, f, frame)
+        if f is None:
             self.emit_label(label, frame)
 
 class Or(Logical):
@@ -359,17 +506,18 @@ class Or(Logical):
     Represent the '||' operation
 
     """
+    __slots__ = ()
 
     def __init__(self, token, expr1, expr2):
         super(Or, self).__init__(token, expr1, expr2)
 
     def jumping(self, t, f, frame):
         label = t
-        if label == 0:
+        if label is None:
             label = frame.new_label()
-        self._expr1.jumping(label, 0, frame)
-        self._expr2.jumping(t, f, frame)
-        if t != 0:
+        yield self._expr1.jumping(label, None, frame)
+        yield self._expr2.jumping(t, f, frame)
+        if t is None:
             self.emit_label(label, frame)
 
 class Rel(Logical):
@@ -378,14 +526,15 @@ class Rel(Logical):
     The base class of relative operations.
 
     """
+    __slots__ = ()
 
     def __init__(self, token ,expr1, expr2):
         super(Rel, self).__init__(token, expr1, expr2)
 
     def jumping(self, t, f, frame):
-        t1 = self._expr1.reduce(frame)
-        t2 = self._expr2.reduce(frame)
-        self.emitjumps(Rel(self._op, t1, t2), t, f, frame)
+        t1 = yield self._expr1.reduce(frame)
+        t2 = yield self._expr2.reduce(frame)
+        self.emitjumps(self._op, t1, t2, t, f, frame)
 
 class Statement(Node):
     """ Statement class
@@ -393,6 +542,7 @@ class Statement(Node):
     The base class of statements.
 
     """
+    __slots__ = ('_after', '_expr')
     def __init__(self, expr=None):
         super(Statement, self).__init__()
         self._after = None
@@ -408,11 +558,12 @@ class Eval(Statement):
     Represent the expression statement.
 
     """
+    __slots__ = ()
     def __init__(self, expr):
-        super(Statement, self).__init__(expr)
+        super(Eval, self).__init__(expr)
 
     def gen(self, t, f, frame):
-        self._expr.reduce(frame)
+        yield self._expr.reduce(frame)
 
 class If(Statement):
     """ If class
@@ -420,6 +571,7 @@ class If(Statement):
     Represent the if statement.
 
     """
+    __slots__ = ('_stmt',)
     def __init__(self, expr, stmt):
         super(If, self).__init__()
         self._expr = expr
@@ -428,9 +580,9 @@ class If(Statement):
 
     def gen(self, t, f, frame):
         label = frame.new_label()
-        self._expr.jumping(0, f, frame)
+        yield self._expr.jumping(None, f, frame)
         self.emit_label(label, frame)
-        self._stmt.gen(label, f, frame)
+        yield self._stmt.gen(label, f, frame)
 
     def check(self):
         if not ty.Type.numeric(self._expr.get_type()):
@@ -442,6 +594,7 @@ class Else(Statement):
     Represent the if-else statement.
 
     """
+    __slots__ = ('_stmt1', '_stmt2')
 
     def __init__(self, expr, stmt1, stmt2):
         super(Else, self).__init__()
@@ -453,12 +606,12 @@ class Else(Statement):
     def gen(self, t, f, frame):
         label1 = frame.new_label()
         label2 = frame.new_label()
-        self._expr.jumping(0, label2, frame)
+        yield self._expr.jumping(None, label2, frame)
         self.emit_label(label1, frame)
-        self._stmt1.gen(label1, f, frame)
-        self.emit(il.Goto(f), frame)
+        yield self._stmt1.gen(label1, f, frame)
+        self.emit_jump(il.Tacode.GOTO, f, frame)
         self.emit_label(label2, frame)
-        self._stmt2.gen(label2, f, frame)
+        yield self._stmt2.gen(label2, f, frame)
 
     def check(self):
         if not ty.Type.numeric(self._expr.get_type()):
@@ -470,6 +623,7 @@ class While(Statement):
     Represent the while statement.
 
     """
+    __slots__ = ('_stmt', '_next')
     def __init__(self):
         super(While, self).__init__()
         self._expr = None
@@ -482,11 +636,12 @@ class While(Statement):
 
     def gen(self, t, f, frame):
         self._after = f
-        self._expr.jumping(0, f, frame)
+        self._next  = t
+        yield self._expr.jumping(None, f, frame)
         label = frame.new_label()
         self.emit_label(label, frame)
-        self._stmt.gen(label, f, frame)
-        self.emit(il.Goto(t), frame)
+        yield self._stmt.gen(label, t, frame)
+        self.emit_jump(il.Tacode.GOTO, t, frame)
 
     def check(self):
         if not ty.Type.numeric(self._expr.get_type()):
@@ -498,6 +653,7 @@ class Do(Statement):
     Represent the do-whild statement.
 
     """
+    __slots__ = ('_stmt', '_next')
     def __init__(self):
         super(Do, self).__init__()
         self._expr = None
@@ -510,12 +666,13 @@ class Do(Statement):
     def gen(self, t, f, frame):
         self._after = f
         label = frame.new_label()
-        self._stmt.gen(t, label)
+        self._next  = label
+        yield self._stmt.gen(t, label, frame)
         self.emit_label(label, frame)
-        self._expr.jumping(t, 0, frame)
+        yield self._expr.jumping(t, None, frame)
 
     def check(self):
-        if ty.Type.numeric(self._expr.get_type()):
+        if not ty.Type.numeric(self._expr.get_type()):
             self._type_error('numeric', str(self._expr.get_type()))
 
 class Set(Statement):
@@ -524,6 +681,7 @@ class Set(Statement):
     Represent the assign statment.
 
     """
+    __slots__ = ('_unary',)
     def __init__(self, unary, expr):
         super(Set, self).__init__()
         self._unary  = unary
@@ -535,36 +693,39 @@ class Set(Statement):
             self._type_error('numeric', str(self._unary.get_type()))
 
     def gen(self, t, f, frame):
-        l = self._unary.gen(frame)
-        r = self._expr.reduce(frame)
-        self.emit(il.Assign(l, r), frame)
+        l = yield self._unary.gen(frame)
+        r = yield self._expr.reduce(frame)
+        l.emit_store(r, frame)
 
 class Break(Statement):
-    def __init__(self):
+    __slots__ = ('_stmt',)
+    def __init__(self, enclosing):
         super(Break, self).__init__()
-        self._stmt = Statement.Enclosing
+        self._stmt = enclosing
 
     def gen(self, t, f, ar):
-        self.emit(il.Goto(self._stmt.after), ar)
+        self.emit_jump(il.Tacode.GOTO, self._stmt._after, ar)
 
 class Continue(Statement):
-    def __init__(self):
+    __slots__ = ('_stmt',)
+    def __init__(self, enclosing):
         super(Continue, self).__init__()
-        self._stmt = Statement.Enclosing
+        self._stmt = enclosing
 
     def gen(self, t, f, ar):
-        self.emit(il.Goto(self._stmt._after), ar)
+        self.emit_jump(il.Tacode.GOTO, self._stmt._next, ar)
 
 class Return(Statement):
+    __slots__ = ('_ret',)
     def __init__(self, ret=None):
         super(Return, self).__init__()
         self._ret = ret
 
     def gen(self, t, f, frame):
         if self._ret is not None:
-            ret = self._ret.reduce(frame)
-            self.emit(il.StoreRet(ret), frame)
-        self.emit(il.Goto(frame.get_frame_end()), frame)
+            ret = yield self._ret.reduce(frame)
+            self.emit(il.Tacode.STRET, frame, arg1=ret)
+        self.emit_jump(il.Tacode.GOTO, frame.get_frame_end(), frame)
 
 class Sequence(Statement):
     """ Sequence class
@@ -572,6 +733,7 @@ class Sequence(Statement):
     Chains the statement list into a tree form.
 
     """
+    __slots__ = ('_stmt1', '_stmt2')
     def __init__(self, stmt1, stmt2):
         super(Sequence, self).__init__()
         self._stmt1 = stmt1
@@ -579,14 +741,43 @@ class Sequence(Statement):
 
     def gen(self, t, f, frame):
         if self._stmt1 is Statement.Null:
-            self._stmt2.gen(t, f, frame)
+            yield self._stmt2.gen(t, f, frame)
         elif self._stmt2 is Statement.Null:
-            self._stmt1.gen(t, f, frame)
+            yield self._stmt1.gen(t, f, frame)
         else:
             label = frame.new_label()
-            self._stmt1.gen(t, label, frame)
+            yield self._stmt1.gen(t, label, frame)
             self.emit_label(label, frame)
-            self._stmt2.gen(label, f, frame)
+            yield self._stmt2.gen(label, f, frame)
+
+class Block(Statement):
+    """ Block class
+
+    Holds a statement list flat. It generates the same code as the right
+    leaning chain of Sequence nodes for the list, with a loop instead of a
+    recursion per statement.
+
+    """
+    __slots__ = ('_stmts',)
+    def __init__(self, stmts):
+        super(Block, self).__init__()
+        self._stmts = stmts
+
+    def get_statements(self):
+        return self._stmts
+
+    def gen(self, t, f, frame):
+        last = len(self._stmts) - 1
+        for i, stmt in enumerate(self._stmts):
+            if stmt is Statement.Null:
+                continue
+            if i == last:
+                yield stmt.gen(t, f, frame)
+            else:
+                label = frame.new_label()
+                yield stmt.gen(t, label, frame)
+                self.emit_label(label, frame)
+                t = label
 
 Statement.Null      = Statement()
-Statement.Enclosing = Statement.Null
\ No newline at end of file
+Constant.Ints       = {}
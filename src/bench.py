@@ -0,0 +1,1014 @@
+__author__ = 'ZhangJingtian'
+import io
+import os
+import sys
+import random
+import time
+import contextlib
+import tempfile
+import tracemalloc
+import lexer
+import parser
+import compiler
+import cache
+import shutil
+import sym
+import ty
+import ast
+import cfg
+import dataflow
+import slots
+import opt
+import ssa
+import loops
+import inline
+import il
+import interp
+import context
+
+def program(functions=100, statements=20):
+    """Generate Program
+
+    Generates a mengl program with the given number of function definitions,
+    each holding about the given number of statements.
+
+    """
+    out = []
+    out.append("struct node;\n")
+    for i in range(functions):
+        out.append("function f%d(a : int, b : pointer to struct node) int;\n" % i)
+    out.append("struct node {\n    value : int;\n    next : pointer to struct node;\n};\n")
+    out.append("count : int;\n")
+    out.append("table : array [16] of int;\n")
+    for i in range(functions):
+        out.append("function f%d {\n" % i)
+        out.append("    x : int;\n    y : int;\n")
+        for j in range(statements):
+            k = j % 5
+            if k == 0:
+                out.append("    @ x = a + %d * (y - count);\n" % j)
+            elif k == 1:
+                out.append("    if (x >= %d && y != a) @ y = y + 1;\n" % j)
+            elif k == 2:
+                out.append("    while (y < %d || x == 0) {\n        @ y = y + x << 1;\n    }\n" % j)
+            elif k == 3:
+                out.append("    @ table[y] = x;\n")
+            else:
+                out.append("    @ b->value = x;\n")
+        out.append("    return x;\n};\n")
+    return "".join(out)
+
+def _expression(rand, depth):
+    if depth == 0 or rand.random() < 0.2:
+        return rand.choice(("a", "x", "y", "count", "3", "17"))
+    op = rand.choice(("||", "&&", "|", "^", "&", "==", "!=", "<", ">", "<=", ">=",
+                      "<<", ">>", "+", "-", "*", "/"))
+    left = _expression(rand, depth - 1)
+    right = _expression(rand, depth - 1)
+    if rand.random() < 0.2:
+        return "(%s %s %s)" % (left, op, right)
+    return "%s %s %s" % (left, op, right)
+
+def expression_program(functions=100, statements=20, depth=5, seed=0):
+    """Generate Expression Program
+
+    Generates a program whose statements assign long random expressions
+    using every binary operator.
+
+    """
+    rand = random.Random(seed)
+    out = []
+    for i in range(functions):
+        out.append("function e%d(a : int) int;\n" % i)
+    out.append("count : int;\n")
+    for i in range(functions):
+        out.append("function e%d {\n    x : int;\n    y : int;\n" % i)
+        for j in range(statements):
+            out.append("    @ x = %s;\n" % _expression(rand, depth))
+        out.append("    return x;\n};\n")
+    return "".join(out)
+
+def _timeit(func, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def _count_tokens(lexer_class, text):
+    lex = lexer_class(text)
+    count = 0
+    while lex.scan().tag is not None:
+        count = count + 1
+    return count
+
+def bench_lexer(functions=2000):
+    """Lexer Throughput
+
+    Compares the tokens per second of the master pattern engine against the
+    per-character reference scanner.
+
+    """
+    text = program(functions)
+    count = _count_tokens(lexer.Lexer, text)
+    print("lexer: %d bytes, %d tokens" % (len(text), count))
+    for lexer_class in (lexer.CharLexer, lexer.Lexer):
+        elapsed = _timeit(lambda: _count_tokens(lexer_class, text))
+        print("    %-10s %10.0f tokens/sec" % (lexer_class.__name__, count / elapsed))
+
+def _token_list(lexer_class, text):
+    lex = lexer_class(text)
+    tokens = []
+    while True:
+        tok = lex.scan()
+        tokens.append(tok)
+        if tok.tag is None:
+            return tokens
+
+def _measure(func, peak=False):
+    tracemalloc.start()
+    try:
+        result = func()
+        size, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if peak:
+        return result, peak_size
+    return result, size
+
+def bench_tokens(functions=1000):
+    """Token Buffer Memory
+
+    Compares the memory per token of a list of token objects against the
+    array-backed TokenBuffer, and the parse time of both parser modes.
+
+    """
+    text = program(functions)
+    count = len(_token_list(lexer.Lexer, text))
+    print("tokens: %d tokens" % count)
+    tests = (
+        ("CharLexer list",  lambda: _token_list(lexer.CharLexer, text)),
+        ("Lexer list",      lambda: _token_list(lexer.Lexer, text)),
+        ("TokenBuffer",     lambda: lexer.Lexer(text).tokenize()),
+    )
+    for name, func in tests:
+        result, size = _measure(func)
+        print("    %-16s %8.1f bytes/token" % (name, float(size) / count))
+        del result
+    tokens = lexer.Lexer(text).tokenize()
+    tests = (
+        ("scan",            lambda: parser.Parser(lexer.Lexer(text)).parse()),
+        ("tokenize",        lambda: parser.Parser(lexer.Lexer(text), buffered=True).parse()),
+        ("reused buffer",   lambda: parser.Parser(tokens, buffered=True).parse()),
+    )
+    for name, func in tests:
+        print("    parse %-16s %8.3f sec" % (name, _timeit(func)))
+
+def _count_file(path):
+    with open(path) as f:
+        text = f.read()
+    return _count_tokens(lexer.Lexer, text)
+
+def bench_stream(functions=8000):
+    """Streaming Input
+
+    Compares the peak memory and the speed of scanning a whole decoded file
+    against scanning the file through StreamLexer.
+
+    """
+    fd, path = tempfile.mkstemp(suffix='.mgl')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(program(functions))
+        print("stream: %d bytes" % os.path.getsize(path))
+        tests = (
+            ("read text",       lambda: _count_file(path)),
+            ("StreamLexer",     lambda: _count_tokens(lexer.StreamLexer, path)),
+        )
+        for name, func in tests:
+            count, size = _measure(func, peak=True)
+            elapsed = _timeit(func, repeat=1)
+            print("    %-16s %10d bytes peak %10.0f tokens/sec" % (name, size, count / elapsed))
+    finally:
+        os.remove(path)
+
+def bench_threads(units=16, functions=50):
+    """Compile Service Throughput
+
+    Measures units compiled per second by compile_many as the number of
+    threads goes up.
+
+    """
+    texts = [program(functions) for i in range(units)]
+    print("threads: %d units of %d functions" % (units, functions))
+    for workers in (1, 2, 4, 8):
+        elapsed = _timeit(lambda: compiler.compile_many(texts, max_workers=workers), repeat=1)
+        print("    %2d threads %8.1f units/sec" % (workers, units / elapsed))
+
+def _typing(inc, offset, edits):
+    for i in range(edits):
+        inc.edit(offset + i, 0, "a")
+
+def bench_relex(lines=(10000, 100000), edits=1000):
+    """Incremental Re-lexing
+
+    Times keystrokes through IncrementalLexer against re-tokenizing the
+    whole file, for files of a growing number of lines.
+
+    """
+    print("relex: %d keystrokes" % edits)
+    for n in lines:
+        text = program(n // 34 + 1)
+        inc = lexer.IncrementalLexer(text)
+        offset = text.index("@ x", len(text) // 2)
+        elapsed = _timeit(lambda: _typing(inc, offset, edits), repeat=1)
+        full = _timeit(lambda: lexer.Lexer(text).tokenize(), repeat=1)
+        print("    %7d lines %8.1f us/edit, full re-lex %8.1f ms" % (text.count("\n"), elapsed / edits * 1e6, full * 1e3))
+
+def _resolve_words(env, words):
+    for word in words:
+        env.find(word)
+
+def _resolve_strings(env, words):
+    for word in words:
+        env.find(str(word))
+
+def bench_symbols(names=2000, scopes=4):
+    """Symbol Resolution
+
+    Resolves every identifier token of a program through a chain of scopes
+    keyed on interned words, against the same chain keyed on the strings of
+    the identifiers as the tables used to be.
+
+    """
+    text = " ".join("v%d w%d" % (i % names, (i * 7) % names) for i in range(names * 20))
+    tokens = lexer.Lexer(text).tokenize()
+    words = [tokens.pool[v] for v in tokens.values[:-1]]
+    env = sym.IdentifierTable()
+    str_env = sym.IdentifierTable()
+    for s in range(scopes):
+        env = env.push_scope()
+        str_env = str_env.push_scope()
+        for i in range(s, names, scopes):
+            for prefix in ("v", "w"):
+                id_obj = ast.Identifier(lexer.InternTable.Shared.intern(prefix + str(i)), ty.Type.Int)
+                env.add(id_obj)
+                str_env._table[str(id_obj)] = id_obj
+    print("symbols: %d lookups over %d scopes" % (len(words), scopes))
+    for name, func in (("string keys", lambda: _resolve_strings(str_env, words)),
+                       ("interned words", lambda: _resolve_words(env, words))):
+        elapsed = _timeit(func)
+        print("    %-16s %8.1f ns/lookup" % (name, elapsed / len(words) * 1e9))
+
+def _parse_program(text, pratt):
+    p = parser.Parser(lexer.Lexer(text), pratt=pratt)
+    with p.get_context():
+        p._parse_program()
+
+def bench_expressions(functions=200):
+    """Expression Parsing
+
+    Compares the parse time of an expression heavy program with the
+    recursive descent and the operator precedence expression parser.
+
+    """
+    text = expression_program(functions)
+    print("expressions: %d bytes" % len(text))
+    for pratt in (False, True):
+        elapsed = _timeit(lambda: _parse_program(text, pratt))
+        print("    pratt=%-5s %8.3f sec" % (pratt, elapsed))
+    chain = "function f(a : int) int;\nfunction f {\n    x : int;\n    @ x = %s;\n};\n" % \
+        " + ".join(["a"] * 2000)
+    for pratt in (False, True):
+        try:
+            elapsed = _timeit(lambda: _parse_program(chain, pratt))
+            print("    pratt=%-5s 2000 operand chain %8.3f sec" % (pratt, elapsed))
+        except RecursionError:
+            print("    pratt=%-5s 2000 operand chain RecursionError" % pratt)
+
+def long_function(statements):
+    """Generate Long Function
+
+    Generates a program with one function of the given number of statements.
+
+    """
+    body = "".join("    @ x = x + %d;\n" % (i % 100) for i in range(statements))
+    return "function f(a : int) int;\nfunction f {\n    x : int;\n%s    return x;\n};\n" % body
+
+def bench_statements(sizes=(1000, 10000, 100000)):
+    """Long Function Bodies
+
+    Times parsing and IL generation of one function as its statement count
+    grows; the time per statement should stay flat.
+
+    """
+    print("statements: recursion limit %d" % sys.getrecursionlimit())
+    for n in sizes:
+        text = long_function(n)
+        try:
+            elapsed = _timeit(lambda: compiler.compile_source(text), repeat=1)
+            print("    %7d statements %8.3f sec %6.1f us/statement" % (n, elapsed, elapsed / n * 1e6))
+        except RecursionError:
+            print("    %7d statements RecursionError" % n)
+
+def _skip_bodies(text):
+    p = parser.Parser(lexer.Lexer(text), lazy=True)
+    p.parse()
+    return p
+
+def bench_parallel(functions=4000, workers=(1, 2, 4, 8)):
+    """Parallel Function Bodies
+
+    Times a sequential compile against skipping the function bodies alone,
+    and against parsing the bodies on a growing pool of processes.
+
+    """
+    text = program(functions, statements=10)
+    print("parallel: %d functions, %d cpus" % (functions, os.cpu_count() or 1))
+    print("    %-16s %8.3f sec" % ("sequential", _timeit(lambda: compiler.compile_source(text), repeat=1)))
+    print("    %-16s %8.3f sec" % ("skip bodies", _timeit(lambda: _skip_bodies(text), repeat=1)))
+    for n in workers:
+        elapsed = _timeit(lambda: compiler.compile_parallel(text, max_workers=n), repeat=1)
+        print("    %2d processes     %8.3f sec" % (n, elapsed))
+
+def broken_program(functions=100, every=10):
+    """Generate Broken Program
+
+    Generates the program of the given number of functions with a syntax
+    error in one of every given number of store statements, and an
+    undeclared name in the statement after it.
+
+    """
+    out = []
+    count = 0
+    for line in program(functions).split("\n"):
+        if "@ b->value = x;" in line:
+            count = count + 1
+            if count % every == 0:
+                line = line.replace("= x;", "= ;") + "\n    @ x = missing;"
+        out.append(line)
+    return "\n".join(out)
+
+def _parse_quiet(text, recover):
+    p = parser.Parser(lexer.Lexer(text), recover=recover)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return p.parse()
+
+def bench_recovery(functions=1000):
+    """Error Recovery
+
+    Compares the parse time of a clean program with and without error
+    recovery, and reports the errors found in one compile of a program
+    with many of them.
+
+    """
+    text = program(functions)
+    print("recovery: %d functions" % functions)
+    times = {}
+    for recover in (False, True):
+        times[recover] = _timeit(lambda: _parse_quiet(text, recover))
+        print("    recover=%-5s %8.3f sec" % (recover, times[recover]))
+    print("    overhead        %7.1f %%" % ((times[True] / times[False] - 1) * 100))
+    broken = broken_program(functions)
+    diagnostics = _parse_quiet(broken, True)
+    elapsed = _timeit(lambda: _parse_quiet(broken, True))
+    print("    broken program  %8.3f sec %d diagnostics" % (elapsed, len(diagnostics)))
+
+def _compile_all(texts, c):
+    for text in texts:
+        compiler.compile_source(text, cache=c)
+
+def bench_cache(units=20, functions=100):
+    """Compilation Cache
+
+    Times compiling units into an empty cache against loading the same
+    units back from it.
+
+    """
+    texts = [program(functions + i) for i in range(units)]
+    path = tempfile.mkdtemp()
+    try:
+        c = cache.Cache(path)
+        print("cache: %d units of %d functions" % (units, functions))
+        for name in ("cold", "warm"):
+            elapsed = _timeit(lambda: _compile_all(texts, c), repeat=1)
+            print("    %-6s %8.1f ms/unit" % (name, elapsed / units * 1e3))
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print("    %8.1f KB/unit on disk" % (size / 1024.0 / units))
+    finally:
+        shutil.rmtree(path)
+
+def _parse_tree(tokens):
+    p = parser.Parser(tokens, buffered=True)
+    with p.get_context():
+        p._parse_program()
+    return p
+
+def bench_ast(functions=500):
+    """Syntax Tree Memory
+
+    Measures the memory the syntax trees and symbol tables of a parse hold
+    on to, per token of the program.
+
+    """
+    for name, text in (("statements", program(functions)),
+                       ("expressions", expression_program(functions // 2))):
+        tokens = lexer.Lexer(text).tokenize()
+        p, size = _measure(lambda: _parse_tree(tokens))
+        print("ast %-12s %7d tokens %10d bytes %6.1f bytes/token" % (name, len(tokens), size, float(size) / len(tokens)))
+        del p
+
+def nested_program(depth, kind):
+    """Generate Nested Program
+
+    Generates a function whose one statement nests the given depth: a
+    chain of '+', a chain of '||', or nested 'if' statements.
+
+    """
+    if kind == "chain":
+        body = "    @ x = %s;\n" % " + ".join(["a"] * depth)
+    elif kind == "logical":
+        body = "    if (%s) @ x = 1;\n" % " || ".join(["a < x"] * depth)
+    else:
+        body = "    " + "if (a < x) " * depth + "@ x = 1;\n"
+    return "function f(a : int) int;\nfunction f {\n    x : int;\n%s    return x;\n};\n" % body
+
+def _lower(p):
+    with p.get_context():
+        p._parse_il_frame()
+
+def bench_nesting(depths=(100, 200, 400, 800, 3200)):
+    """Deeply Nested Code
+
+    Times IL generation alone for deeper and deeper nested expressions and
+    statements, parsed with the operator precedence parser and a raised
+    recursion limit so that only the lowering is limited by the default.
+
+    """
+    print("nesting: recursion limit %d" % sys.getrecursionlimit())
+    for kind in ("chain", "logical", "if"):
+        for depth in depths:
+            limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(limit, depth * 8 + 1000))
+            try:
+                p = parser.Parser(lexer.Lexer(nested_program(depth, kind)), pratt=True)
+                with p.get_context():
+                    p._parse_program()
+            finally:
+                sys.setrecursionlimit(limit)
+            try:
+                elapsed = _timeit(lambda: _lower(p), repeat=1)
+                print("    %-8s %5d deep %8.1f us/level" % (kind, depth, elapsed / depth * 1e6))
+            except RecursionError:
+                print("    %-8s %5d deep RecursionError" % (kind, depth))
+
+def _walk_codes(frames):
+    count = 0
+    for frame in frames:
+        table = frame.get_tacode_table()
+        marks = table.firsts[1:]
+        marks.append(len(table.marks))
+        for op, arg1, arg2, arg3, first, last in zip(table.ops, table.arg1, table.arg2,
+                                                     table.arg3, table.firsts, marks):
+            if op and arg1 >= 0 and first != last:
+                count = count + 1
+    return count
+
+def bench_il(functions=500):
+    """Three Address Code
+
+    Measures the memory IL generation holds on to, per code, and the time a
+    pass takes to visit the opcode, operands and labels of every code.
+
+    """
+    for name, text in (("statements", program(functions)),
+                       ("expressions", expression_program(functions // 2))):
+        p = _parse_tree(lexer.Lexer(text).tokenize())
+        size = _measure(lambda: _lower(p))[1]
+        frames = list(p.get_frames().values())
+        count = sum(len(frame.get_tacode_table()) for frame in frames)
+        elapsed = _timeit(lambda: _walk_codes(frames), repeat=5)
+        print("il %-12s %7d codes %10d bytes %6.1f bytes/code %6.1f ns/code"
+              % (name, count, size, float(size) / count, elapsed / count * 1e9))
+
+def _analyze(table):
+    graph = cfg.Graph(table)
+    graph.dominators()
+    graph.loops()
+    return graph
+
+def bench_cfg(sizes=(1000, 10000, 50000)):
+    """Control Flow Graphs
+
+    Times building the control flow graph of one function as it grows,
+    alone and with its dominators and loops; the time per code should stay
+    flat.
+
+    """
+    for n in sizes:
+        p = parser.Parser(lexer.Lexer(program(1, statements=n)))
+        p.parse()
+        frame = p.get_frame("f0")
+        table = frame.get_tacode_table()
+        count = len(table)
+        build = _timeit(lambda: cfg.Graph(table))
+        full = _timeit(lambda: _analyze(table))
+        graph = frame.get_cfg()
+        print("cfg: %6d codes %6d blocks %5d loops  build %5.2f us/code  with dominators and loops %5.2f us/code"
+              % (count, len(graph), len(graph.loops()), build / count * 1e6, full / count * 1e6))
+
+def bench_dataflow(sizes=(500, 2000, 8000)):
+    """Dataflow Problems
+
+    Times solving liveness, reaching definitions and available expressions
+    on one function as it grows to thousands of temporaries.
+
+    """
+    for n in sizes:
+        p = parser.Parser(lexer.Lexer(program(1, statements=n)))
+        p.parse()
+        frame = p.get_frame("f0")
+        table = frame.get_tacode_table()
+        frame.get_cfg().loops()
+        line = "dataflow: %6d codes %6d temps" % (len(table), len(table.temps))
+        variables = dataflow.Variables(frame)
+        for problem in (dataflow.Liveness, dataflow.ReachingDefinitions, dataflow.AvailableExpressions):
+            elapsed = _timeit(lambda: problem(frame, variables).solve())
+            line = line + "  %s %5.2f us/code" % (problem.__name__, elapsed / len(table) * 1e6)
+        print(line)
+
+def bench_slots(functions=10):
+    """Temporary Slots
+
+    Reports, per function, the size of the temporary area with one slot
+    per temporary and once the temporaries are packed by live range, and
+    times the packing.
+
+    """
+    for name, text in (("statements", program(functions)),
+                       ("expressions", expression_program(functions))):
+        p = parser.Parser(lexer.Lexer(text))
+        p.parse()
+        total = [0, 0, 0]
+        for word, frame in p.get_frames().items():
+            table = frame.get_tacode_table()
+            unpacked, packed = slots.pack(frame)
+            total = [total[0] + len(table), total[1] + unpacked, total[2] + packed]
+            print("slots %-12s %-6s %5d temps %6d -> %4d bytes"
+                  % (name, word, len(table.temps), unpacked, packed))
+        frames = list(p.get_frames().values())
+        elapsed = _timeit(lambda: [slots.pack(frame) for frame in frames])
+        print("slots %-12s total  %6d -> %4d bytes, %5.2f us/code"
+              % (name, total[1], total[2], elapsed / total[0] * 1e6))
+
+def flag_program(functions=50):
+    """Generate Flag Program
+
+    Generates a program whose functions set configuration flags in locals
+    and branch on them, so most of their conditions are known when
+    compiling.
+
+    """
+    out = []
+    for i in range(functions):
+        out.append("function g%d(a : int) int;\n" % i)
+    for i in range(functions):
+        out.append("function g%d {\n" % i)
+        out.append("    debug : int;\n    mode : int;\n    size : int;\n    x : int;\n    i : int;\n")
+        out.append("    @ debug = 0;\n    @ mode = %d;\n    @ size = 4 << mode;\n    @ x = a;\n    @ i = 0;\n" % (i % 3))
+        out.append("    if (debug) @ x = x + 1000;\n")
+        out.append("    if (mode == 1) @ x = x * size; else @ x = x + size;\n")
+        out.append("    while (i < size && debug == 0) {\n")
+        out.append("        if (mode > 1 || debug) @ x = x - i; else @ x = x + i * size;\n")
+        out.append("        @ i = i + 1;\n    }\n")
+        out.append("    if (size * 2 > 16) return x - size;\n")
+        out.append("    return x;\n};\n")
+    return "".join(out)
+
+def corpus():
+    """Benchmark Corpus
+
+    The programs the optimization benchmarks compile, by name.
+
+    """
+    return (("statements", program(100)),
+            ("expressions", expression_program(50)),
+            ("logical", nested_program(50, "logical")),
+            ("if", nested_program(50, "if")),
+            ("long", long_function(2000)),
+            ("flags", flag_program(50)))
+
+def _count_codes(text, opt_level):
+    p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level))
+    p.parse()
+    tables = [frame.get_tacode_table() for frame in p.get_frames().values()]
+    codes = sum(len(table) for table in tables)
+    labels = sum(len([label for label in table.marks if table.places[label] >= 0]) for table in tables)
+    return codes, labels
+
+def bench_peephole():
+    """Peephole Optimization
+
+    Counts the codes and labels of the benchmark corpus as lowered and
+    as optimized at level 1, and times the peephole pass.
+
+    """
+    total = [0, 0]
+    for name, text in corpus():
+        before, labels_before = _count_codes(text, 0)
+        after, labels_after = _count_codes(text, 1)
+        total = [total[0] + before, total[1] + after]
+        print("peephole %-12s %6d -> %6d codes (%5.1f%%) %6d -> %6d labels"
+              % (name, before, after, 100.0 * (before - after) / before, labels_before, labels_after))
+    print("peephole %-12s %6d -> %6d codes (%5.1f%%)"
+          % ("total", total[0], total[1], 100.0 * (total[0] - total[1]) / total[0]))
+    p = parser.Parser(lexer.Lexer(program(500)), ctx=context.Context(0))
+    p.parse()
+    frames = list(p.get_frames().values())
+    codes = sum(len(frame.get_tacode_table()) for frame in frames)
+    elapsed = _timeit(lambda: [opt.peephole(frame) for frame in frames], repeat=1)
+    print("peephole %5.2f us/code" % (elapsed / codes * 1e6))
+
+def bench_dead_code():
+    """Dead Code Elimination
+
+    Counts the codes and the temporary area of the benchmark corpus after
+    the peephole pass, then after dead code elimination, and times the
+    elimination.
+
+    """
+    total = [0, 0]
+    for name, text in corpus():
+        p = parser.Parser(lexer.Lexer(text), ctx=context.Context(0))
+        p.parse()
+        before = after = temps_before = temps_after = 0
+        for frame in p.get_frames().values():
+            opt.peephole(frame)
+            before = before + len(frame.get_tacode_table())
+            temps_before = temps_before + slots.pack(frame)[1]
+            while opt.dead_code(frame):
+                opt.peephole(frame)
+            after = after + len(frame.get_tacode_table())
+            temps_after = temps_after + slots.pack(frame)[1]
+        total = [total[0] + before, total[1] + after]
+        print("dead code %-12s %6d -> %6d codes (%5.1f%%) %6d -> %6d temp bytes"
+              % (name, before, after, 100.0 * (before - after) / before, temps_before, temps_after))
+    print("dead code %-12s %6d -> %6d codes (%5.1f%%)"
+          % ("total", total[0], total[1], 100.0 * (total[0] - total[1]) / total[0]))
+    p = parser.Parser(lexer.Lexer(program(500)), ctx=context.Context(0))
+    p.parse()
+    frames = list(p.get_frames().values())
+    for frame in frames:
+        opt.peephole(frame)
+    codes = sum(len(frame.get_tacode_table()) for frame in frames)
+    elapsed = _timeit(lambda: [opt.dead_code(frame) for frame in frames], repeat=1)
+    print("dead code %5.2f us/code" % (elapsed / codes * 1e6))
+
+def bench_copies():
+    """Copy Removal
+
+    Counts the codes, the copies and the temporary area of the benchmark
+    corpus after the peephole pass and dead code elimination, then after
+    removing the copies, and times the removal.
+
+    """
+    for name, text in corpus():
+        p = parser.Parser(lexer.Lexer(text), ctx=context.Context(0))
+        p.parse()
+        counts = [0] * 6
+        for frame in p.get_frames().values():
+            table = frame.get_tacode_table()
+            opt.peephole(frame)
+            while opt.dead_code(frame):
+                opt.peephole(frame)
+            counts[0] = counts[0] + len(table)
+            counts[2] = counts[2] + len([op for op in table.ops if op == il.Tacode.ASSIGN])
+            counts[4] = counts[4] + slots.pack(frame)[1]
+            opt.remove_copies(frame)
+            table = frame.get_tacode_table()
+            counts[1] = counts[1] + len(table)
+            counts[3] = counts[3] + len([op for op in table.ops if op == il.Tacode.ASSIGN])
+            counts[5] = counts[5] + slots.pack(frame)[1]
+        print("copies %-12s %6d -> %6d codes %6d -> %6d copies %6d -> %6d temp bytes"
+              % ((name,) + tuple(counts)))
+    p = parser.Parser(lexer.Lexer(program(500)), ctx=context.Context(0))
+    p.parse()
+    frames = list(p.get_frames().values())
+    for frame in frames:
+        opt.peephole(frame)
+        while opt.dead_code(frame):
+            opt.peephole(frame)
+    codes = sum(len(frame.get_tacode_table()) for frame in frames)
+    elapsed = _timeit(lambda: [opt.remove_copies(frame) for frame in frames], repeat=1)
+    print("copies %5.2f us/code" % (elapsed / codes * 1e6))
+
+def _count_jumps(text, opt_level):
+    p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level))
+    p.parse()
+    tables = [frame.get_tacode_table() for frame in p.get_frames().values()]
+    codes = sum(len(table) for table in tables)
+    jumps = sum(len([op for op in table.ops if op == il.Tacode.IFTRUE or op == il.Tacode.IFFALSE])
+                for table in tables)
+    return codes, jumps
+
+def _propagate(frame):
+    form = ssa.Form(frame)
+    ssa.ConstantPropagation(form).solve().rewrite()
+    form.destroy()
+
+def bench_ssa():
+    """Constant Propagation
+
+    Counts the codes and conditional jumps of the benchmark corpus at
+    optimization levels 1 and 2, and times building the static single
+    assignment form, propagating the constants and leaving the form.
+
+    """
+    for name, text in corpus():
+        codes1, jumps1 = _count_jumps(text, 1)
+        codes2, jumps2 = _count_jumps(text, 2)
+        print("ssa %-12s %6d -> %6d codes %6d -> %6d conditional jumps"
+              % (name, codes1, codes2, jumps1, jumps2))
+    p = parser.Parser(lexer.Lexer(program(500)), ctx=context.Context(1))
+    p.parse()
+    frames = list(p.get_frames().values())
+    codes = sum(len(frame.get_tacode_table()) for frame in frames)
+    elapsed = _timeit(lambda: [_propagate(frame) for frame in frames], repeat=1)
+    print("ssa %5.2f us/code" % (elapsed / codes * 1e6))
+
+def loop_program(functions=20):
+    """Generate Loop Program
+
+    Generates a program whose functions run counted while and do loops,
+    nested two deep, over a global array, with expressions of the
+    parameters recomputed on every iteration.
+
+    """
+    out = []
+    for i in range(functions):
+        out.append("function f%d(a : int, b : int) int;\n" % i)
+    out.append("table : array [64] of int;\n")
+    for i in range(functions):
+        out.append("function f%d {\n" % i)
+        out.append("    i : int;\n    j : int;\n    s : int;\n")
+        out.append("    @ s = 0;\n    @ i = 0;\n")
+        out.append("    while (i < a) {\n")
+        out.append("        @ j = 0;\n")
+        out.append("        while (j < b) {\n")
+        out.append("            @ s = s + (a * %d + b) * j + i * (b + %d);\n" % (i % 5 + 1, i))
+        out.append("            @ j = j + 1;\n        }\n")
+        out.append("        @ table[i & 63] = s;\n")
+        out.append("        @ i = i + 1;\n    }\n")
+        out.append("    do {\n")
+        out.append("        @ s = s - (a + b) * %d + table[(a + %d) & 63];\n" % (i % 3 + 2, i))
+        out.append("        @ i = i - 1;\n    } while (i > 0 && s > a * b);\n")
+        out.append("    return s;\n};\n")
+    return "".join(out)
+
+def array_program(functions=20):
+    """Generate Array Program
+
+    Generates a program whose functions walk global arrays of ints and
+    of structs with counted loops, indexing them by the loop counters.
+
+    """
+    out = ["struct pair;\n"]
+    for i in range(functions):
+        out.append("function w%d(a : int, b : int) int;\n" % i)
+    out.append("struct pair {\n    key : int;\n    value : int;\n};\n")
+    out.append("vals : array [64] of int;\npairs : array [32] of struct pair;\n")
+    for i in range(functions):
+        out.append("function w%d {\n" % i)
+        out.append("    i : int;\n    s : int;\n")
+        out.append("    @ s = 0;\n    @ i = 0;\n")
+        out.append("    while (i < 64) {\n")
+        out.append("        @ vals[i] = vals[i] + i * %d + a;\n" % (i % 7 + 3))
+        out.append("        @ i = i + 1;\n    }\n")
+        out.append("    @ i = 0;\n")
+        out.append("    do {\n")
+        out.append("        @ pairs[i].key = i;\n")
+        out.append("        @ pairs[i].value = vals[i * 2] + b;\n")
+        out.append("        @ s = s + pairs[i].value;\n")
+        out.append("        @ i = i + 1;\n    } while (i < 32);\n")
+        out.append("    return s;\n};\n")
+    return "".join(out)
+
+def helper_program(functions=20):
+    """Generate Helper Program
+
+    Generates a program whose functions call small helpers, the getters
+    and setters of a global table and an arithmetic helper, in loops and
+    out of them.
+
+    """
+    out = ["function get(i : int) int;\n",
+           "function put(i : int, v : int) int;\n",
+           "function clamp(x : int, lo : int, hi : int) int;\n"]
+    for i in range(functions):
+        out.append("function h%d(a : int, b : int) int;\n" % i)
+    out.append("cells : array [32] of int;\nwrites : int;\n")
+    out.append("function get {\n    return cells[i & 31];\n};\n")
+    out.append("function put {\n    @ cells[i & 31] = v;\n    @ writes = writes + 1;\n    return v;\n};\n")
+    out.append("function clamp {\n    if (x < lo) return lo;\n    if (x > hi) return hi;\n    return x;\n};\n")
+    for i in range(functions):
+        out.append("function h%d {\n" % i)
+        out.append("    i : int;\n    s : int;\n")
+        out.append("    @ s = clamp(a, 0, %d);\n    @ i = 0;\n" % (i + 10))
+        out.append("    while (i < b) {\n")
+        out.append("        @ s = s + put(i, get(i + %d) + clamp(s, -100, 100));\n" % i)
+        out.append("        @ i = i + 1;\n    }\n")
+        out.append("    return s;\n};\n")
+    return "".join(out)
+
+def recursive_program(functions=20):
+    """Generate Recursive Program
+
+    Generates a program whose functions recurse in tail position, on
+    themselves as accumulating walkers over a global array and on each
+    other in pairs, and out of it.
+
+    """
+    out = []
+    for i in range(functions):
+        out.append("function r%d(n : int, acc : int) int;\n" % i)
+        out.append("function p%d(n : int) int;\nfunction q%d(n : int) int;\n" % (i, i))
+    out.append("weights : array [64] of int;\n")
+    for i in range(functions):
+        out.append("function r%d {\n" % i)
+        out.append("    if (n <= 0) return acc;\n")
+        out.append("    return r%d(n - 1, acc + weights[n & 63] + n * %d);\n};\n" % (i, i + 1))
+        out.append("function p%d {\n    if (n <= 0) return %d;\n    return q%d(n - 1);\n};\n" % (i, i, i))
+        out.append("function q%d {\n    if (n <= 0) return 0;\n    return p%d(n - 2) + 1;\n};\n" % (i, i))
+    return "".join(out)
+
+def alias_program(functions=20):
+    """Generate Alias Program
+
+    Generates a program whose functions read through pointers, to a
+    global and to a local whose address is taken, in loops assigning the
+    pointees directly.
+
+    """
+    out = []
+    for i in range(functions):
+        out.append("function v%d(a : int) int;\n" % i)
+    out.append("g : int;\n")
+    for i in range(functions):
+        out.append("function v%d {\n" % i)
+        out.append("    i : int;\n    y : int;\n    p : pointer to int;\n    q : pointer to int;\n")
+        out.append("    @ g = a;\n    @ y = %d;\n    @ p = &g;\n    @ q = &y;\n    @ i = 0;\n" % i)
+        out.append("    do {\n")
+        out.append("        @ i = i + 1;\n")
+        out.append("        @ g = g + *p;\n")
+        out.append("        @ y = y + *q + i;\n")
+        out.append("    } while (i < %d);\n" % (i % 4 + 2))
+        out.append("    return g + y;\n};\n")
+    return "".join(out)
+
+def _run_codes(text, opt_level, args):
+    p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level))
+    p.parse()
+    frames = list(p.get_frames().values())
+    if opt_level == 1:
+        for frame in frames:
+            _propagate(frame)
+            opt.remove_copies(frame)
+    machine = interp.Machine(frames)
+    results = [machine.call(str(frame.get_frame_id()), args) for frame in frames]
+    return machine, results
+
+def bench_loops():
+    """Loop Optimization
+
+    Runs the looping benchmark programs in the interpreter with their
+    constants propagated, then at optimization level 2, which also rotates
+    the loops, hoists their invariant code and reduces their induction
+    variables, and counts the codes executed and the gotos among them.
+    The program reading through pointers to the variables its loops
+    assign must give the same results unoptimized and at levels 2 and 3.
+
+    """
+    T = il.Tacode
+    for name, text, args in (("loops", loop_program(20), (12, 10)),
+                             ("arrays", array_program(20), (5, 9)),
+                             ("flags", flag_program(50), (7,))):
+        before, results_before = _run_codes(text, 1, args)
+        after, results_after = _run_codes(text, 2, args)
+        assert results_before == results_after, name
+        print("loops %-8s %8d -> %8d codes executed (%5.1f%%) %7d -> %7d gotos"
+              % (name, before.executed, after.executed,
+                 100.0 * (before.executed - after.executed) / before.executed,
+                 before.counts[T.GOTO], after.counts[T.GOTO]))
+    text = alias_program(20)
+    results = [_run_codes(text, opt_level, (3,))[1] for opt_level in (0, 2, 3)]
+    assert results[0] == results[1] == results[2], "aliases"
+    p = parser.Parser(lexer.Lexer(loop_program(200)), ctx=context.Context(1))
+    p.parse()
+    frames = list(p.get_frames().values())
+    codes = sum(len(frame.get_tacode_table()) for frame in frames)
+    elapsed = _timeit(lambda: [(loops.rotate(frame), loops.hoist(frame)) for frame in frames], repeat=1)
+    print("loops %5.2f us/code" % (elapsed / codes * 1e6))
+
+def bench_inline():
+    """Function Inlining
+
+    Counts the codes of the benchmark programs calling helpers at
+    optimization levels 2 and 3, the latter inlining the calls, and runs
+    them in the interpreter, counting the codes and the calls executed.
+    The time taken includes optimizing again the frames calls are inlined
+    into.
+
+    """
+    T = il.Tacode
+    for name, text, args in (("helpers", helper_program(20), (5, 12)),
+                             ("few", helper_program(20), (50, 2))):
+        counts = []
+        for opt_level in (2, 3):
+            p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level))
+            p.parse()
+            frames = list(p.get_frames().values())
+            machine = interp.Machine(frames)
+            names = [str(frame.get_frame_id()) for frame in frames]
+            results = [machine.call(word, args) for word in names]
+            counts.append((sum(len(frame.get_tacode_table()) for frame in frames),
+                           machine.executed, machine.counts[T.CALL], results))
+        assert counts[0][3] == counts[1][3], name
+        print("inline %-10s %6d -> %6d codes %8d -> %8d codes executed %6d -> %6d calls"
+              % (name, counts[0][0], counts[1][0], counts[0][1], counts[1][1], counts[0][2], counts[1][2]))
+    p = parser.Parser(lexer.Lexer(helper_program(200)), ctx=context.Context(2))
+    p.parse()
+    frames = list(p.get_frames().values())
+    codes = sum(len(frame.get_tacode_table()) for frame in frames)
+    elapsed = _timeit(lambda: inline.Inliner(frames, 2).run(), repeat=1)
+    print("inline %5.2f us/code" % (elapsed / codes * 1e6))
+
+def bench_tail_calls(depth=1000):
+    """Tail Call Elimination
+
+    Runs the recursive benchmark program in the interpreter at
+    optimization levels 1 and 2, the latter turning the calls in tail
+    position into loops and tailcalls, and counts the codes, the calls
+    and the tailcalls executed and the deepest the stack grows. A call
+    whose saveret other paths jump to is checked to keep their result.
+
+    """
+    T = il.Tacode
+    text = recursive_program(20)
+    runs = []
+    for opt_level in (1, 2):
+        p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level))
+        p.parse()
+        frames = list(p.get_frames().values())
+        machine = interp.Machine(frames)
+        names = [str(frame.get_frame_id()) for frame in frames]
+        results = [machine.call(word, (depth, 0)) for word in names if word[0] == "r"]
+        results = results + [machine.call(word, (depth,)) for word in names if word[0] == "p"]
+        runs.append((machine, results))
+    (before, results_before), (after, results_after) = runs
+    assert results_before == results_after
+    text = "function h(a : int) int;\nfunction f(c : int, a : int) int;\n" \
+           "function h {\n    return a * 3;\n};\n" \
+           "function f {\n    y : int;\n    if (c) @ y = 5; else @ y = h(a);\n    return y;\n};\n"
+    for opt_level in (0, 1, 2, 3):
+        p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level))
+        p.parse()
+        machine = interp.Machine(list(p.get_frames().values()))
+        assert (machine.call("f", (1, 7)), machine.call("f", (0, 7))) == (5, 21), opt_level
+    print("tail calls %8d -> %8d codes executed %6d -> %6d calls %6d -> %6d tailcalls %5d -> %5d deepest"
+          % (before.executed, after.executed, before.counts[T.CALL], after.counts[T.CALL],
+             before.counts[T.TAILCALL], after.counts[T.TAILCALL], before.deepest, after.deepest))
+
+BENCHMARKS = {
+    "lexer":    bench_lexer,
+    "tokens":   bench_tokens,
+    "stream":   bench_stream,
+    "threads":  bench_threads,
+    "relex":    bench_relex,
+    "symbols":  bench_symbols,
+    "expressions": bench_expressions,
+    "statements": bench_statements,
+    "parallel": bench_parallel,
+    "recovery": bench_recovery,
+    "cache":    bench_cache,
+    "ast":      bench_ast,
+    "nesting":  bench_nesting,
+    "il":       bench_il,
+    "cfg":      bench_cfg,
+    "dataflow": bench_dataflow,
+    "slots":    bench_slots,
+    "peephole": bench_peephole,
+    "deadcode": bench_dead_code,
+    "ssa":      bench_ssa,
+    "copies":   bench_copies,
+    "loops":    bench_loops,
+    "inline":   bench_inline,
+    "tailcalls": bench_tail_calls,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS.keys())
+    for name in names:
+        BENCHMARKS[name]()
@@ -0,0 +1,142 @@
+__author__ = 'ZhangJingtian'
+import os
+import hashlib
+import tempfile
+import persist
+
+MODULES = ('lexer', 'parser', 'ast', 'il', 'ty', 'sym', 'gen', 'context',
+           'errors', 'persist', 'compiler', 'cfg', 'dataflow', 'slots', 'opt',
+           'ssa', 'loops', 'inline')
+
+_version = None
+
+def version():
+    """Compiler Version
+
+    Hashes the sources of the compiler modules, so that a changed compiler
+    never loads the entries of an older one.
+
+    """
+    global _version
+    if _version is None:
+        digest = hashlib.sha256()
+        base = os.path.dirname(os.path.abspath(__file__))
+        for name in MODULES:
+            with open(os.path.join(base, name + '.py'), 'rb') as f:
+                digest.update(f.read())
+        _version = digest.hexdigest()
+    return _version
+
+class Cache(object):
+    """Cache class
+
+    A content addressed cache of compilations in a directory, keyed on the
+    source text, the compiler version and the compile options. Entries are
+    written to a temporary file and renamed into place, so concurrent
+    builds sharing the directory never see a partial entry. Loading an
+    entry marks it as recently used, and storing one evicts the least
+    recently used entries once the directory grows over its size bound.
+
+    """
+    SUFFIX = '.mglc'
+
+    def __init__(self, path, max_size=256 * 1024 * 1024):
+        super(Cache, self).__init__()
+        self._path     = path
+        self._max_size = max_size
+        self._registry = persist.Registry()
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, text, **options):
+        """Cache Key
+
+        Hashes the source text together with the compiler version and the
+        given compile options.
+
+        """
+        digest = hashlib.sha256()
+        digest.update(version().encode('ascii'))
+        digest.update(repr(sorted(options.items())).encode('utf-8'))
+        digest.update(text.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self._path, key + Cache.SUFFIX)
+
+    def load(self, key):
+        """Load Entry
+
+        Returns the compilation stored under the key, or None when there is
+        no readable entry for it. An entry that fails to load, corrupted or
+        naming a class outside the compiler, is removed, so the next store
+        writes it again.
+
+        """
+        path = self._entry(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            compilation = persist.loads(data, self._registry)
+        except Exception:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return compilation
+
+    def store(self, key, compilation):
+        """Store Entry
+
+        Writes the compilation under the key atomically, then evicts the
+        least recently used entries over the size bound.
+
+        """
+        data = persist.dumps(compilation, self._registry)
+        fd, tmp = tempfile.mkstemp(dir=self._path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._entry(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Evict Entries
+
+        Removes the least recently used entries until the entries fit in
+        the size bound.
+
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self._path):
+            if not name.endswith(Cache.SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self._path, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total = total + st.st_size
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self._max_size:
+                break
+            try:
+                os.remove(os.path.join(self._path, name))
+            except OSError:
+                pass
+            total = total - size
+
+    def get_path(self):
+        return self._path
@@ -0,0 +1,287 @@
+__author__ = 'ZhangJingtian'
+import il
+from array import array
+
+class Loop(object):
+    """Loop class
+
+    A natural loop: the header, the blocks jumping back to it and the set
+    of blocks of the loop body, header included. Loops sharing a header are
+    one loop, and parent is the innermost loop enclosing this one.
+
+    """
+    __slots__ = ('header', 'latches', 'blocks', 'parent')
+    def __init__(self, header):
+        super(Loop, self).__init__()
+        self.header  = header
+        self.latches = []
+        self.blocks  = set([header])
+        self.parent  = None
+
+    def get_depth(self):
+        depth = 1
+        loop = self.parent
+        while loop is not None:
+            depth = depth + 1
+            loop = loop.parent
+        return depth
+
+class Graph(object):
+    """Graph class
+
+    The control flow graph of a tacode table. Blocks are numbered in code
+    order and block b holds the codes from starts[b] up to starts[b + 1],
+    with block_of giving the block of every code; block 0 is the entry. A
+    block starts at the first code, at every jump target and after every
+    jump and return, so the graph is built in one pass over the codes and
+    one over the blocks. The successor and
+    predecessor lists, the reverse postorder, the dominator tree and the
+    natural loops are computed on first use. The graph records the version
+    of the table it was built from, and describes it only while the table
+    keeps that version.
+
+    """
+    def __init__(self, table):
+        super(Graph, self).__init__()
+        self.version = table.version
+        n = len(table)
+        ops, arg3, places = table.ops, table.arg3, table.places
+        leaders = bytearray(n + 1)
+        if n:
+            leaders[0] = 1
+        GOTO, IFTRUE, IFFALSE, RETURN = il.Tacode.GOTO, il.Tacode.IFTRUE, il.Tacode.IFFALSE, il.Tacode.RETURN
+        TAILCALL = il.Tacode.TAILCALL
+        for i in range(n):
+            op = ops[i]
+            if op == GOTO or op == IFTRUE or op == IFFALSE:
+                leaders[places[arg3[i]]] = 1
+                leaders[i + 1] = 1
+            elif op == RETURN or op == TAILCALL:
+                leaders[i + 1] = 1
+        self.starts = array('i', [i for i in range(n) if leaders[i]])
+        self.starts.append(n)
+        self.block_of = array('i', [0]) * n
+        self._places  = places
+        starts = self.starts
+        for b in range(len(starts) - 1):
+            for i in range(starts[b], starts[b + 1]):
+                self.block_of[i] = b
+        count = len(starts) - 1
+        self.succs = [[] for b in range(count)]
+        self.preds = [[] for b in range(count)]
+        for b in range(count):
+            last = starts[b + 1] - 1
+            op = ops[last]
+            if op == GOTO:
+                self._link(b, self.block_of[places[arg3[last]]])
+            elif op == RETURN or op == TAILCALL:
+                pass
+            else:
+                if b + 1 < count:
+                    self._link(b, b + 1)
+                if op == IFTRUE or op == IFFALSE:
+                    self._link(b, self.block_of[places[arg3[last]]])
+        self._order = None
+        self._idoms = None
+        self._loops = None
+        self._frontiers = None
+
+    def _link(self, b, s):
+        if s not in self.succs[b]:
+            self.succs[b].append(s)
+            self.preds[s].append(b)
+
+    def get_block(self, label):
+        """Get Block
+
+        Gets the block the label is set in, the label must be placed.
+
+        """
+        place = self._places[label]
+        if place < 0:
+            raise ValueError("label %d is not placed" % label)
+        return self.block_of[place]
+
+    def __len__(self):
+        return len(self.succs)
+
+    def reverse_postorder(self):
+        """Reverse Postorder
+
+        Lists the blocks reachable from the entry in reverse postorder of a
+        depth first walk, with an explicit stack.
+
+        """
+        if self._order is not None:
+            return self._order
+        order = []
+        if len(self):
+            visited = bytearray(len(self))
+            visited[0] = 1
+            stack = [(0, iter(self.succs[0]))]
+            while stack:
+                b, succs = stack[-1]
+                for s in succs:
+                    if not visited[s]:
+                        visited[s] = 1
+                        stack.append((s, iter(self.succs[s])))
+                        break
+                else:
+                    stack.pop()
+                    order.append(b)
+            order.reverse()
+        self._order = order
+        return order
+
+    def dominators(self):
+        """Immediate Dominators
+
+        Gets the immediate dominator of every block, the entry being its own
+        and unreachable blocks having -1, by the iterative algorithm of
+        Cooper, Harvey and Kennedy over the reverse postorder.
+
+        """
+        if self._idoms is not None:
+            return self._idoms
+        order = self.reverse_postorder()
+        number = array('i', [-1]) * len(self)
+        for i, b in enumerate(order):
+            number[b] = i
+        idoms = array('i', [-1]) * len(self)
+        if order:
+            idoms[0] = 0
+        changed = True
+        while changed:
+            changed = False
+            for b in order[1:]:
+                idom = -1
+                for p in self.preds[b]:
+                    if idoms[p] < 0:
+                        continue
+                    if idom < 0:
+                        idom = p
+                        continue
+                    while p != idom:
+                        while number[p] > number[idom]:
+                            p = idoms[p]
+                        while number[idom] > number[p]:
+                            idom = idoms[idom]
+                if idoms[b] != idom:
+                    idoms[b] = idom
+                    changed = True
+        self._idoms = idoms
+        self._number_tree(order, idoms)
+        return idoms
+
+    def _number_tree(self, order, idoms):
+        """Number Dominator Tree
+
+        Numbers the dominator tree in preorder and postorder, so that a
+        dominates b exactly when a's interval holds b's.
+
+        """
+        children = [[] for b in range(len(self))]
+        for b in order[1:]:
+            children[idoms[b]].append(b)
+        self._children = children
+        self._pre  = array('i', [-1]) * len(self)
+        self._post = array('i', [-1]) * len(self)
+        if not order:
+            return
+        clock = 0
+        self._pre[0] = clock
+        stack = [(0, iter(children[0]))]
+        while stack:
+            b, kids = stack[-1]
+            for c in kids:
+                clock = clock + 1
+                self._pre[c] = clock
+                stack.append((c, iter(children[c])))
+                break
+            else:
+                stack.pop()
+                clock = clock + 1
+                self._post[b] = clock
+
+    def dominator_tree(self):
+        """Dominator Tree
+
+        Gets the children of every block in the dominator tree, in reverse
+        postorder.
+
+        """
+        self.dominators()
+        return self._children
+
+    def frontiers(self):
+        """Dominance Frontiers
+
+        Gets the dominance frontier of every block, the blocks where its
+        dominance ends: a join is in the frontier of each block on the way
+        up the dominator tree from a predecessor to the join's immediate
+        dominator. The entry is entered from outside as well, so it is a
+        join once any block jumps back to it.
+
+        """
+        if self._frontiers is not None:
+            return self._frontiers
+        idoms = self.dominators()
+        frontiers = [set() for b in range(len(self))]
+        for b in self.reverse_postorder():
+            preds = self.preds[b]
+            if len(preds) < 2 and b != 0:
+                continue
+            stop = idoms[b] if b != 0 else -1
+            for p in preds:
+                runner = p if idoms[p] >= 0 else stop
+                while runner != stop:
+                    frontiers[runner].add(b)
+                    runner = idoms[runner] if runner != 0 else -1
+        self._frontiers = frontiers
+        return frontiers
+
+    def dominates(self, a, b):
+        """Dominates
+
+        Tells whether every path from the entry to block b passes through
+        block a.
+
+        """
+        self.dominators()
+        if self._pre[a] < 0 or self._pre[b] < 0:
+            return False
+        return self._pre[a] <= self._pre[b] and self._post[b] <= self._post[a]
+
+    def loops(self):
+        """Natural Loops
+
+        Finds the natural loop of every back edge, an edge whose target
+        dominates its source, and nests the loops. The loops are listed
+        outermost first.
+
+        """
+        if self._loops is not None:
+            return self._loops
+        headers = {}
+        for b in self.reverse_postorder():
+            for s in self.succs[b]:
+                if not self.dominates(s, b):
+                    continue
+                loop = headers.get(s)
+                if loop is None:
+                    loop = headers[s] = Loop(s)
+                loop.latches.append(b)
+                stack = [b]
+                while stack:
+                    x = stack.pop()
+                    if x not in loop.blocks and self._pre[x] >= 0:
+                        loop.blocks.add(x)
+                        stack.extend(self.preds[x])
+        loops = sorted(headers.values(), key=lambda loop: -len(loop.blocks))
+        owners = {}
+        for loop in loops:
+            loop.parent = owners.get(loop.header)
+            for x in loop.blocks:
+                owners[x] = loop
+        self._loops = loops
+        return loops
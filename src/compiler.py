@@ -0,0 +1,123 @@
+__author__ = 'ZhangJingtian'
+import gc
+import os
+import lexer
+import parser
+import context
+import persist
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+class Compilation(object):
+    """Compilation class
+
+    The result of compiling one source: the function frames holding the
+    three address code, the static area holding the global layout and the
+    diagnostics reported. The frames hold no code when an error was reported.
+
+    """
+    def __init__(self, frames, static_area, diagnostics=None):
+        super(Compilation, self).__init__()
+        self._frames      = frames
+        self._static_area = static_area
+        self._diagnostics = diagnostics or []
+
+    def get_frames(self):
+        return self._frames
+
+    def get_static_area(self):
+        return self._static_area
+
+    def get_diagnostics(self):
+        return self._diagnostics
+
+def compile_source(text, buffered=False, cache=None, opt_level=1):
+    """Compile Source
+
+    Compiles one program text within its own context, at the given
+    optimization level. With a cache, an unchanged program is loaded from
+    it instead of being compiled again.
+
+    """
+    if cache is not None:
+        key = cache.key(text, buffered=buffered, opt_level=opt_level)
+        compilation = cache.load(key)
+        if compilation is not None:
+            return compilation
+    p = parser.Parser(lexer.Lexer(text), buffered=buffered, ctx=context.Context(opt_level))
+    diagnostics = p.parse()
+    compilation = Compilation(p.get_frames(), p.get_static_area(), diagnostics)
+    if cache is not None:
+        cache.store(key, compilation)
+    return compilation
+
+def compile_many(texts, max_workers=None, buffered=False, cache=None, opt_level=1):
+    """Compile Many Sources
+
+    Compiles the program texts on a pool of threads and returns their
+    compilations in the order of the texts.
+
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda text: compile_source(text, buffered, cache, opt_level), texts))
+
+_worker = None
+
+def _init_worker(text, pratt, opt_level):
+    global _worker
+    p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level), pratt=pratt, lazy=True)
+    p.parse()
+    _worker = (p, persist.Registry(p))
+    # the declarations stay with the worker's parser, keep the collector off them
+    gc.freeze()
+
+def _share_worker(p, registry):
+    global _worker
+    _worker = (p, registry)
+    gc.freeze()
+
+def _compile_bodies(names):
+    p, registry = _worker
+    diagnostics = p.get_diagnostics()
+    start = len(diagnostics)
+    frames = [p.get_frame(name) for name in names]
+    return persist.dumps((frames, diagnostics[start:]), registry)
+
+def compile_parallel(text, max_workers=None, pratt=False, opt_level=1):
+    """Compile Source in Parallel
+
+    Parses the declarations of one program text skipping the function
+    bodies, then parses the bodies and generates their three address code
+    on a pool of processes. Forked processes share the parsed declarations
+    of the parent, otherwise each process parses them once on its own. The
+    frames come back in batches and are merged in the order of the function
+    definitions, and the diagnostics are merged in the order of their lines.
+    As with compile_source, the frames hold no code when an error was
+    reported, and the calls are inlined once every frame is merged.
+
+    """
+    p = parser.Parser(lexer.Lexer(text), ctx=context.Context(opt_level), pratt=pratt, lazy=True)
+    p.parse()
+    names = [str(word) for word in p.get_pending_functions()]
+    if not names:
+        return Compilation(p.get_frames(), p.get_static_area(), p.get_diagnostics())
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    size = max(1, len(names) // (max_workers * 4))
+    batches = [names[i:i + size] for i in range(0, len(names), size)]
+    registry = persist.Registry(p)
+    # the default method without fixing it for the rest of the process
+    method = multiprocessing.get_start_method(allow_none=True) or multiprocessing.get_all_start_methods()[0]
+    mp_context = multiprocessing.get_context(method)
+    if method == 'fork':
+        initializer, initargs = _share_worker, (p, registry)
+    else:
+        initializer, initargs = _init_worker, (text, pratt, opt_level)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=initializer,
+                             initargs=initargs) as pool:
+        for data in pool.map(_compile_bodies, batches):
+            frames, diagnostics = persist.loads(data, registry)
+            for frame in frames:
+                p.merge_frame(frame)
+            p.get_diagnostics().extend(diagnostics)
+    return Compilation(p.get_frames(), p.get_static_area(), p.get_diagnostics())
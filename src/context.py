@@ -0,0 +1,65 @@
+__author__ = 'ZhangJingtian'
+import errors
+import threading
+
+class Context(object):
+    """Context class
+
+    Holds the state of one compilation: the line of the token being parsed,
+    the iteration statement enclosing the statement being parsed, the
+    diagnostics reported so far and the optimization level, 0 leaving the
+    code as lowered, 1 cleaning up its control flow and removing its dead
+    code, and 2 also propagating its constants in static single assignment
+    form, eliminating its tail calls, rotating its loops, hoisting their
+    invariant code and reducing their induction variables, and 3 also
+    inlining the calls. A context is made current for the running thread
+    with the 'with' statement, so the ast nodes built meanwhile read their
+    line from it and several compilations can run in one process.
+
+    """
+    def __init__(self, opt_level=1):
+        super(Context, self).__init__()
+        self.line       = 1
+        self.enclosing  = None
+        self.diagnostics= []
+        self.opt_level  = opt_level
+
+    def error(self, kind, msg, line):
+        """Report Error
+
+        Records an error of the given kind as a diagnostic.
+
+        """
+        diagnostic = errors.Diagnostic(kind, msg, line)
+        self.diagnostics.append(diagnostic)
+        return diagnostic
+
+    def __enter__(self):
+        _stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _stack().pop()
+        return False
+
+_local   = threading.local()
+_default = Context()
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = []
+        _local.stack = stack
+    return stack
+
+def current():
+    """Current Context
+
+    Returns the context made current on the running thread, or a shared
+    default one outside of any compilation.
+
+    """
+    stack = _stack()
+    if stack:
+        return stack[-1]
+    return _default
@@ -0,0 +1,449 @@
+__author__ = 'ZhangJingtian'
+import il
+import ty
+from array import array
+
+class Variables(object):
+    """Variables class
+
+    Numbers the variables of a frame for the bitsets of the dataflow
+    problems: the symbols of the code come first and temporary n gets the
+    bit after them, so that the sets of the variables that outlive a block,
+    mostly symbols, stay short ints. Memory holds the bits of the symbols
+    that code may reach without naming them: the globals, the locals whose
+    address is taken and the arrays and structs. For every code it records
+    the bit of the variable it defines (-1 for none), the bitset of the
+    variables it uses, and whether it may change memory.
+
+    """
+    def __init__(self, frame):
+        super(Variables, self).__init__()
+        table = frame.get_tacode_table()
+        self.symbols = len(table.symbols)
+        self.count   = self.symbols + len(table.temps)
+        local = set(frame.get_locals())
+        memory = 0
+        for i, id_obj in enumerate(table.symbols):
+            if id_obj not in local or type(id_obj.get_type()) in (ty.Array, ty.Struct):
+                memory = memory | 1 << i
+        n = len(table)
+        ops, opers, args1, args2, args3 = table.ops, table.opers, table.arg1, table.arg2, table.arg3
+        bit = self.bit
+        for i in range(n):
+            if ops[i] == il.Tacode.UNARY and opers[i] == Variables.ADDRESS:
+                b = bit(args1[i])
+                if 0 <= b < self.symbols:
+                    memory = memory | 1 << b
+        self.memory   = memory
+        self.defs     = array('i', [-1]) * n
+        self.uses     = [0] * n
+        self.clobbers = bytearray(n)
+        for i in range(n):
+            op = ops[i]
+            uses = 0
+            b = bit(args1[i])
+            if b >= 0:
+                uses = 1 << b
+            b = bit(args2[i])
+            if b >= 0:
+                uses = uses | 1 << b
+            if op in Variables.Defining:
+                self.defs[i] = bit(args3[i])
+                if op == il.Tacode.LOAD or (op == il.Tacode.UNARY and opers[i] == Variables.DEREF):
+                    uses = uses | memory
+            elif op == il.Tacode.STORE or op == il.Tacode.STOREPTR:
+                b = bit(args3[i])
+                if b >= 0:
+                    uses = uses | 1 << b
+                self.clobbers[i] = 1
+            elif op == il.Tacode.CALL or op == il.Tacode.TAILCALL:
+                uses = uses | memory
+                self.clobbers[i] = 1
+            elif op == il.Tacode.RETURN:
+                uses = memory
+            self.uses[i] = uses
+
+    def bit(self, arg):
+        """Variable Bit
+
+        Gets the bit of the variable an operand id names, -1 for constants
+        and unused operands.
+
+        """
+        if arg < 0:
+            return -1
+        kind = arg & 3
+        if kind == il.Operand.TEMP:
+            return self.symbols + (arg >> 2)
+        elif kind == il.Operand.SYMBOL:
+            return arg >> 2
+        return -1
+
+    def operand(self, bit):
+        """Variable Operand
+
+        Gets the operand id of the variable numbered bit.
+
+        """
+        if bit < self.symbols:
+            return bit << 2 | il.Operand.SYMBOL
+        return (bit - self.symbols) << 2 | il.Operand.TEMP
+
+class Problem(object):
+    """Problem class
+
+    The base class of the bit vector dataflow problems over the control
+    flow graph of a frame. A problem gives its direction, whether its meet
+    is union or intersection, the value at the boundary, and the gen and
+    kill bitsets of every block; solve() then finds the fixed point of
+
+        out = gen | (in & ~kill)
+
+    taking in as the meet of the outs of the predecessors (successors for a
+    backward problem). The blocks are visited in reverse postorder (its
+    reverse for a backward problem), going over the order again while any
+    block is pending, and a block is only pending when a block it meets
+    has changed. The ins and outs are given in code order whatever the
+    direction: ins[b] holds at the start of block b and outs[b] at its end.
+
+    """
+    FORWARD  = 0
+    BACKWARD = 1
+
+    def __init__(self, frame, direction, union=True):
+        super(Problem, self).__init__()
+        self.frame     = frame
+        self.graph     = frame.get_cfg()
+        self.direction = direction
+        self.union     = union
+        self.ins       = None
+        self.outs      = None
+
+    def universe(self):
+        """Universe
+
+        The bitset of every fact of the problem, the start value of the
+        blocks under an intersection meet.
+
+        """
+        return 0
+
+    def boundary(self):
+        return 0
+
+    def transfer(self):
+        """Gen and Kill
+
+        Returns the lists of the gen and kill bitsets of the blocks.
+
+        """
+        raise NotImplementedError()
+
+    def solve(self):
+        graph = self.graph
+        n = len(graph)
+        gens, kills = self.transfer()
+        order = graph.reverse_postorder()
+        if self.direction == Problem.FORWARD:
+            sources, targets = graph.preds, graph.succs
+            boundary = bytearray(n)
+            if n:
+                boundary[0] = 1
+        else:
+            order = order[::-1]
+            sources, targets = graph.succs, graph.preds
+            boundary = bytearray([not succs for succs in graph.succs])
+        top = self.universe() if not self.union else 0
+        union = self.union
+        edge = self.boundary()
+        ins  = [top] * n
+        outs = [top] * n
+        pending = bytearray(n)
+        for b in order:
+            pending[b] = 1
+        changed = True
+        while changed:
+            changed = False
+            for b in order:
+                if not pending[b]:
+                    continue
+                pending[b] = 0
+                value = edge if boundary[b] else None
+                for s in sources[b]:
+                    if value is None:
+                        value = outs[s]
+                    elif union:
+                        value = value | outs[s]
+                    else:
+                        value = value & outs[s]
+                if value is None:
+                    value = top
+                ins[b] = value
+                out = gens[b] | (value & ~kills[b])
+                if out != outs[b]:
+                    outs[b] = out
+                    changed = True
+                    for t in targets[b]:
+                        pending[t] = 1
+        if self.direction == Problem.FORWARD:
+            self.ins, self.outs = ins, outs
+        else:
+            self.ins, self.outs = outs, ins
+        return self
+
+class Liveness(Problem):
+    """Liveness class
+
+    The variables live at the start and end of every block: those some
+    path on reads before writing. Memory is live at the return and across
+    calls and loads.
+
+    """
+    def __init__(self, frame, variables=None):
+        super(Liveness, self).__init__(frame, Problem.BACKWARD)
+        self.variables = variables or Variables(frame)
+
+    def boundary(self):
+        return self.variables.memory
+
+    def transfer(self):
+        graph = self.graph
+        defs, uses = self.variables.defs, self.variables.uses
+        gens, kills = [], []
+        for b in range(len(graph)):
+            gen = kill = 0
+            for i in range(graph.starts[b + 1] - 1, graph.starts[b] - 1, -1):
+                d = defs[i]
+                if d >= 0:
+                    gen = gen & ~(1 << d)
+                    kill = kill | 1 << d
+                gen = gen | uses[i]
+            gens.append(gen)
+            kills.append(kill)
+        return gens, kills
+
+    def live_after(self, b):
+        """Live After
+
+        Walks the codes of block b backwards, yielding the index of each
+        code with the variables live right after it.
+
+        """
+        defs, uses = self.variables.defs, self.variables.uses
+        live = self.outs[b]
+        for i in range(self.graph.starts[b + 1] - 1, self.graph.starts[b] - 1, -1):
+            yield i, live
+            d = defs[i]
+            if d >= 0:
+                live = live & ~(1 << d)
+            live = live | uses[i]
+
+class ReachingDefinitions(Problem):
+    """ReachingDefinitions class
+
+    The definitions that reach the start and end of every block. Each code
+    defining a variable is a definition, numbered in code order, and so is
+    each code that may change memory; the latter define every memory
+    variable and are never killed, as they may leave any of them unchanged.
+    The symbols also have one definition each at the entry, numbered after
+    the codes, standing for their value there. defines holds the
+    definitions of every variable.
+
+    """
+    def __init__(self, frame, variables=None):
+        super(ReachingDefinitions, self).__init__(frame, Problem.FORWARD)
+        self.variables = variables or Variables(frame)
+        variables = self.variables
+        self.codes = array('i')
+        self.numbers = array('i', [-1]) * len(variables.defs)
+        self.defines = [0] * variables.count
+        self._kills  = [0] * variables.count
+        for i, d in enumerate(variables.defs):
+            if d >= 0 or variables.clobbers[i]:
+                self.numbers[i] = len(self.codes)
+                self.codes.append(i)
+        self.entries = len(self.codes)
+        memory = variables.memory
+        for i in self.codes:
+            d = variables.defs[i]
+            if d >= 0:
+                self.defines[d] = self.defines[d] | 1 << self.numbers[i]
+                self._kills[d] = self._kills[d] | 1 << self.numbers[i]
+            else:
+                clobber = 1 << self.numbers[i]
+                for v in _bits(memory):
+                    self.defines[v] = self.defines[v] | clobber
+        for v in range(variables.symbols):
+            self.defines[v] = self.defines[v] | 1 << (self.entries + v)
+            self._kills[v] = self._kills[v] | 1 << (self.entries + v)
+
+    def boundary(self):
+        return ((1 << self.variables.symbols) - 1) << self.entries
+
+    def transfer(self):
+        graph = self.graph
+        defs, numbers, killed = self.variables.defs, self.numbers, self._kills
+        gens, kills = [], []
+        for b in range(len(graph)):
+            gen = kill = 0
+            for i in range(graph.starts[b], graph.starts[b + 1]):
+                n = numbers[i]
+                if n < 0:
+                    continue
+                d = defs[i]
+                if d >= 0:
+                    gen = gen & ~killed[d]
+                    kill = kill | killed[d]
+                gen = gen | 1 << n
+            gens.append(gen)
+            kills.append(kill & ~gen)
+        return gens, kills
+
+    def is_entry(self, number):
+        return number >= self.entries
+
+class AvailableExpressions(Problem):
+    """AvailableExpressions class
+
+    The binary and unary expressions computed on every path to the start
+    and end of every block, with none of their operands written since.
+    Equal expressions share a bit. Loads and the expressions of memory
+    variables are left out, as stores and calls may change them unseen.
+
+    """
+    def __init__(self, frame, variables=None):
+        super(AvailableExpressions, self).__init__(frame, Problem.FORWARD, union=False)
+        self.variables = variables or Variables(frame)
+        variables = self.variables
+        table = frame.get_tacode_table()
+        self.expressions = {}
+        self.numbers = array('i', [-1]) * len(table)
+        self.operands = [0] * variables.count
+        for i in range(len(table)):
+            op = table.ops[i]
+            if op != il.Tacode.BINARY and op != il.Tacode.UNARY:
+                continue
+            if op == il.Tacode.UNARY and table.opers[i] == Variables.DEREF:
+                continue
+            operands = variables.uses[i]
+            if operands & variables.memory:
+                continue
+            key = (op, table.opers[i], table.arg1[i], table.arg2[i])
+            n = self.expressions.get(key)
+            if n is None:
+                n = self.expressions[key] = len(self.expressions)
+                for v in _bits(operands):
+                    self.operands[v] = self.operands[v] | 1 << n
+            self.numbers[i] = n
+
+    def universe(self):
+        return (1 << len(self.expressions)) - 1
+
+    def transfer(self):
+        graph = self.graph
+        defs, operands, numbers = self.variables.defs, self.operands, self.numbers
+        gens, kills = [], []
+        for b in range(len(graph)):
+            gen = kill = 0
+            for i in range(graph.starts[b], graph.starts[b + 1]):
+                n = numbers[i]
+                if n >= 0:
+                    gen = gen | 1 << n
+                d = defs[i]
+                if d >= 0:
+                    gen = gen & ~operands[d]
+                    kill = kill | operands[d]
+            gens.append(gen)
+            kills.append(kill & ~gen)
+        return gens, kills
+
+class AvailableCopies(Problem):
+    """AvailableCopies class
+
+    The copies 'x = y' made on every path to the start and end of every
+    block, with neither x nor y written since, so that x may be read from
+    y instead. y is a variable or a constant. Equal copies share a bit, and
+    copies to or from memory variables are left out. copies holds the
+    destination and source operand ids of every copy, and targets the
+    copies into every variable.
+
+    """
+    def __init__(self, frame, variables=None):
+        super(AvailableCopies, self).__init__(frame, Problem.FORWARD, union=False)
+        self.variables = variables or Variables(frame)
+        variables = self.variables
+        table = frame.get_tacode_table()
+        self.copies  = []
+        self.numbers = array('i', [-1]) * len(table)
+        self.targets = [0] * variables.count
+        self._kills  = [0] * variables.count
+        numbers = {}
+        for i in range(len(table)):
+            if table.ops[i] != il.Tacode.ASSIGN:
+                continue
+            src, dst = table.arg1[i], table.arg3[i]
+            d, s = variables.bit(dst), variables.bit(src)
+            if d < 0 or d == s or variables.memory >> d & 1:
+                continue
+            if s >= 0 and variables.memory >> s & 1:
+                continue
+            n = numbers.get((dst, src))
+            if n is None:
+                n = numbers[(dst, src)] = len(self.copies)
+                self.copies.append((dst, src))
+                self.targets[d] = self.targets[d] | 1 << n
+                self._kills[d] = self._kills[d] | 1 << n
+                if s >= 0:
+                    self._kills[s] = self._kills[s] | 1 << n
+            self.numbers[i] = n
+
+    def universe(self):
+        return (1 << len(self.copies)) - 1
+
+    def transfer(self):
+        graph = self.graph
+        defs, numbers, killed = self.variables.defs, self.numbers, self._kills
+        gens, kills = [], []
+        for b in range(len(graph)):
+            gen = kill = 0
+            for i in range(graph.starts[b], graph.starts[b + 1]):
+                d = defs[i]
+                if d >= 0:
+                    gen = gen & ~killed[d]
+                    kill = kill | killed[d]
+                n = numbers[i]
+                if n >= 0:
+                    gen = gen | 1 << n
+            gens.append(gen)
+            kills.append(kill & ~gen)
+        return gens, kills
+
+    def step(self, i, available):
+        """Step
+
+        Gets the copies available after code i from those before it.
+
+        """
+        d = self.variables.defs[i]
+        if d >= 0:
+            available = available & ~self._kills[d]
+        n = self.numbers[i]
+        if n >= 0:
+            available = available | 1 << n
+        return available
+
+def _bits(bitset):
+    """Set Bits
+
+    Yields the numbers of the bits set in bitset, lowest first.
+
+    """
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset = bitset ^ low
+
+Variables.ADDRESS  = il.Tacode.OperatorIds['&']
+Variables.DEREF    = il.Tacode.OperatorIds['*']
+Variables.Defining = (il.Tacode.ASSIGN, il.Tacode.BINARY, il.Tacode.UNARY,
+                      il.Tacode.LOAD, il.Tacode.LDRET)
@@ -29,4 +29,23 @@ class ParserTypeError(ParserError):
 
     Thrown when a type error occurs in the parser.
     """
-    pass
\ No newline at end of file
+    pass
+
+
+class Diagnostic(object):
+    """Diagnostic class
+
+    An error reported while compiling, with its kind, message and line.
+    """
+    SYNTAX  = 'syntax'
+    NAME    = 'name'
+    TYPE    = 'type'
+
+    def __init__(self, kind, msg, line):
+        super(Diagnostic, self).__init__()
+        self.kind = kind
+        self.msg  = msg
+        self.line = line
+
+    def __str__(self):
+        return 'Error: "%s", line %d' % (self.msg, self.line)
@@ -1,7 +1,39 @@
 __author__ = 'ZhangJingtian'
 import ast
+import cfg
+from array import array
 
 class Tacode(object):
+    """Tacode class
+
+    The opcodes of the three address code and the operators they carry.
+    Each code is a quadruple of the opcode, an operator and three operands,
+    laid out as follows ('-' for an unused field):
+
+        NOP                 -               nop
+        ASSIGN              arg3 = arg1
+        IFFALSE, IFTRUE     iffalse arg1 oper arg2 goto arg3
+        GOTO                goto arg3
+        PARAM               param arg1
+        CALL                call arg1, arg2
+        LDRET               loadret arg3
+        STRET               saveret arg1
+        RETURN              ret
+        TAILCALL            tailcall arg1, arg2
+        BINARY              arg3 = arg1 oper arg2
+        UNARY               arg3 = oper arg1
+        LOAD                arg3 = arg1 offset arg2
+        STORE               arg1 offset arg2 = arg3
+        STOREPTR            oper arg1 = arg3
+
+    A tailcall calls arg1 as a call does, then returns what it returns from
+    the frame, which the callee may reuse.
+
+    Jump targets are label numbers, the other operands are operand ids.
+    LOAD and STORE carry the access operator ('.', '->' or '[]').
+
+    """
+    NOP    = 0
     ASSIGN = 1
     IFFALSE= 2
     IFTRUE = 3
@@ -11,140 +43,294 @@ class Tacode(object):
     LDRET  = 7
     STRET  = 8
     RETURN = 9
-    def __init__(self, op=None, arg1=None, arg2=None, arg3=None):
-        self.op   = op
-        self.arg1 = arg1
-        self.arg2 = arg2
-        self.arg3 = arg3
-
-    def get_opcode(self):
-        return self.op
-
-class Assign(Tacode):
-    def __init__(self, dst, src):
-        super(Assign, self).__init__(op=Tacode.ASSIGN, arg1=dst, arg2=src)
-    def __str__(self):
-        return str(self.arg1) + " " + "=" + " " + str(self.arg2)
-
-class IfFalse(Tacode):
-    def __init__(self, rel, dst):
-        super(IfFalse, self).__init__(op=Tacode.IFFALSE, arg1=rel, arg2=dst)
-
-    def __str__(self):
-        return "iffalse" + " " + str(self.arg1) + " " + "goto" + " " + str(self.arg2)
-
-class IfTrue(Tacode):
-    def __init__(self, rel, dst):
-        super(IfTrue, self).__init__(op=Tacode.IFTRUE, arg1=rel, arg2=dst)
-
-    def __str__(self):
-        return "iftrue" + " " + str(self.arg1) + " " + "goto" + " " + str(self.arg2)
-
-class Goto(Tacode):
-    def __init__(self, dst):
-        super(Goto, self).__init__(op=Tacode.GOTO, arg1=dst)
-
-    def __str__(self):
-        return "goto" + " " + str(self.arg1)
-
-class Param(Tacode):
-    def __init__(self, param):
-        super(Param, self).__init__(op=Tacode.PARAM, arg1=param)
-
-    def __str__(self):
-        return "param" + " " + str(self.arg1)
-
-class Call(Tacode):
-    def __init__(self, call, n):
-        super(Call, self).__init__(op=Tacode.CALL, arg1=call, arg2=n)
-
-    def __str__(self):
-        return "call" + " " + str(self.arg1) + "," + " " + str(self.arg2)
-
-class LoadRet(Tacode):
-    def __init__(self, temp):
-        super(LoadRet, self).__init__(op=Tacode.LDRET, arg1=temp)
-
-    def __str__(self):
-        return "loadret" + " " + str(self.arg1)
-
-class StoreRet(Tacode):
-    def __init__(self, ret):
-        super(StoreRet, self).__init__(op=Tacode.STRET, arg1=ret)
-
-    def __str__(self):
-        return "saveret" + " " + str(self.arg1)
-
-class Ret(Tacode):
+    BINARY = 10
+    UNARY  = 11
+    LOAD   = 12
+    STORE  = 13
+    STOREPTR = 14
+    TAILCALL = 15
+
+    Operators = ('', '+', '-', '*', '/', '%', '<<', '>>', '&', '|', '^',
+                 '<', '>', '<=', '>=', '==', '!=', '.', '->', '[]')
+
+    @classmethod
+    def operator(cls, token):
+        """Operator Number
+
+        Maps an operator token onto its index in Tacode.Operators.
+
+        """
+        return Tacode.OperatorIds[str(token)]
+
+class Operand(object):
+    """Operand class
+
+    Operand ids keep the table of the operand in their two low bits and the
+    index within that table above them: temporaries by number, constants by
+    value and symbols by identifier. NONE stands for an unused operand.
+
+    """
+    NONE   = -1
+    TEMP   = 0
+    CONST  = 1
+    SYMBOL = 2
+
+class TacodeTable(object):
+    """TacodeTable class
+
+    Holds the three address code of a frame in parallel arrays: the opcode,
+    the operator and the three operands of every code, with the tables of
+    temporaries, constants and symbols the operand ids index. The labels
+    set on the codes are kept in emission order in one array, and the index
+    of the first label of each code in another, so the codes are walked
+    with an integer cursor and no object per code. Every label number maps
+    to the code it is set on, or -1 while it is not emitted. The version
+    counts the changes to the codes, for the analyses cached on them.
+
+    """
     def __init__(self):
-        super(Ret, self).__init__(op=Tacode.RETURN)
-
-    def __str__(self):
-        return "ret"
-
-class Label(object):
-    def __init__(self, num):
-        super(Label, self).__init__()
-        self.num = num
-
-    def set_code(self, code):
-        self.code = code
-
-    def __str__(self):
-        return "l" + str(self.num)
+        super(TacodeTable, self).__init__()
+        self.ops     = array('B')
+        self.opers   = array('B')
+        self.arg1    = array('i')
+        self.arg2    = array('i')
+        self.arg3    = array('i')
+        self.marks   = array('i')
+        self.firsts  = array('i')
+        self.places  = array('i')
+        self.temps   = []
+        self.consts  = []
+        self.symbols = []
+        self._const_ids  = {}
+        self._symbol_ids = {}
+        self._mark   = 0
+        self.version = 0
+
+    def operand(self, node):
+        """Operand Id
+
+        Returns the operand id of a temporary, constant or symbol node,
+        adding it to its table on the first use.
+
+        """
+        if node is None:
+            return Operand.NONE
+        node_type = type(node)
+        if node_type is ast.Temporary:
+            return node.get_num() << 2 | Operand.TEMP
+        if node_type is ast.Constant:
+            return self.constant(node.get_value())
+        index = self._symbol_ids.get(node)
+        if index is None:
+            index = self._symbol_ids[node] = len(self.symbols)
+            self.symbols.append(node)
+        return index << 2 | Operand.SYMBOL
+
+    def constant(self, value):
+        """Constant Id
+
+        Returns the operand id of the integer constant value.
+
+        """
+        index = self._const_ids.get(value)
+        if index is None:
+            index = self._const_ids[value] = len(self.consts)
+            self.consts.append(value)
+        return index << 2 | Operand.CONST
 
-class LabelSet(object):
-    def __init__(self):
-        self.labels = list()
-
-    def append(self, label):
-        self.labels.append(label)
-
-    def get_labels(self):
-        return self.labels
-
-    def __str__(self):
-        s = ""
-        for label in self.labels:
-            s = s + str(label) + ":"
-        return s
+    def new_label(self):
+        self.places.append(-1)
+        return len(self.places) - 1
+
+    def place(self, label):
+        """Place Label
+
+        Sets the label on the next code emitted.
+
+        """
+        self.marks.append(label)
+        self.places[label] = len(self.ops)
+        self.version = self.version + 1
+
+    def append(self, op, oper=0, arg1=Operand.NONE, arg2=Operand.NONE, arg3=Operand.NONE):
+        self.ops.append(op)
+        self.opers.append(oper)
+        self.arg1.append(arg1)
+        self.arg2.append(arg2)
+        self.arg3.append(arg3)
+        self.firsts.append(self._mark)
+        self._mark = len(self.marks)
+        self.version = self.version + 1
+
+    def touch(self):
+        """Touch
+
+        Marks the codes changed, so the analyses cached on them are made
+        again. Passes writing the arrays directly call it.
+
+        """
+        self.version = self.version + 1
+
+    def remove(self, i):
+        """Remove Code
+
+        Turns the code at index i into a nop, dropped by compact().
+
+        """
+        self.ops[i]   = Tacode.NOP
+        self.opers[i] = 0
+        self.arg1[i]  = Operand.NONE
+        self.arg2[i]  = Operand.NONE
+        self.arg3[i]  = Operand.NONE
+        self.version  = self.version + 1
+
+    def unplace(self, label):
+        """Unplace Label
+
+        Takes the label off its code; compact() drops it from the marks.
+
+        """
+        self.places[label] = -1
+        self.version = self.version + 1
+
+    def compact(self):
+        """Compact
+
+        Drops the nops and the unplaced labels. The labels of a dropped
+        code move on to the code after it, and a nop is only kept at the
+        end when labels are left to hold.
+
+        """
+        n = len(self.ops)
+        ops, opers, arg1, arg2, arg3 = self.ops, self.opers, self.arg1, self.arg2, self.arg3
+        marks, firsts, places, mark = self.marks, self.firsts, self.places, self._mark
+        self.reset()
+        for i in range(n):
+            last = firsts[i + 1] if i + 1 < n else mark
+            for k in range(firsts[i], last):
+                if places[marks[k]] >= 0:
+                    self.place(marks[k])
+            if ops[i] != Tacode.NOP or (i == n - 1 and self._mark < len(self.marks)):
+                self.append(ops[i], opers[i], arg1[i], arg2[i], arg3[i])
+        for k in range(mark, len(marks)):
+            if places[marks[k]] >= 0:
+                self.place(marks[k])
+
+    def reset(self):
+        """Reset
+
+        Empties the codes and marks for a pass that emits them again. The
+        label numbers and the operand tables are kept.
+
+        """
+        self.ops, self.opers = array('B'), array('B')
+        self.arg1, self.arg2, self.arg3 = array('i'), array('i'), array('i')
+        self.marks, self.firsts = array('i'), array('i')
+        self._mark = 0
+        self.version = self.version + 1
+
+    def get_labels(self, i):
+        """Get Labels
+
+        Gets the labels set on the code at index i.
+
+        """
+        if i + 1 < len(self.firsts):
+            return self.marks[self.firsts[i]:self.firsts[i + 1]]
+        return self.marks[self.firsts[i]:self._mark]
+
+    def get_type(self, arg):
+        """Get Type
+
+        Gets the type of a temporary or symbol operand.
+
+        """
+        if arg & 3 == Operand.TEMP:
+            return self.temps[arg >> 2].get_type()
+        return self.symbols[arg >> 2].get_type()
+
+    def format_operand(self, arg):
+        kind = arg & 3
+        if kind == Operand.TEMP:
+            return "t" + str(arg >> 2)
+        elif kind == Operand.CONST:
+            return str(self.consts[arg >> 2])
+        return str(self.symbols[arg >> 2])
+
+    def format(self, i):
+        """Format Code
+
+        Formats the code at index i with its labels as a line of text.
+
+        """
+        op   = self.ops[i]
+        oper = Tacode.Operators[self.opers[i]]
+        arg1, arg2, arg3 = self.arg1[i], self.arg2[i], self.arg3[i]
+        fmt  = self.format_operand
+        if op == Tacode.ASSIGN:
+            code = "%s = %s" % (fmt(arg3), fmt(arg1))
+        elif op == Tacode.BINARY:
+            code = "%s = %s %s %s" % (fmt(arg3), fmt(arg1), oper, fmt(arg2))
+        elif op == Tacode.UNARY:
+            code = "%s = %s%s" % (fmt(arg3), oper, fmt(arg1))
+        elif op == Tacode.LOAD:
+            code = "%s = %s offset %s" % (fmt(arg3), fmt(arg1), fmt(arg2))
+        elif op == Tacode.STORE:
+            code = "%s offset %s = %s" % (fmt(arg1), fmt(arg2), fmt(arg3))
+        elif op == Tacode.STOREPTR:
+            code = "%s%s = %s" % (oper, fmt(arg1), fmt(arg3))
+        elif op == Tacode.IFFALSE:
+            code = "iffalse %s %s %s goto l%d" % (fmt(arg1), oper, fmt(arg2), arg3)
+        elif op == Tacode.IFTRUE:
+            code = "iftrue %s %s %s goto l%d" % (fmt(arg1), oper, fmt(arg2), arg3)
+        elif op == Tacode.GOTO:
+            code = "goto l%d" % arg3
+        elif op == Tacode.PARAM:
+            code = "param " + fmt(arg1)
+        elif op == Tacode.CALL:
+            code = "call %s, %s" % (fmt(arg1), fmt(arg2))
+        elif op == Tacode.LDRET:
+            code = "loadret " + fmt(arg3)
+        elif op == Tacode.STRET:
+            code = "saveret " + fmt(arg1)
+        elif op == Tacode.RETURN:
+            code = "ret"
+        elif op == Tacode.TAILCALL:
+            code = "tailcall %s, %s" % (fmt(arg1), fmt(arg2))
+        else:
+            code = "nop"
+        labels = "".join(["l%d:" % label for label in self.get_labels(i)])
+        return labels + " " + code
 
     def __len__(self):
-        return len(self.labels)
-
-class Line(object):
-    def __init__(self, code=None):
-        self.code   = code
-        self.labels = LabelSet()
-
-    def __str__(self):
-        return str(self.labels) + " " + str(self.code)
-
-    def get_code(self):
-        return self.code
-
-    def get_label_set(self):
-        return self.labels
+        return len(self.ops)
 
 class Frame(object):
-    def __init__(self, id_obj):
+    def __init__(self, id_obj, ctx=None):
         super(Frame, self).__init__()
         self._id_obj    = id_obj
-        self._label     = 0
+        self._ctx       = ctx
         self._used      = 4
         self._local_used= 0
         self._param_used= 0
-        self._temps     = []
+        self._temp_used = 0
         self._locals    = []
-        self._table     = []
-        self._line      = Line()
+        self._table     = TacodeTable()
+        self._cfg       = None
         self._start     = self.new_label()
         self._end       = self.new_label()
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cfg'] = None
+        return state
 
     def get_frame_id(self):
         return self._id_obj
 
+    def get_context(self):
+        return self._ctx
+
     def get_frame_start(self):
         return self._start
 
@@ -154,12 +340,53 @@ class Frame(object):
     def get_tacode_table(self):
         return self._table
 
+    def get_cfg(self):
+        """Get Control Flow Graph
+
+        Gets the control flow graph of the code, built on the first call and
+        built again once the code has changed.
+
+        """
+        if self._cfg is None or self._cfg.version != self._table.version:
+            self._cfg = cfg.Graph(self._table)
+        return self._cfg
+
+    def get_locals(self):
+        return self._locals
+
+    def clear_code(self):
+        """Clear Code
+
+        Drops the three address code of the frame, leaving it as a frame
+        whose body was never generated.
+
+        """
+        self._table     = TacodeTable()
+        self._cfg       = None
+        self._temp_used = 0
+        self._start     = self.new_label()
+        self._end       = self.new_label()
+
     def get_local_size(self):
         return self._local_used
 
     def get_param_size(self):
         return self._param_used
 
+    def get_temp_base(self):
+        """Get Temporary Base
+
+        Gets the offset of the temporary area, which follows the locals.
+
+        """
+        return self.align_offset(self._local_used, 4) + 8
+
+    def get_temp_size(self):
+        return self._temp_used
+
+    def set_temp_size(self, size):
+        self._temp_used = size
+
     def align_offset(self, curr_offset, align):
         return(curr_offset + (align - 1))&(~(align-1))
 
@@ -178,26 +405,49 @@ class Frame(object):
             #skip oldfp pointer & return address pointer
             offset = offset + 8
         id_obj.set_offset(offset)
+        self._locals.append(id_obj)
 
     def alloc_temp(self, temp_type):
-        num = len(self._temps)
-        temp = ast.Temporary(num, temp_type)
-        self._temps.append(temp)
+        temps = self._table.temps
+        temp = ast.Temporary(len(temps), temp_type)
+        temps.append(temp)
         return temp
 
     def new_label(self):
-        l = Label(self._label)
-        self._label = self._label + 1
-        return l
+        return self._table.new_label()
+
+    def emit_code(self, op, oper=None, arg1=None, arg2=None, arg3=None):
+        """Emit Code
 
-    def emit_code(self, code):
-        self._line.code = code
-        self._table.append(self._line)
-        self._line = Line()
+        Appends a code to the table, with the operand nodes turned into
+        operand ids and the operator token into its number.
+
+        """
+        table = self._table
+        if oper is not None:
+            oper = Tacode.operator(oper)
+        else:
+            oper = 0
+        table.append(op, oper, table.operand(arg1), table.operand(arg2), table.operand(arg3))
+
+    def emit_jump(self, op, label, oper=None, arg1=None, arg2=None):
+        """Emit Jump
+
+        Appends a goto, or a conditional jump on arg1 oper arg2, to label.
+
+        """
+        table = self._table
+        if oper is not None:
+            oper = Tacode.operator(oper)
+        else:
+            oper = 0
+        table.append(op, oper, table.operand(arg1), table.operand(arg2), label)
 
     def emit_label(self, label):
-        self._line.labels.append(label)
+        self._table.place(label)
 
     def emit_end(self):
         self.emit_label(self.get_frame_end())
-        self.emit_code(Ret())
+        self.emit_code(Tacode.RETURN)
+
+Tacode.OperatorIds = dict((op, i) for i, op in enumerate(Tacode.Operators))
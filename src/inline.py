@@ -0,0 +1,256 @@
+__author__ = 'ZhangJingtian'
+import il
+import ast
+import opt
+
+class Inliner(object):
+    """Inliner class
+
+    Inlines the calls of a program whose callee's three address code is at
+    hand, cloning the callee's body into the caller in place of the call:
+    the temporaries, labels and locals of the callee get fresh ones of the
+    caller, the params become assignments to the locals of the parameters,
+    the saverets assignments to the temporary the call's result is loaded
+    into, and the rets gotos to the code after the call.
+
+    The frames are done callees first, so a callee is inlined with the
+    calls in it inlined already, and every frame calls are inlined into is
+    optimized again at the level given. The cost model weighs, for every
+    call, the codes a call costs against the codes inlining adds to the
+    caller: the benefit is the call's cost, times the number of times it
+    is estimated to run, loop_weight for every loop around it; the growth
+    is the size of the callee less the call's cost. Calls growing their
+    caller by nothing are always inlined, the others by benefit per code
+    of growth, while the benefit is at least the growth and the total
+    growth fits the budget of the caller, growth times its size but no
+    less than min_growth codes. Callees larger than limit codes and the
+    callees calling themselves are never inlined.
+
+    """
+    def __init__(self, frames, opt_level, limit=40, growth=0.5, min_growth=32, loop_weight=8):
+        super(Inliner, self).__init__()
+        self.frames      = dict((frame.get_frame_id(), frame) for frame in frames)
+        self.opt_level   = opt_level
+        self.limit       = limit
+        self.growth      = growth
+        self.min_growth  = min_growth
+        self.loop_weight = loop_weight
+        self.inlined     = 0
+
+    def run(self):
+        """Run
+
+        Inlines the calls of every frame chosen by the cost model.
+
+        Returns:
+            The frames calls were inlined into.
+        """
+        changed = []
+        for frame in self._order():
+            sites = self._choose(frame)
+            if sites:
+                self._inline(frame, sites)
+                opt.optimize(frame, self.opt_level)
+                changed.append(frame)
+                self.inlined = self.inlined + len(sites)
+        return changed
+
+    def _callees(self, frame):
+        table = frame.get_tacode_table()
+        for i in range(len(table)):
+            if table.ops[i] in Inliner.Calls and table.arg1[i] & 3 == il.Operand.SYMBOL:
+                callee = self.frames.get(table.symbols[table.arg1[i] >> 2])
+                if callee is not None:
+                    yield i, callee
+
+    def _order(self):
+        """Callees First Order
+
+        Orders the frames so every frame comes after the frames it calls,
+        the cycles of calls being broken where the walk meets them.
+
+        """
+        order = []
+        seen = set()
+        for root in self.frames.values():
+            if root in seen:
+                continue
+            seen.add(root)
+            stack = [(root, self._callees(root))]
+            while stack:
+                frame, callees = stack[-1]
+                for i, callee in callees:
+                    if callee not in seen:
+                        seen.add(callee)
+                        stack.append((callee, self._callees(callee)))
+                        break
+                else:
+                    stack.pop()
+                    order.append(frame)
+        return order
+
+    def get_size(self, frame):
+        """Get Size
+
+        Gets the number of codes of a frame, its final ret left out.
+
+        """
+        table = frame.get_tacode_table()
+        return len([op for op in table.ops if op != il.Tacode.NOP]) - 1
+
+    def _inlinable(self, callee):
+        table = callee.get_tacode_table()
+        if not len(table) or self.get_size(callee) > self.limit:
+            return False
+        return all(other is not callee for i, other in self._callees(callee))
+
+    def _choose(self, frame):
+        """Choose Calls
+
+        Picks the calls of a frame to inline by the cost model.
+
+        Returns:
+            A map from the index of every call picked to its callee.
+        """
+        table = frame.get_tacode_table()
+        graph = frame.get_cfg()
+        depths = [0] * len(graph)
+        for loop in graph.loops():
+            for b in loop.blocks:
+                depths[b] = depths[b] + 1
+        size = self.get_size(frame)
+        budget = max(self.min_growth, int(size * self.growth))
+        chosen = {}
+        candidates = []
+        for i, callee in self._callees(frame):
+            if callee is frame or not self._inlinable(callee):
+                continue
+            count = table.consts[table.arg2[i] >> 2]
+            if any(table.ops[i - k] != il.Tacode.PARAM for k in range(1, count + 1)):
+                continue
+            cost = count + Inliner.CALL_COST
+            growth = self.get_size(callee) - cost
+            if growth <= 0:
+                chosen[i] = callee
+                continue
+            benefit = cost * self.loop_weight ** depths[graph.block_of[i]]
+            if benefit >= growth:
+                candidates.append((-float(benefit) / growth, i, growth, callee))
+        for score, i, growth, callee in sorted(candidates, key=lambda c: c[:2]):
+            if growth <= budget:
+                chosen[i] = callee
+                budget = budget - growth
+        return chosen
+
+    def _inline(self, frame, sites):
+        """Inline
+
+        Emits the codes of a frame again with the bodies of the callees in
+        place of the calls picked.
+
+        """
+        table = frame.get_tacode_table()
+        n = len(table)
+        ops, opers, args1, args2, args3 = table.ops, table.opers, table.arg1, table.arg2, table.arg3
+        labels = [table.get_labels(i) for i in range(n)]
+        params = {}
+        fresh = {}
+        for i, callee in sites.items():
+            fresh[i] = self._locals(frame, callee)
+            protos = callee.get_frame_id().get_type().get_protos() or ()
+            count = table.consts[args2[i] >> 2]
+            for k in range(count):
+                params[i - count + k] = fresh[i][protos[k]]
+        skipped = set(i + 1 for i in sites if ops[i] == il.Tacode.CALL and ops[i + 1] == il.Tacode.LDRET)
+        table.reset()
+        for i in range(n):
+            for label in labels[i]:
+                table.place(label)
+            if i in params:
+                table.append(il.Tacode.ASSIGN, 0, args1[i], il.Operand.NONE, table.operand(params[i]))
+            elif i in sites:
+                result = args3[i + 1] if i + 1 in skipped else il.Operand.NONE
+                self._clone(frame, sites[i], fresh[i], result, ops[i] == il.Tacode.TAILCALL)
+            elif i not in skipped:
+                table.append(ops[i], opers[i], args1[i], args2[i], args3[i])
+
+    def _locals(self, frame, callee):
+        """Fresh Locals
+
+        Allocates in a frame a fresh local for every local and parameter of
+        a callee.
+
+        Returns:
+            A map from the locals of the callee to their fresh locals.
+        """
+        names = {}
+        for id_obj in callee.get_locals():
+            local = ast.Identifier(id_obj.get_word(), id_obj.get_type())
+            frame.alloc_local(local)
+            names[id_obj] = local
+        return names
+
+    def _clone(self, frame, callee, names, result, tail):
+        """Clone
+
+        Appends a copy of the body of a callee to the code of a frame, its
+        locals renamed by names and the value it saves for return going to
+        result. The body of a tailcall returns from the frame as it is,
+        while in the body of a call the tailcalls become calls whose value
+        goes to result, followed by gotos to the code after the call.
+
+        """
+        table = frame.get_tacode_table()
+        source = callee.get_tacode_table()
+        temps = {}
+        labels = {}
+        def operand(arg):
+            if arg < 0:
+                return arg
+            kind = arg & 3
+            if kind == il.Operand.TEMP:
+                temp = temps.get(arg)
+                if temp is None:
+                    temp = temps[arg] = table.operand(frame.alloc_temp(source.get_type(arg)))
+                return temp
+            if kind == il.Operand.CONST:
+                return table.constant(source.consts[arg >> 2])
+            id_obj = source.symbols[arg >> 2]
+            return table.operand(names.get(id_obj, id_obj))
+        def label(old):
+            new = labels.get(old)
+            if new is None:
+                new = labels[old] = table.new_label()
+            return new
+        after = table.new_label()
+        for j in range(len(source)):
+            for old in source.get_labels(j):
+                table.place(label(old))
+            op = source.ops[j]
+            if op == il.Tacode.NOP:
+                continue
+            if tail and op in Inliner.Leaving:
+                table.append(op, source.opers[j], operand(source.arg1[j]), operand(source.arg2[j]),
+                             il.Operand.NONE)
+            elif op == il.Tacode.TAILCALL:
+                table.append(il.Tacode.CALL, source.opers[j], operand(source.arg1[j]), operand(source.arg2[j]),
+                             il.Operand.NONE)
+                if result != il.Operand.NONE:
+                    table.append(il.Tacode.LDRET, 0, il.Operand.NONE, il.Operand.NONE, result)
+                table.append(il.Tacode.GOTO, 0, il.Operand.NONE, il.Operand.NONE, after)
+            elif op == il.Tacode.STRET:
+                if result != il.Operand.NONE:
+                    table.append(il.Tacode.ASSIGN, 0, operand(source.arg1[j]), il.Operand.NONE, result)
+            elif op == il.Tacode.RETURN:
+                table.append(il.Tacode.GOTO, 0, il.Operand.NONE, il.Operand.NONE, after)
+            elif op in opt.Jumps:
+                table.append(op, source.opers[j], operand(source.arg1[j]), operand(source.arg2[j]),
+                             label(source.arg3[j]))
+            else:
+                table.append(op, source.opers[j], operand(source.arg1[j]), operand(source.arg2[j]),
+                             operand(source.arg3[j]))
+        table.place(after)
+
+Inliner.CALL_COST = 6
+Inliner.Calls     = (il.Tacode.CALL, il.Tacode.TAILCALL)
+Inliner.Leaving   = (il.Tacode.STRET, il.Tacode.RETURN, il.Tacode.TAILCALL)
@@ -0,0 +1,233 @@
+__author__ = 'ZhangJingtian'
+import il
+import ty
+
+class Activation(object):
+    """Activation class
+
+    The state of one call being run: the frame and its code, the index of
+    the next code, the frame pointer and the values of the temporaries.
+
+    """
+    __slots__ = ('frame', 'table', 'pc', 'fp', 'temps', 'locals')
+    def __init__(self, frame, fp):
+        super(Activation, self).__init__()
+        self.frame  = frame
+        self.table  = frame.get_tacode_table()
+        self.pc     = 0
+        self.fp     = fp
+        self.temps  = [0] * len(self.table.temps)
+        self.locals = set(frame.get_locals())
+
+class Machine(object):
+    """Machine class
+
+    Runs the three address code of the frames of a program, counting the
+    codes it executes, to measure what the optimizations save where no
+    target is at hand. Memory is a map from byte addresses to 32 bit
+    words: the globals get static addresses, and every call gets a frame
+    pointer of its own, its locals and parameters lying at their offsets
+    from it. Calls go on an explicit stack of activations, so deep
+    recursion in the program does not recurse here, and a tailcall runs
+    the callee in the activation of the caller, at the same frame pointer.
+    The deepest the stack of activations grows is kept in deepest. A call
+    to a function without a body returns 0.
+
+    """
+    FRAME_SIZE = 0x10000
+    STACK_BASE = 0x1000000
+
+    def __init__(self, frames, limit=10000000):
+        super(Machine, self).__init__()
+        self.frames   = dict((frame.get_frame_id(), frame) for frame in frames)
+        self.names    = dict((str(id_obj), frame) for id_obj, frame in self.frames.items())
+        self.memory   = {}
+        self.limit    = limit
+        self.executed = 0
+        self.counts   = [0] * (il.Tacode.TAILCALL + 1)
+        self.deepest  = 0
+        self._globals = {}
+        self._static  = 0
+
+    def address(self, act, id_obj):
+        """Address
+
+        Gets the address of a symbol in the activation act.
+
+        """
+        if id_obj in act.locals:
+            return act.fp + id_obj.get_offset()
+        address = self._globals.get(id_obj)
+        if address is None:
+            id_type = id_obj.get_type()
+            address = (self._static + id_type.get_align() - 1) & ~(id_type.get_align() - 1)
+            self._static = address + max(id_type.get_width(), 4)
+            self._globals[id_obj] = address
+        return address
+
+    def value(self, act, arg):
+        kind = arg & 3
+        if kind == il.Operand.TEMP:
+            return act.temps[arg >> 2]
+        if kind == il.Operand.CONST:
+            return act.table.consts[arg >> 2]
+        id_obj = act.table.symbols[arg >> 2]
+        if type(id_obj.get_type()) in (ty.Array, ty.Struct):
+            return self.address(act, id_obj)
+        return self.memory.get(self.address(act, id_obj), 0)
+
+    def assign(self, act, arg, value):
+        value = ((value + 0x80000000) & 0xffffffff) - 0x80000000
+        if arg & 3 == il.Operand.TEMP:
+            act.temps[arg >> 2] = value
+        else:
+            self.memory[self.address(act, act.table.symbols[arg >> 2])] = value
+
+    def base(self, act, oper, arg):
+        """Access Base
+
+        Gets the address an access starts from: the address of the array
+        or struct named, or the value of the pointer for '->'.
+
+        """
+        if oper != Machine.ARROW and arg & 3 == il.Operand.SYMBOL:
+            return self.address(act, act.table.symbols[arg >> 2])
+        return self.value(act, arg)
+
+    def unsigned(self, act, arg):
+        kind = arg & 3
+        if kind == il.Operand.CONST or arg < 0:
+            return False
+        return act.table.get_type(arg) is ty.Type.UnsignedInt
+
+    def compute(self, act, oper, arg1, arg2):
+        """Compute
+
+        Applies a binary operator to two operands as the target does,
+        unsigned when either operand is.
+
+        """
+        x, y = self.value(act, arg1), self.value(act, arg2)
+        name = il.Tacode.Operators[oper]
+        if self.unsigned(act, arg1) or self.unsigned(act, arg2):
+            x, y = x & 0xffffffff, y & 0xffffffff
+        if name in ('/', '%'):
+            if y == 0:
+                raise ZeroDivisionError('division by zero in ' + str(act.frame.get_frame_id()))
+            q = abs(x) // abs(y)
+            q = q if (x < 0) == (y < 0) else -q
+            return q if name == '/' else x - y * q
+        if name in ('<<', '>>'):
+            y = y & 31
+            if name == '<<':
+                return x << y
+            return x >> y
+        return Machine.Arithmetic[name](x, y)
+
+    def call(self, name, args=()):
+        """Call
+
+        Runs the function of the given name with the given arguments and
+        returns its result. The executed codes are added to executed and
+        counts.
+
+        """
+        frame = self.names[name]
+        stack = []
+        act = self._enter(frame, Machine.STACK_BASE, args)
+        ret = 0
+        params = []
+        counts = self.counts
+        T = il.Tacode
+        while True:
+            table = act.table
+            pc = act.pc
+            if pc >= len(table):
+                op = T.RETURN
+            else:
+                op = table.ops[pc]
+                act.pc = pc + 1
+                self.executed = self.executed + 1
+                counts[op] = counts[op] + 1
+                if self.executed > self.limit:
+                    raise RuntimeError('step limit exceeded in ' + str(act.frame.get_frame_id()))
+            if op == T.ASSIGN:
+                self.assign(act, table.arg3[pc], self.value(act, table.arg1[pc]))
+            elif op == T.BINARY:
+                self.assign(act, table.arg3[pc], self.compute(act, table.opers[pc], table.arg1[pc], table.arg2[pc]))
+            elif op == T.UNARY:
+                oper, arg1 = table.opers[pc], table.arg1[pc]
+                if oper == Machine.ADDRESS:
+                    value = self.address(act, table.symbols[arg1 >> 2])
+                elif oper == Machine.DEREF:
+                    value = self.memory.get(self.value(act, arg1), 0)
+                else:
+                    value = -self.value(act, arg1)
+                self.assign(act, table.arg3[pc], value)
+            elif op == T.LOAD:
+                address = self.base(act, table.opers[pc], table.arg1[pc]) + self.value(act, table.arg2[pc])
+                self.assign(act, table.arg3[pc], self.memory.get(address, 0))
+            elif op == T.STORE:
+                address = self.base(act, table.opers[pc], table.arg1[pc]) + self.value(act, table.arg2[pc])
+                self.memory[address] = self.value(act, table.arg3[pc])
+            elif op == T.STOREPTR:
+                self.memory[self.value(act, table.arg1[pc])] = self.value(act, table.arg3[pc])
+            elif op == T.IFTRUE or op == T.IFFALSE:
+                if (self.compute(act, table.opers[pc], table.arg1[pc], table.arg2[pc]) != 0) == (op == T.IFTRUE):
+                    act.pc = table.places[table.arg3[pc]]
+            elif op == T.GOTO:
+                act.pc = table.places[table.arg3[pc]]
+            elif op == T.PARAM:
+                params.append(self.value(act, table.arg1[pc]))
+            elif op == T.CALL:
+                callee = self.frames.get(table.symbols[table.arg1[pc] >> 2])
+                args, params = params, []
+                if callee is None or not len(callee.get_tacode_table()):
+                    ret = 0
+                else:
+                    stack.append(act)
+                    act = self._enter(callee, act.fp + Machine.FRAME_SIZE, args)
+                    self.deepest = max(self.deepest, len(stack))
+            elif op == T.TAILCALL:
+                callee = self.frames.get(table.symbols[table.arg1[pc] >> 2])
+                args, params = params, []
+                if callee is not None and len(callee.get_tacode_table()):
+                    act = self._enter(callee, act.fp, args)
+                else:
+                    ret = 0
+                    if not stack:
+                        return ret
+                    act = stack.pop()
+            elif op == T.LDRET:
+                self.assign(act, table.arg3[pc], ret)
+            elif op == T.STRET:
+                ret = self.value(act, table.arg1[pc])
+            elif op == T.RETURN:
+                if not stack:
+                    return ret
+                act = stack.pop()
+
+    def _enter(self, frame, fp, args):
+        act = Activation(frame, fp)
+        protos = frame.get_frame_id().get_type().get_protos() or ()
+        for id_obj, value in zip(protos, args):
+            self.memory[fp + id_obj.get_offset()] = value
+        return act
+
+Machine.ADDRESS = il.Tacode.OperatorIds['&']
+Machine.DEREF   = il.Tacode.OperatorIds['*']
+Machine.ARROW   = il.Tacode.OperatorIds['->']
+Machine.Arithmetic = {
+    '+':  lambda x, y: x + y,
+    '-':  lambda x, y: x - y,
+    '*':  lambda x, y: x * y,
+    '&':  lambda x, y: x & y,
+    '|':  lambda x, y: x | y,
+    '^':  lambda x, y: x ^ y,
+    '<':  lambda x, y: int(x < y),
+    '>':  lambda x, y: int(x > y),
+    '<=': lambda x, y: int(x <= y),
+    '>=': lambda x, y: int(x >= y),
+    '==': lambda x, y: int(x == y),
+    '!=': lambda x, y: int(x != y),
+}
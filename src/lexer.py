@@ -1,4 +1,9 @@
 __author__ = 'ZhangJingtian'
+import os
+import re
+import sys
+import mmap
+from array import array
 
 class Tag(object):
     AND     =   256
@@ -35,6 +40,7 @@ class Tag(object):
     VOID    =   289
     UNSIGNED=   290
     WHILE   =   291
+    ERROR   =   292
 
 class Token(object):
     def __init__(self, tag):
@@ -65,13 +71,17 @@ class Num(Token):
 
 class Char(Token):
     def __init__(self, c):
-        super(Char).__init__(Tag.CHAR)
+        super(Char, self).__init__(Tag.CHAR)
         self.value = c
 
     def __str__(self):
         return str(self.value)
 
 
+Token.ADD   =   Token('+')
+Token.MUL   =   Token('*')
+Token.GT    =   Token('>')
+
 Word.AND    =   Word("&&",      Tag.AND)
 Word.OR     =   Word("||",      Tag.OR)
 Word.EQ     =   Word("==",      Tag.EQ)
@@ -82,40 +92,524 @@ Word.RS     =   Word(">>",      Tag.RS)
 Word.LS     =   Word("<<",      Tag.LS)
 Word.PTR    =   Word("->",      Tag.PTR)
 Word.TEMP   =   Word("t",       Tag.TEMP)
+Word.DOT    =   Word(".",       Tag.INDEX)
+Word.ARROW  =   Word("->",      Tag.INDEX)
+Word.INDEX  =   Word("[]",      Tag.INDEX)
+Word.CALL   =   Word("call",    Tag.FUNCTION)
+Word.CAST   =   Word("cast to", Tag.CAST)
+
+
+class InternTable(object):
+    """InternTable class
+
+    The process-wide table of words shared by every lexer. Keywords are
+    reserved once, and each identifier lexeme is mapped onto a single Word
+    whose lexeme is an interned string, so symbol tables can key on the
+    Word itself.
+
+    """
+    def __init__(self):
+        super(InternTable, self).__init__()
+        self.words = {}
+
+    def reserve(self, word):
+        self.words[word.lexeme] = word
+
+    def intern(self, lexeme):
+        """Intern Lexeme
+
+        Returns the word of the lexeme, adding an identifier word for a lexeme
+        seen for the first time.
+
+        """
+        w = self.words.get(lexeme)
+        if w is None:
+            w = self.words.setdefault(lexeme, Word(sys.intern(lexeme), Tag.ID))
+        return w
+
+    def __len__(self):
+        return len(self.words)
+
+InternTable.Shared = InternTable()
+InternTable.Shared.reserve(Word("array",      Tag.ARRAY))
+InternTable.Shared.reserve(Word("break",      Tag.BREAK))
+InternTable.Shared.reserve(Word("continue",   Tag.CONTINUE))
+InternTable.Shared.reserve(Word("cast",       Tag.CAST))
+InternTable.Shared.reserve(Word("do",         Tag.DO))
+InternTable.Shared.reserve(Word("else",       Tag.ELSE))
+InternTable.Shared.reserve(Word("function",   Tag.FUNCTION))
+InternTable.Shared.reserve(Word("if",         Tag.IF))
+InternTable.Shared.reserve(Word("int",        Tag.INT))
+InternTable.Shared.reserve(Word("null",       Tag.NULL))
+InternTable.Shared.reserve(Word("of",         Tag.OF))
+InternTable.Shared.reserve(Word("pointer",    Tag.POINTER))
+InternTable.Shared.reserve(Word("return",     Tag.RETURN))
+InternTable.Shared.reserve(Word("struct",     Tag.STRUCT))
+InternTable.Shared.reserve(Word("sizeof",     Tag.SIZEOF))
+InternTable.Shared.reserve(Word("to",         Tag.TO))
+InternTable.Shared.reserve(Word("unsigned",   Tag.UNSIGNED))
+InternTable.Shared.reserve(Word("void",       Tag.VOID))
+InternTable.Shared.reserve(Word("while",      Tag.WHILE))
 
 
 class Lexer(object):
-    line = 1
+    """Lexer class
+
+    Matches whole tokens with one compiled master pattern instead of reading the
+    text a character at a time. Every match skips the leading white space and
+    dispatches on the index of the token group that matched.
+
+    """
+    # group 1 is the white space before the token, groups 2-7 are the tokens
+    # in the order scan dispatches on them.
+    PATTERN = re.compile(r"""
+        ([ \t\n]*)
+        (?:
+            ([A-Za-z][A-Za-z0-9_]*)             # identifier or keyword
+        |   ([0-9]+)                            # number
+        |   (&&|\|\||==|!=|<=|>=|<<|>>|->)       # two character operator
+        |   '(.)'                               # character
+        |   (')                                 # unterminated character
+        |   (.)                                 # single character token
+        )?
+        """, re.VERBOSE | re.DOTALL)
+
+    OPERATORS = {
+        "&&":   Word.AND,
+        "||":   Word.OR,
+        "==":   Word.EQ,
+        "!=":   Word.NE,
+        "<=":   Word.LE,
+        ">=":   Word.GE,
+        "<<":   Word.LS,
+        ">>":   Word.RS,
+        "->":   Word.PTR,
+    }
+
     def __init__(self, text):
         super(Lexer, self).__init__()
         self.peek   = ' '
-        self.words  = {}
+        self.words  = InternTable.Shared.words
         self.text   = text
         self.cursor = 0
+        self.line   = 1
+        self.base   = 0
+        self.start  = 0
+        self.line_start = 0
+        self.tokens = {}
 
-        self.reserve(Word("array",      Tag.ARRAY))
-        self.reserve(Word("break",      Tag.BREAK))
-        self.reserve(Word("continue",   Tag.CONTINUE))
-        self.reserve(Word("cast",       Tag.CAST))
-        self.reserve(Word("do",         Tag.DO))
-        self.reserve(Word("else",       Tag.ELSE))
-        self.reserve(Word("function",   Tag.FUNCTION))
-        self.reserve(Word("if",         Tag.IF))
-        self.reserve(Word("int",        Tag.INT))
-        self.reserve(Word("null",       Tag.NULL))
-        self.reserve(Word("of",         Tag.OF))
-        self.reserve(Word("pointer",    Tag.POINTER))
-        self.reserve(Word("return",     Tag.RETURN))
-        self.reserve(Word("struct",     Tag.STRUCT))
-        self.reserve(Word("sizeof",     Tag.SIZEOF))
-        self.reserve(Word("to",         Tag.TO))
-        self.reserve(Word("unsigned",   Tag.UNSIGNED))
-        self.reserve(Word("void",       Tag.VOID))
-        self.reserve(Word("while",      Tag.WHILE))
+    def error(self, s):
+        raise Exception("lexer error at line %d, %s."%(self.line, s))
 
-    def reserve(self, word):
-        self.words[word.lexeme] = word
+    def scan(self):
+        text = self.text
+        cursor = self.cursor
+        m = self.PATTERN.match(text, cursor)
+        space = m.end(1)
+        if space != cursor:
+            lines = text.count('\n', cursor, space)
+            if lines:
+                self.line = self.line + lines
+                self.line_start = text.rfind('\n', cursor, space) + 1
+        self.start = space
+        self.cursor = m.end()
+        group = m.lastindex
+
+        if group == 2:
+            s = m.group(2)
+            w = self.words.get(s)
+            if w is None:
+                w = InternTable.Shared.intern(s)
+            return w
+        elif group == 7:
+            c = m.group(7)
+            tok = self.tokens.get(c)
+            if tok is None:
+                tok = Token(c)
+                self.tokens[c] = tok
+            return tok
+        elif group == 3:
+            return Num(int(m.group(3)))
+        elif group == 4:
+            return Lexer.OPERATORS[m.group(4)]
+        elif group == 5:
+            return Char(m.group(5))
+        elif group == 6:
+            self.error("single quota")
+        return Token(None)
+
+    def tokenize(self):
+        """Tokenize the Rest of the Text
+
+        Scans every remaining token into a TokenBuffer.
+
+        """
+        tokens = TokenBuffer()
+        index = tokens._index
+        pool = tokens.pool
+        tags = tokens.tags.append
+        values = tokens.values.append
+        lines = tokens.lines.append
+        columns = tokens.columns.append
+        starts = tokens.starts.append
+        code = TokenBuffer.code
+        while True:
+            tok = self.scan()
+            tag = tok.tag
+            key = tok
+            if tag == Tag.NUM:
+                key = tok.value
+            value = index.get(key)
+            if value is None:
+                value = len(pool)
+                pool.append(tok)
+                index[key] = value
+            tags(code(tag))
+            values(value)
+            lines(self.line)
+            columns(self.start - self.line_start)
+            starts(self.start)
+            if tag is None:
+                return tokens
+
+
+class StreamLexer(Lexer):
+    """StreamLexer class
+
+    Scans a file path or a binary file object without reading it into memory
+    as a whole. The bytes are matched through a window of chunk_size bytes;
+    whenever a match reaches the end of the window the unconsumed tail is
+    kept and the next chunk is appended, so tokens crossing a chunk boundary
+    are matched as a whole. A path is memory-mapped and the pages already
+    scanned are released. The text and cursor attributes refer to the current
+    window, base is the file offset of its first byte.
+
+    """
+    PATTERN = re.compile(Lexer.PATTERN.pattern.encode('ascii'), re.VERBOSE | re.DOTALL)
+
+    OPERATORS = dict((k.encode('ascii'), v) for k, v in Lexer.OPERATORS.items())
+
+    def __init__(self, source, chunk_size=65536):
+        super(StreamLexer, self).__init__(b"")
+        self.chunk_size = chunk_size
+        self._bwords    = {}
+        self._file      = None
+        self._map       = None
+        self._eof       = False
+        self._released  = 0
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, 'rb')
+            source = self._file
+            if os.fstat(self._file.fileno()).st_size > 0:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                source = self._map
+        self._stream    = source
+        self._refill()
+
+    def _refill(self):
+        """Refill the Window
+
+        Drops the consumed part of the window and appends the next chunk.
+
+        """
+        chunk = self._stream.read(self.chunk_size)
+        self.base = self.base + self.cursor
+        self.text = self.text[self.cursor:] + chunk
+        self.cursor = 0
+        if self._map is not None and hasattr(mmap, 'MADV_DONTNEED'):
+            end = self.base & ~(mmap.PAGESIZE - 1)
+            if end > self._released:
+                self._map.madvise(mmap.MADV_DONTNEED, self._released, end - self._released)
+                self._released = end
+        if not chunk:
+            self._eof = True
+            self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
+    def scan(self):
+        m = self.PATTERN.match(self.text, self.cursor)
+        # a match ending within two bytes of the window end may continue in
+        # the next chunk: an identifier, a number, a two character operator
+        # or a character literal.
+        while not self._eof and m.end() + 2 > len(self.text):
+            self._refill()
+            m = self.PATTERN.match(self.text, self.cursor)
+        text = self.text
+        cursor = self.cursor
+        space = m.end(1)
+        if space != cursor:
+            lines = text.count(b'\n', cursor, space)
+            if lines:
+                self.line = self.line + lines
+                self.line_start = self.base + text.rfind(b'\n', cursor, space) + 1
+        self.start = self.base + space
+        self.cursor = m.end()
+        group = m.lastindex
+
+        if group == 2:
+            b = m.group(2)
+            w = self._bwords.get(b)
+            if w is None:
+                w = InternTable.Shared.intern(b.decode('ascii'))
+                self._bwords[b] = w
+            return w
+        elif group == 7:
+            c = m.group(7)
+            tok = self.tokens.get(c)
+            if tok is None:
+                tok = Token(c.decode('latin-1'))
+                self.tokens[c] = tok
+            return tok
+        elif group == 3:
+            return Num(int(m.group(3)))
+        elif group == 4:
+            return self.OPERATORS[m.group(4)]
+        elif group == 5:
+            return Char(m.group(5).decode('latin-1'))
+        elif group == 6:
+            self.error("single quota")
+        return Token(None)
+
+
+class TokenBuffer(object):
+    """TokenBuffer class
+
+    Holds the tokens of a whole file in parallel arrays: the tag code, the
+    index of the token object in the pool, the line, the column and the start
+    offset. Equal tokens share one pool entry, so the buffer keeps a single
+    object per distinct lexeme and can be walked with an integer cursor as
+    many times as needed.
+
+    """
+    EOF     = 0
+
+    def __init__(self):
+        super(TokenBuffer, self).__init__()
+        self.tags    = array('i')
+        self.values  = array('i')
+        self.lines   = array('i')
+        self.columns = array('i')
+        self.starts  = array('i')
+        self.pool    = []
+        self._index  = {}
+
+    @classmethod
+    def code(cls, tag):
+        """Tag Code
+
+        Maps a token tag onto the integer stored in the tags array. Keyword and
+        operator tags are kept, single characters are stored negated.
+
+        """
+        if tag is None:
+            return TokenBuffer.EOF
+        elif type(tag) is str:
+            return -ord(tag)
+        return tag
+
+    def append(self, tok, line, column, start):
+        key = tok
+        if tok.tag == Tag.NUM:
+            key = tok.value
+        value = self._index.get(key)
+        if value is None:
+            value = len(self.pool)
+            self.pool.append(tok)
+            self._index[key] = value
+        self.tags.append(self.code(tok.tag))
+        self.values.append(value)
+        self.lines.append(line)
+        self.columns.append(column)
+        self.starts.append(start)
+
+    def tokenize(self):
+        return self
+
+    def token(self, i):
+        """Token at Index
+
+        Returns the token object at index i, past the end it keeps returning
+        the last (end of file) token.
+
+        """
+        if i >= len(self.values):
+            i = len(self.values) - 1
+        return self.pool[self.values[i]]
+
+    def __len__(self):
+        return len(self.tags)
+
+
+class IncrementalLexer(object):
+    """IncrementalLexer class
+
+    Keeps the token buffer of a text up to date across edits. An edit is
+    re-scanned from the last token starting before it until a new token
+    starts where an old token after the edit started (shifted by the edit):
+    the text from there on is unchanged, so the rest of the tokens are too.
+
+    The start offsets and lines of the tokens from index _gap on are stored
+    without the pending shift (_dstart, _dline) of earlier edits, so an edit
+    only touches the tokens between it and the previous edit. get_tokens
+    applies the pending shift before handing out the buffer.
+
+    """
+    def __init__(self, text):
+        super(IncrementalLexer, self).__init__()
+        self.text    = text
+        self._lexer  = Lexer(text)
+        self._tokens = self._lexer.tokenize()
+        self._gap    = len(self._tokens)
+        self._dstart = 0
+        self._dline  = 0
+
+    def _start(self, i):
+        if i >= self._gap:
+            return self._tokens.starts[i] + self._dstart
+        return self._tokens.starts[i]
+
+    def _line(self, i):
+        if i >= self._gap:
+            return self._tokens.lines[i] + self._dline
+        return self._tokens.lines[i]
+
+    def _find(self, offset):
+        """Find Offset
+
+        Returns the number of tokens starting before the offset.
+
+        """
+        lo, hi = 0, len(self._tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._start(mid) < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _shift(self, lo, hi, dstart, dline):
+        tokens = self._tokens
+        for i in range(lo, hi):
+            tokens.starts[i] += dstart
+            tokens.lines[i] += dline
+
+    def edit(self, offset, deleted, inserted):
+        """Edit the Text
+
+        Replaces deleted characters at offset with the inserted text and
+        re-scans the tokens it affects.
+
+        Returns:
+            (first, old_end, new_end): the old tokens [first, old_end) were
+            replaced by the new tokens [first, new_end).
+
+        """
+        tokens = self._tokens
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        delta = len(inserted) - deleted
+        inserted_end = offset + len(inserted)
+        count = len(tokens)
+
+        lex = self._lexer
+        lex.text = text
+        first = self._find(offset)
+        if first > 0:
+            first = first - 1
+            lex.cursor = self._start(first)
+            lex.line = self._line(first)
+            lex.line_start = lex.cursor - tokens.columns[first]
+        else:
+            lex.cursor = 0
+            lex.line = 1
+            lex.line_start = 0
+
+        index = tokens._index
+        pool = tokens.pool
+        new = []
+        old = self._find(offset + deleted)
+        while True:
+            tok = lex.scan()
+            start = lex.start
+            if start >= inserted_end:
+                while old < count and self._start(old) + delta < start:
+                    old = old + 1
+                if old < count and self._start(old) + delta == start:
+                    break
+            key = tok
+            if tok.tag == Tag.NUM:
+                key = tok.value
+            value = index.get(key)
+            if value is None:
+                value = len(pool)
+                pool.append(tok)
+                index[key] = value
+            new.append((TokenBuffer.code(tok.tag), value, lex.line, start - lex.line_start, start))
+            if tok.tag is None:
+                old = count
+                break
+
+        dline = 0
+        if old < count:
+            dline = lex.line - self._line(old)
+            dcolumn = (start - lex.line_start) - tokens.columns[old]
+            if dcolumn:
+                i, line = old, self._line(old)
+                while i < count and self._line(i) == line:
+                    tokens.columns[i] += dcolumn
+                    i = i + 1
+
+        # move the gap to the end of the re-scanned tokens: the tokens between
+        # the old gap and the edit take or give back the pending shift, then
+        # everything past the edit is pending this edit's shift as well.
+        gap = self._gap
+        if gap <= first:
+            self._shift(gap, first, self._dstart, self._dline)
+        elif gap > old and (self._dstart or self._dline):
+            self._shift(old, gap, -self._dstart, -self._dline)
+        gap = old
+        dstart, dline = self._dstart + delta, self._dline + dline
+
+        span = len(new)
+        tokens.tags[first:old]    = array('i', [t[0] for t in new])
+        tokens.values[first:old]  = array('i', [t[1] for t in new])
+        tokens.lines[first:old]   = array('i', [t[2] for t in new])
+        tokens.columns[first:old] = array('i', [t[3] for t in new])
+        tokens.starts[first:old]  = array('i', [t[4] for t in new])
+        self._gap = gap - (old - first) + span
+        self._dstart = dstart
+        self._dline = dline
+        self.text = text
+        return first, old, first + span
+
+    def get_tokens(self):
+        """Get Tokens
+
+        Applies the pending shift and returns the token buffer.
+
+        """
+        self._shift(self._gap, len(self._tokens), self._dstart, self._dline)
+        self._gap = len(self._tokens)
+        self._dstart = 0
+        self._dline = 0
+        return self._tokens
+
+
+class CharLexer(Lexer):
+    """CharLexer class
+
+    The reference scanner which reads the text one character at a time. It
+    produces the same token stream as Lexer and is kept to measure the master
+    pattern engine against.
+
+    """
     def isdigit(self, v):
         if (v is not None) and v >= '0' and v <= '9':
             return True
@@ -152,13 +646,10 @@ class Lexer(object):
         v += self.peek
         return v
 
-    def error(self, s):
-        raise Exception("lexer error at line %d, %s."%(Lexer.line, s))
-
     def scan(self):
         while self.peek == ' ' or self.peek == '\t' or self.peek == '\n':
             if self.peek == '\n':
-                Lexer.line = Lexer.line + 1
+                self.line = self.line + 1
             self.__readchar()
 
         if self.peek == '&':
@@ -205,7 +696,8 @@ class Lexer(object):
                 return Token('-')
 
         if self.peek == '\'':
-            v = self.__readchar()
+            self.__readchar()
+            v = self.peek
             if not self.__readcharc('\''):
                 self.error("single quota")
             return Char(v)
@@ -223,11 +715,7 @@ class Lexer(object):
             while self.isletterOrdigitOrline(self.peek):
                 s += self.peek
                 self.__readchar()
-            if self.words.get(s) is not None:
-                return self.words.get(s)
-            w = Word(s, Tag.ID)
-            self.words[s] = w
-            return w
+            return InternTable.Shared.intern(s)
 
         tok = Token(self.peek)
         self.peek = ' '
@@ -0,0 +1,333 @@
+__author__ = 'ZhangJingtian'
+import il
+import dataflow
+
+def rotate(frame, limit=8):
+    """Loop Rotation
+
+    Turns the loops testing at the top into loops testing at the bottom.
+    The test of a loop is the run of blocks from its header that only
+    compute and branch, up to the block the last of them falls into, the
+    body. Every latch ending in a goto to the header gets a copy of the
+    test in place of the goto, jumping back to the body, so an iteration
+    runs the test once and no goto; the test at the top stays as the guard
+    of the first iteration. Tests longer than limit codes are left, as the
+    copies would cost more than they save.
+
+    Returns:
+        The number of latches rotated.
+    """
+    table = frame.get_tacode_table()
+    graph = frame.get_cfg()
+    starts, ops, args3 = graph.starts, table.ops, table.arg3
+    plans = {}
+    for loop in graph.loops():
+        test = _test(table, graph, loop, limit)
+        if test is None:
+            continue
+        for latch in loop.latches:
+            last = starts[latch + 1] - 1
+            if ops[last] == il.Tacode.GOTO and graph.get_block(args3[last]) == loop.header:
+                plans[last] = test
+    if not plans:
+        return 0
+    n = len(table)
+    old = table.ops, table.opers, table.arg1, table.arg2, table.arg3
+    labels  = [table.get_labels(i) for i in range(n)]
+    targets = dict((i, graph.block_of[table.places[args3[i]]]) for i in range(n) if ops[i] in Jumps)
+    bodies  = {}
+    for header, body in plans.values():
+        first = labels[starts[body]]
+        bodies[body] = first[0] if len(first) else table.new_label()
+    table.reset()
+    for i in range(n):
+        for label in labels[i]:
+            table.place(label)
+        b = graph.block_of[i]
+        if i == starts[b] and b in bodies and not len(labels[i]):
+            table.place(bodies[b])
+        if i not in plans:
+            table.append(old[0][i], old[1][i], old[2][i], old[3][i], old[4][i])
+            continue
+        header, body = plans[i]
+        copies = dict((x, table.new_label()) for x in range(header + 1, body))
+        for x in range(header, body):
+            if x in copies:
+                table.place(copies[x])
+            for k in range(starts[x], starts[x + 1]):
+                arg3 = old[4][k]
+                if k in targets:
+                    if targets[k] in copies:
+                        arg3 = copies[targets[k]]
+                    elif targets[k] == body:
+                        arg3 = bodies[body]
+                table.append(old[0][k], old[1][k], old[2][k], old[3][k], arg3)
+        table.append(il.Tacode.GOTO, 0, il.Operand.NONE, il.Operand.NONE, bodies[body])
+    return len(plans)
+
+def _test(table, graph, loop, limit):
+    """Loop Test
+
+    Finds the test of a loop, as the header and body blocks, or None when
+    the header does not branch, the test is too long, or some block of it
+    is entered from outside it.
+
+    """
+    starts, ops = graph.starts, table.ops
+    header = b = loop.header
+    size = 0
+    while b in loop.blocks:
+        last = starts[b + 1] - 1
+        if ops[last] != il.Tacode.IFTRUE and ops[last] != il.Tacode.IFFALSE:
+            break
+        if any(ops[k] not in Testing for k in range(starts[b], last)):
+            break
+        size = size + starts[b + 1] - starts[b]
+        b = b + 1
+    if b == header or size > limit or b not in loop.blocks:
+        return None
+    for x in range(header, b):
+        target = graph.get_block(table.arg3[starts[x + 1] - 1])
+        if not (x < target <= b or target not in loop.blocks):
+            return None
+        if x != header and any(p < header or p >= b for p in graph.preds[x]):
+            return None
+    return header, b
+
+def hoist(frame):
+    """Loop Invariant Code Motion
+
+    Moves the codes computing the same value on every iteration of a loop
+    into a preheader, a block put before the header that only the edges
+    entering the loop go through. A code is moved when its operands are
+    constants, variables the loop does not write, or variables written by
+    codes already moved, and when it is the one code of the loop writing
+    its variable and that variable is not live into the header. Divisions
+    are never moved, as they may trap where the loop would not have run
+    them, and for the same reason loads and dereferences are only moved
+    from loops without stores, calls or writes to variables in memory,
+    and from the blocks dominating every block leaving the loop, which
+    run whenever the loop is entered. The body of a loop testing at the
+    top runs after its test, so it only dominates the exits once the loop
+    is rotated and the test at the top is left as the guard before the
+    preheader. Inner loops are done first, and the codes their preheaders
+    gain may move again out of the enclosing loop.
+
+    Returns:
+        The number of codes moved.
+    """
+    moved = 0
+    while True:
+        count = _hoist_loop(frame)
+        if not count:
+            return moved
+        moved = moved + count
+
+def _hoist_loop(frame):
+    table = frame.get_tacode_table()
+    graph = frame.get_cfg()
+    loops = graph.loops()
+    if not loops:
+        return 0
+    variables = dataflow.Variables(frame)
+    liveness = dataflow.Liveness(frame, variables).solve()
+    starts, ops, opers = graph.starts, table.ops, table.opers
+    defs, bit, memory = variables.defs, variables.bit, variables.memory
+    for loop in reversed(loops):
+        header = loop.header
+        if not _enterable(graph, ops, loop):
+            continue
+        codes = sorted(i for b in loop.blocks for i in range(starts[b], starts[b + 1]))
+        written = {}
+        clobber = False
+        for i in codes:
+            if defs[i] >= 0:
+                written[defs[i]] = written.get(defs[i], 0) + 1
+            clobber = clobber or variables.clobbers[i] or (defs[i] >= 0 and memory >> defs[i] & 1)
+        exits = [b for b in loop.blocks
+                 if ops[starts[b + 1] - 1] in Ending or any(s not in loop.blocks for s in graph.succs[b])]
+        run = set(b for b in loop.blocks if exits and all(graph.dominates(b, x) for x in exits))
+        def invariant(arg):
+            v = bit(arg)
+            return v < 0 or v in moved or (v not in written and not (clobber and memory >> v & 1))
+        moved = set()
+        hoisted = []
+        changed = True
+        while changed:
+            changed = False
+            for i in codes:
+                op, d = ops[i], defs[i]
+                if op not in Movable or d < 0 or d in moved or written[d] != 1:
+                    continue
+                if memory >> d & 1 or liveness.ins[header] >> d & 1:
+                    continue
+                if op == il.Tacode.BINARY and opers[i] in Trapping:
+                    continue
+                if op == il.Tacode.LOAD or (op == il.Tacode.UNARY and opers[i] == dataflow.Variables.DEREF):
+                    if clobber or graph.block_of[i] not in run:
+                        continue
+                if invariant(table.arg1[i]) and invariant(table.arg2[i]):
+                    moved.add(d)
+                    hoisted.append(i)
+                    changed = True
+        if hoisted:
+            entry = [(ops[k], opers[k], table.arg1[k], table.arg2[k], table.arg3[k]) for k in hoisted]
+            _preheader(table, graph, loop, entry, dict.fromkeys(hoisted), {})
+            return len(hoisted)
+    return 0
+
+def reduce_inductions(frame):
+    """Induction Variable Strength Reduction
+
+    Finds the induction variables of the loops, the variables a loop
+    writes once, adding a constant step to them, and replaces the
+    multiplications of one by a constant, or its shifts by one, with a
+    variable of their own: set to the product in the preheader, it is
+    stepped by the product of the step and the constant right after the
+    induction variable is, so a multiplication on every iteration becomes
+    an addition. The array offsets computed from the loop counters are
+    the most of them. The induction variables left used only by their own
+    step are removed.
+
+    Returns:
+        The number of codes reduced.
+    """
+    reduced = 0
+    while True:
+        count = _reduce_loop(frame)
+        if not count:
+            return reduced
+        reduced = reduced + count
+
+def _reduce_loop(frame):
+    table = frame.get_tacode_table()
+    graph = frame.get_cfg()
+    loops = graph.loops()
+    if not loops:
+        return 0
+    variables = dataflow.Variables(frame)
+    starts, ops, opers, consts = graph.starts, table.ops, table.opers, table.consts
+    args1, args2, args3 = table.arg1, table.arg2, table.arg3
+    defs, uses, bit, memory = variables.defs, variables.uses, variables.bit, variables.memory
+    for loop in reversed(loops):
+        if not _enterable(graph, ops, loop):
+            continue
+        codes = sorted(i for b in loop.blocks for i in range(starts[b], starts[b + 1]))
+        written = {}
+        for i in codes:
+            if defs[i] >= 0:
+                written[defs[i]] = written.get(defs[i], 0) + 1
+        steps = {}
+        for i in codes:
+            d = defs[i]
+            if ops[i] != il.Tacode.BINARY or d < 0 or written[d] != 1 or memory >> d & 1:
+                continue
+            arg1, arg2 = args1[i], args2[i]
+            if opers[i] == Plus and arg1 & 3 == il.Operand.CONST:
+                arg1, arg2 = arg2, arg1
+            if bit(arg1) != d or arg2 & 3 != il.Operand.CONST:
+                continue
+            if opers[i] == Plus:
+                steps[d] = (i, consts[arg2 >> 2])
+            elif opers[i] == Minus:
+                steps[d] = (i, -consts[arg2 >> 2])
+        if not steps:
+            continue
+        unused = [i for d, (i, step) in steps.items()
+                  if not any(uses[k] >> d & 1 for k in range(len(table)) if k != i)]
+        if unused:
+            for i in unused:
+                table.remove(i)
+            table.compact()
+            return len(unused)
+        reductions = {}
+        replaced = {}
+        after = {}
+        entry = []
+        for i in codes:
+            if ops[i] != il.Tacode.BINARY:
+                continue
+            arg1, arg2 = args1[i], args2[i]
+            if opers[i] == Multiply and arg1 & 3 == il.Operand.CONST:
+                arg1, arg2 = arg2, arg1
+            v = bit(arg1)
+            if v not in steps or arg2 & 3 != il.Operand.CONST:
+                continue
+            value = consts[arg2 >> 2]
+            if opers[i] == Multiply:
+                factor = value
+            elif opers[i] == Shift and 0 <= value < 32:
+                factor = 1 << value
+            else:
+                continue
+            key = (v, factor)
+            temp = reductions.get(key)
+            if temp is None:
+                temp = reductions[key] = table.operand(frame.alloc_temp(table.get_type(args3[i])))
+                entry.append((il.Tacode.BINARY, opers[i], arg1, arg2, temp))
+                step = table.constant(_wrap(steps[v][1] * factor))
+                after.setdefault(steps[v][0], []).append((il.Tacode.BINARY, Plus, temp, step, temp))
+            replaced[i] = (il.Tacode.ASSIGN, 0, temp, il.Operand.NONE, args3[i])
+        if replaced:
+            _preheader(table, graph, loop, entry, replaced, after)
+            return len(replaced)
+    return 0
+
+def _wrap(value):
+    return ((value + 0x80000000) & 0xffffffff) - 0x80000000
+
+def _enterable(graph, ops, loop):
+    """Enterable Loop
+
+    Tells whether a preheader can be put right before the header of a
+    loop, that is whether no code of the loop falls through into it.
+
+    """
+    header = loop.header
+    return header - 1 not in loop.blocks or ops[graph.starts[header] - 1] in Leaving
+
+def _preheader(table, graph, loop, entry, replaced, after):
+    """Preheader
+
+    Emits the codes again with the entry codes put before the header of
+    the loop, under the labels of the header, which gets a new label for
+    the jumps from inside the loop. The codes in replaced are emitted as
+    the code they map to, or dropped for None, and the codes in after are
+    emitted after the code they are keyed by.
+
+    """
+    n = len(table)
+    ops, opers, args1, args2, args3 = table.ops, table.opers, table.arg1, table.arg2, table.arg3
+    labels  = [table.get_labels(i) for i in range(n)]
+    targets = dict((i, graph.block_of[table.places[args3[i]]]) for i in range(n) if ops[i] in Jumps)
+    first = graph.starts[loop.header]
+    inner = table.new_label()
+    table.reset()
+    for i in range(n):
+        for label in labels[i]:
+            table.place(label)
+        if i == first:
+            for code in entry:
+                table.append(*code)
+            table.place(inner)
+        if i in replaced:
+            if replaced[i] is not None:
+                table.append(*replaced[i])
+        else:
+            arg3 = args3[i]
+            if targets.get(i) == loop.header and graph.block_of[i] in loop.blocks:
+                arg3 = inner
+            table.append(ops[i], opers[i], args1[i], args2[i], arg3)
+        for code in after.get(i, ()):
+            table.append(*code)
+
+Jumps    = (il.Tacode.GOTO, il.Tacode.IFTRUE, il.Tacode.IFFALSE)
+Leaving  = (il.Tacode.GOTO, il.Tacode.RETURN, il.Tacode.TAILCALL)
+Ending   = (il.Tacode.RETURN, il.Tacode.TAILCALL)
+Testing  = (il.Tacode.ASSIGN, il.Tacode.BINARY, il.Tacode.UNARY, il.Tacode.LOAD)
+Movable  = (il.Tacode.ASSIGN, il.Tacode.BINARY, il.Tacode.UNARY, il.Tacode.LOAD)
+Trapping = (il.Tacode.OperatorIds['/'], il.Tacode.OperatorIds['%'])
+Plus     = il.Tacode.OperatorIds['+']
+Minus    = il.Tacode.OperatorIds['-']
+Multiply = il.Tacode.OperatorIds['*']
+Shift    = il.Tacode.OperatorIds['<<']
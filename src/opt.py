@@ -0,0 +1,526 @@
+__author__ = 'ZhangJingtian'
+import il
+import ty
+import ssa
+import loops
+import dataflow
+from array import array
+
+def optimize(frame, level):
+    """Optimize
+
+    Runs the passes of an optimization level over the code of a frame:
+    level 1 cleans up the control flow, turns the multiplications by powers
+    of two into shifts, removes the dead code and the copies, and level 2
+    also eliminates the tail calls, builds the static single assignment
+    form to propagate the constants, then rotates the loops, hoists their
+    invariant code and reduces their induction variables, propagating the
+    constants and the copies again into the induction variables each round
+    starts, which the next round may reduce in turn.
+
+    """
+    if level < 1:
+        return
+    reduce_strength(frame)
+    peephole(frame)
+    while dead_code(frame):
+        peephole(frame)
+    remove_copies(frame)
+    if level < 2:
+        return
+    tail_calls(frame)
+    propagate_constants(frame)
+    loops.rotate(frame)
+    loops.hoist(frame)
+    peephole(frame)
+    while dead_code(frame):
+        peephole(frame)
+    while loops.reduce_inductions(frame):
+        propagate_constants(frame)
+
+def propagate_constants(frame):
+    """Propagate Constants
+
+    Builds the static single assignment form of the code of a frame,
+    propagates the constants through it, leaves it and removes the copies
+    it leaves.
+
+    """
+    form = ssa.Form(frame)
+    ssa.ConstantPropagation(form).solve().rewrite()
+    form.destroy()
+    remove_copies(frame)
+
+def remove_copies(frame):
+    """Remove Copies
+
+    Coalesces the temporaries into the variables they are copied to,
+    propagates the copies left, sweeps away the code they leave dead and
+    coalesces the variables the remaining copies join.
+
+    """
+    coalesce(frame)
+    propagate_copies(frame)
+    dead_code(frame)
+    coalesce_copies(frame)
+    peephole(frame)
+    while dead_code(frame):
+        peephole(frame)
+
+def peephole(frame):
+    """Peephole Optimization
+
+    Cleans up the control flow the lowering leaves in the code of a frame,
+    a round at a time until a round changes nothing:
+
+        the labels set on one code are merged into its first label;
+        jumps landing on a goto are threaded to the goto's target;
+        'if c goto L1; goto L2; L1:' becomes 'iffalse c goto L2; L1:';
+        jumps to the next code are dropped, conditions having no effects;
+        labels no jump targets are dropped.
+
+    Returns:
+        The number of codes removed.
+    """
+    table = frame.get_tacode_table()
+    before = len(table)
+    while _peephole_round(table):
+        table.compact()
+    return before - len(table)
+
+def coalesce(frame):
+    """Coalesce Temporaries
+
+    Makes the code computing a temporary write the variable the temporary
+    is copied into, when the copy is the one use of the temporary and
+    follows in the same block:
+
+        t0 = a + b          x = a + b
+        x = t0
+
+    The variable must not be read or written in between, nor memory
+    touched there if the variable lives in memory, and both must be of a
+    width.
+
+    Returns:
+        The number of copies removed.
+    """
+    table = frame.get_tacode_table()
+    graph = frame.get_cfg()
+    variables = dataflow.Variables(frame)
+    ops, args1, args2, args3 = table.ops, table.arg1, table.arg2, table.arg3
+    defs, uses, clobbers = variables.defs, variables.uses, variables.clobbers
+    count = len(table.temps)
+    sites = array('i', [-1]) * count
+    defined = bytearray(count)
+    used = bytearray(count)
+    for i in range(len(table)):
+        for arg in (args1[i], args2[i]):
+            if arg >= 0 and arg & 3 == il.Operand.TEMP:
+                used[arg >> 2] = min(used[arg >> 2] + 1, 2)
+        arg = args3[i]
+        if arg >= 0 and arg & 3 == il.Operand.TEMP:
+            if ops[i] == il.Tacode.STORE or ops[i] == il.Tacode.STOREPTR:
+                used[arg >> 2] = 2
+            elif defs[i] >= 0:
+                defined[arg >> 2] = min(defined[arg >> 2] + 1, 2)
+                sites[arg >> 2] = i
+    removed = 0
+    for j in range(len(table)):
+        if ops[j] != il.Tacode.ASSIGN or args1[j] & 3 != il.Operand.TEMP:
+            continue
+        t, dst = args1[j] >> 2, args3[j]
+        i = sites[t]
+        if used[t] != 1 or defined[t] != 1 or i > j or ops[i] not in Pure \
+                or graph.block_of[i] != graph.block_of[j]:
+            continue
+        if table.get_type(args1[j]).get_width() != table.get_type(dst).get_width():
+            continue
+        x = defs[j]
+        memory = variables.memory >> x & 1
+        for k in range(i + 1, j):
+            if uses[k] >> x & 1 or defs[k] == x or (memory and clobbers[k]):
+                break
+        else:
+            args3[i] = dst
+            defs[i] = x
+            defs[j] = -1
+            uses[j] = 0
+            if dst & 3 == il.Operand.TEMP:
+                sites[dst >> 2] = i
+            table.remove(j)
+            removed = removed + 1
+    if removed:
+        table.compact()
+    return removed
+
+def coalesce_copies(frame):
+    """Coalesce Copies
+
+    Merges the variables a copy joins when their live ranges do not
+    interfere, that is when neither is live where the other is written
+    but by a copy from it, and drops the copies left from a variable to
+    itself. Each merge sums up the interference of the two, so the copies
+    are tried one after the other against what was merged before. A
+    temporary merges into a local, never a local into another, and
+    variables in memory or of different types are left apart.
+
+    Returns:
+        The number of copies removed.
+    """
+    table = frame.get_tacode_table()
+    liveness = dataflow.Liveness(frame).solve()
+    graph, variables = liveness.graph, liveness.variables
+    ops, args = table.ops, (table.arg1, table.arg2, table.arg3)
+    symbols, defs, bit = variables.symbols, variables.defs, variables.bit
+    pairs = []
+    for i in range(len(table)):
+        if ops[i] != il.Tacode.ASSIGN:
+            continue
+        d, s = defs[i], bit(args[0][i])
+        if s < 0 or d == s or (d < symbols and s < symbols) or (variables.memory >> d | variables.memory >> s) & 1:
+            continue
+        if _same_type(table.get_type(args[2][i]), table.get_type(args[0][i])):
+            pairs.append((d, s))
+    if not pairs:
+        return 0
+    interfere = [0] * variables.count
+    for b in range(len(graph)):
+        for i, live in liveness.live_after(b):
+            d = defs[i]
+            if d < 0:
+                continue
+            if ops[i] == il.Tacode.ASSIGN:
+                s = bit(args[0][i])
+                if s >= 0:
+                    live = live & ~(1 << s)
+            interfere[d] = interfere[d] | (live & ~(1 << d))
+    parents = list(range(variables.count))
+    members = [1 << v for v in range(variables.count)]
+    def find(v):
+        while parents[v] != v:
+            parents[v] = parents[parents[v]]
+            v = parents[v]
+        return v
+    merged = 0
+    for d, s in pairs:
+        d, s = find(d), find(s)
+        if d == s or (d < symbols and s < symbols):
+            continue
+        if interfere[d] & members[s] or interfere[s] & members[d]:
+            continue
+        keep, gone = (s, d) if s < symbols else (d, s)
+        parents[gone] = keep
+        members[keep] = members[keep] | members[gone]
+        interfere[keep] = interfere[keep] | interfere[gone]
+        merged = merged + 1
+    if not merged:
+        return 0
+    removed = 0
+    for i in range(len(table)):
+        op = ops[i]
+        for k in (0, 1, 2):
+            if k == 2 and op in Jumps:
+                break
+            v = bit(args[k][i])
+            if v >= 0 and parents[v] != v:
+                args[k][i] = variables.operand(find(v))
+        if op == il.Tacode.ASSIGN and args[0][i] == args[2][i]:
+            table.remove(i)
+            removed = removed + 1
+    table.touch()
+    table.compact()
+    return removed
+
+def propagate_copies(frame):
+    """Copy Propagation
+
+    Reads the source of a copy in place of its destination wherever the
+    copy is available, so the copy itself is often left dead. A variable
+    only stands for another of the same type, and for a constant if it is
+    an int, so that the operations keep reading the types they read.
+
+    Returns:
+        The number of operands replaced.
+    """
+    table = frame.get_tacode_table()
+    copies = dataflow.AvailableCopies(frame).solve()
+    graph, variables = copies.graph, copies.variables
+    ops, args = table.ops, (table.arg1, table.arg2, table.arg3)
+    sources = []
+    for dst, src in copies.copies:
+        dst_type = table.get_type(dst)
+        if src & 3 == il.Operand.CONST:
+            same = dst_type is ty.Type.Int
+        else:
+            same = _same_type(dst_type, table.get_type(src))
+        sources.append(src if same else il.Operand.NONE)
+    replaced = 0
+    for b in range(len(graph)):
+        available = copies.ins[b]
+        for i in range(graph.starts[b], graph.starts[b + 1]):
+            if available:
+                stored = ops[i] == il.Tacode.STORE or ops[i] == il.Tacode.STOREPTR
+                for k in (0, 1, 2):
+                    if k == 2 and not stored:
+                        break
+                    v = variables.bit(args[k][i])
+                    if v < 0:
+                        continue
+                    found = available & copies.targets[v]
+                    if found:
+                        src = sources[found.bit_length() - 1]
+                        if src != il.Operand.NONE:
+                            args[k][i] = src
+                            replaced = replaced + 1
+            available = copies.step(i, available)
+    if replaced:
+        table.touch()
+    return replaced
+
+def _peephole_round(table):
+    ops, arg3, places = table.ops, table.arg3, table.places
+    n = len(table)
+    changed = False
+    alias = {}
+    for i in range(n):
+        labels = table.get_labels(i)
+        for label in labels[1:]:
+            alias[label] = labels[0]
+    refs = {}
+    for i in range(n):
+        if ops[i] not in Jumps:
+            continue
+        target = alias.get(arg3[i], arg3[i])
+        seen = set()
+        while ops[places[target]] == il.Tacode.GOTO and target not in seen:
+            seen.add(target)
+            target = alias.get(arg3[places[target]], arg3[places[target]])
+        if target != arg3[i]:
+            arg3[i] = target
+            changed = True
+        refs[target] = refs.get(target, 0) + 1
+    i = 0
+    while i < n:
+        op = ops[i]
+        if op == il.Tacode.IFTRUE or op == il.Tacode.IFFALSE:
+            if i + 2 < n and ops[i + 1] == il.Tacode.GOTO and places[arg3[i]] == i + 2 \
+                    and not any(refs.get(label) for label in table.get_labels(i + 1)):
+                refs[arg3[i]] = refs[arg3[i]] - 1
+                ops[i] = Inverse[op]
+                arg3[i] = arg3[i + 1]
+                table.remove(i + 1)
+                changed = True
+                i = i + 2
+                continue
+        if op in Jumps and places[arg3[i]] == i + 1:
+            refs[arg3[i]] = refs[arg3[i]] - 1
+            table.remove(i)
+            changed = True
+        i = i + 1
+    for label in table.marks:
+        if places[label] >= 0 and not refs.get(label):
+            table.unplace(label)
+            changed = True
+    return changed
+
+def reduce_strength(frame):
+    """Strength Reduction
+
+    Turns the multiplications by a constant power of two into left shifts
+    by its exponent, the other operand going first, as a shift takes one
+    cycle where a multiplication takes several. The multiplications the
+    array accesses scale their indices by are the most of them.
+
+    Returns:
+        The number of codes rewritten.
+    """
+    table = frame.get_tacode_table()
+    ops, opers, args1, args2, consts = table.ops, table.opers, table.arg1, table.arg2, table.consts
+    reduced = 0
+    for i in range(len(table)):
+        if ops[i] != il.Tacode.BINARY or opers[i] != Multiply:
+            continue
+        arg1, arg2 = args1[i], args2[i]
+        if arg1 & 3 == il.Operand.CONST:
+            arg1, arg2 = arg2, arg1
+        if arg2 & 3 != il.Operand.CONST or arg1 & 3 == il.Operand.CONST:
+            continue
+        value = consts[arg2 >> 2]
+        if value < 2 or value & (value - 1):
+            continue
+        opers[i] = Shift
+        args1[i] = arg1
+        args2[i] = table.constant(value.bit_length() - 1)
+        reduced = reduced + 1
+    if reduced:
+        table.touch()
+    return reduced
+
+def tail_calls(frame):
+    """Tail Call Elimination
+
+    Turns the calls whose result the frame returns right away, through
+    gotos to the ret at most, into tail calls. In a frame returning void a
+    call followed by the ret is one too. A call of the frame itself becomes
+    assignments of its arguments to the parameters, through temporaries
+    as they may read each other, and a goto to the first code, so a
+    recursion in tail position runs as a loop. The other calls become
+    tailcalls, which the callee runs in place of the frame. A call whose
+    loadret or saveret is labelled is left, as other paths reach the
+    saveret without going through the call. Frames whose locals may be
+    pointed to, arrays, structs and the locals their address is taken of,
+    are left as they are, as the callee could still read them after the
+    frame is reused.
+
+    Returns:
+        The number of calls turned.
+    """
+    table = frame.get_tacode_table()
+    n = len(table)
+    if not n or _addressed(frame):
+        return 0
+    ops, opers, args1, args2, args3 = table.ops, table.opers, table.arg1, table.arg2, table.arg3
+    frame_id = frame.get_frame_id()
+    protos = frame_id.get_type().get_protos() or ()
+    void = frame_id.get_type().get_ret_type() is ty.Type.Void
+    local = set(table.operand(id_obj) for id_obj in frame.get_locals())
+    skipped = set()
+    selfs = {}
+    tails = set()
+    for i in range(n):
+        if ops[i] != il.Tacode.CALL:
+            continue
+        j = i + 1
+        if j + 1 < n and ops[j] == il.Tacode.LDRET and ops[j + 1] == il.Tacode.STRET \
+                and args1[j + 1] == args3[j] and (args3[j] & 3 == il.Operand.TEMP or args3[j] in local):
+            j = j + 2
+        elif not void:
+            continue
+        if j >= n or not _returns(table, j) or any(table.get_labels(k) for k in range(i + 1, j)):
+            continue
+        skipped.update(range(i + 1, j))
+        count = table.consts[args2[i] >> 2]
+        if args1[i] & 3 == il.Operand.SYMBOL and table.symbols[args1[i] >> 2] is frame_id \
+                and count == len(protos) and all(ops[i - k] == il.Tacode.PARAM for k in range(1, count + 1)):
+            for k in range(count):
+                selfs[i - count + k] = table.operand(frame.alloc_temp(protos[k].get_type()))
+            selfs[i] = [selfs[i - count + k] for k in range(count)]
+        else:
+            tails.add(i)
+    if not selfs and not tails:
+        return 0
+    labels = [table.get_labels(i) for i in range(n)]
+    start = table.new_label()
+    table.reset()
+    table.place(start)
+    for i in range(n):
+        for label in labels[i]:
+            table.place(label)
+        if i in skipped:
+            continue
+        if i in tails:
+            table.append(il.Tacode.TAILCALL, opers[i], args1[i], args2[i], il.Operand.NONE)
+        elif i not in selfs:
+            table.append(ops[i], opers[i], args1[i], args2[i], args3[i])
+        elif ops[i] == il.Tacode.PARAM:
+            table.append(il.Tacode.ASSIGN, 0, args1[i], il.Operand.NONE, selfs[i])
+        else:
+            for id_obj, temp in zip(protos, selfs[i]):
+                table.append(il.Tacode.ASSIGN, 0, temp, il.Operand.NONE, table.operand(id_obj))
+            table.append(il.Tacode.GOTO, 0, il.Operand.NONE, il.Operand.NONE, start)
+    return len(tails) + len([i for i in selfs if ops[i] != il.Tacode.PARAM])
+
+def _addressed(frame):
+    table = frame.get_tacode_table()
+    local = set(frame.get_locals())
+    for id_obj in local:
+        if type(id_obj.get_type()) in (ty.Array, ty.Struct):
+            return True
+    for i in range(len(table)):
+        if table.ops[i] == il.Tacode.UNARY and table.opers[i] == Address \
+                and table.symbols[table.arg1[i] >> 2] in local:
+            return True
+    return False
+
+def _returns(table, i):
+    seen = set()
+    while table.ops[i] == il.Tacode.GOTO and i not in seen:
+        seen.add(i)
+        i = table.places[table.arg3[i]]
+    return table.ops[i] == il.Tacode.RETURN
+
+def dead_code(frame):
+    """Dead Code Elimination
+
+    Removes the code of a frame that has no effect, a round at a time until
+    a round removes nothing:
+
+        the blocks no path from the entry reaches, save the block of the
+        frame end, with the labels set in them;
+        the codes writing a variable that is dead after them and having no
+        other effect: assignments, arithmetic, loads and loadrets.
+
+    A block is walked backwards from the variables live at its end, so the
+    codes feeding only dead codes are removed in the same walk. Calls,
+    saverets and stores are always kept.
+
+    Returns:
+        The number of codes removed.
+    """
+    table = frame.get_tacode_table()
+    before = len(table)
+    while _unreachable(frame) + _dead_assignments(frame):
+        table.compact()
+    return before - len(table)
+
+def _unreachable(frame):
+    table = frame.get_tacode_table()
+    graph = frame.get_cfg()
+    reached = bytearray(len(graph))
+    for b in graph.reverse_postorder():
+        reached[b] = 1
+    end = frame.get_frame_end()
+    if table.places[end] >= 0:
+        reached[graph.get_block(end)] = 1
+    removed = 0
+    for b in range(len(graph)):
+        if reached[b]:
+            continue
+        for i in range(graph.starts[b], graph.starts[b + 1]):
+            for label in table.get_labels(i):
+                table.unplace(label)
+            table.remove(i)
+            removed = removed + 1
+    return removed
+
+def _dead_assignments(frame):
+    table = frame.get_tacode_table()
+    liveness = dataflow.Liveness(frame).solve()
+    graph = liveness.graph
+    defs, uses = liveness.variables.defs, liveness.variables.uses
+    ops = table.ops
+    removed = 0
+    for b in range(len(graph)):
+        live = liveness.outs[b]
+        for i in range(graph.starts[b + 1] - 1, graph.starts[b] - 1, -1):
+            d = defs[i]
+            if d >= 0:
+                if not live >> d & 1 and ops[i] in Pure:
+                    table.remove(i)
+                    removed = removed + 1
+                    continue
+                live = live & ~(1 << d)
+            live = live | uses[i]
+    return removed
+
+def _same_type(type1, type2):
+    return type1 is type2 or (type(type1) is ty.Pointer and type(type2) is ty.Pointer)
+
+Jumps   = (il.Tacode.GOTO, il.Tacode.IFTRUE, il.Tacode.IFFALSE)
+Inverse = {il.Tacode.IFTRUE: il.Tacode.IFFALSE, il.Tacode.IFFALSE: il.Tacode.IFTRUE}
+Pure    = (il.Tacode.ASSIGN, il.Tacode.BINARY, il.Tacode.UNARY,
+           il.Tacode.LOAD, il.Tacode.LDRET)
+Multiply = il.Tacode.OperatorIds['*']
+Shift    = il.Tacode.OperatorIds['<<']
+Address  = il.Tacode.OperatorIds['&']
@@ -1,36 +1,67 @@
 __author__ = 'ZhangJingtian'
 import ty
 import il
+import opt
+import slots
+import inline
 import gen
 import ast
 import sym
 import lexer
 import errors
+import context
 
 class Parser(gen.CodeGenerator):
     """Parser class
 
     """
-    def __init__(self, lexer):
+    def __init__(self, lexer, buffered=False, ctx=None, pratt=False, lazy=False, recover=True):
         super(Parser, self).__init__()
+        if ctx is None:
+            ctx = context.Context()
+        self._ctx            = ctx
         self._look           = None
         self._lookahead      = []
         self._lexer          = lexer
+        self._tokens         = None
+        self._cursor         = -1
         self._ids            = sym.IdentifierTable()
         self._frames         = {}
+        self._pratt          = pratt
+        self._lazy           = lazy
+        self._recover        = recover
+        self._bodies         = {}
+        self._skipped        = False
+        self._scratch        = {}
+        if buffered or lazy:
+            self._tokens     = lexer.tokenize()
+            self._pool       = self._tokens.pool
+            self._values     = self._tokens.values
+            self._lines      = self._tokens.lines
+            self._last       = len(self._tokens) - 1
         self._advance_token()
 
     def _advance_token(self):
         """Adnvance Tokens
 
-        Populates the current token.
+        Populates the current token. In buffered mode the token is taken from
+        the token buffer at the cursor.
 
         """
-        if len(self._lookahead) > 0:
+        if self._tokens is not None:
+            if self._cursor < self._last:
+                self._cursor = self._cursor + 1
+            self._look = self._pool[self._values[self._cursor]]
+            line = self._lines[self._cursor]
+            if line != self._ctx.line:
+                # the nodes of one line share the one int object
+                self._ctx.line = line
+        elif len(self._lookahead) > 0:
             self._look = self._lookahead[0]
             del self._lookahead[0]
         else:
             self._look = self._lexer.scan()
+            self._ctx.line = self._lexer.line
 
     def _accept(self, expected_tag):
         """Accept Token
@@ -82,9 +113,32 @@ class Parser(gen.CodeGenerator):
             name: The name of the identifier where the name error occurred.
         """
         msg = '%s: %s' % (name, msg)
-        self._warning(msg, self._lexer.line, prefix='Error')
+        self._report(errors.Diagnostic.NAME, msg)
         return
 
+    def _type_error(self, expected, encountered):
+        """Print Type Error Message
+
+        Prints a type error message with details about the expected type and
+        the type that was encountered.
+
+        Arguments:
+            expected: A string containing the expected type.
+            encountered: A string containing the type encountered.
+        """
+        msg = 'Expected %s type, encounted %s' % (expected, encountered)
+        self._report(errors.Diagnostic.TYPE, msg)
+        return
+
+    def _report(self, kind, msg):
+        """Report Error
+
+        Records the error as a diagnostic of the compilation and prints it.
+
+        """
+        self._ctx.error(kind, msg, self._ctx.line)
+        self._warning(msg, self._ctx.line, prefix='Error')
+
     def _syntax_error(self, expected):
         """Print Syntax Error Message
 
@@ -99,9 +153,55 @@ class Parser(gen.CodeGenerator):
 
         msg = ('Expected %s, encounted "%s"' %
                (expected, token))
-        self._warning(msg, self._lexer.line, prefix='Error')
+        self._report(errors.Diagnostic.SYNTAX, msg)
         raise errors.ParserSyntaxError()
 
+    def _at_function(self):
+        """At Function
+
+        Checks whether the current token starts a function declaration or
+        definition, 'function' followed by its name.
+
+        """
+        return self._look.tag == lexer.Tag.FUNCTION and self._lookk(1).tag == lexer.Tag.ID
+
+    def _synchronize(self, nested=True):
+        """Synchronize after Syntax Error
+
+        Recovers from a syntax error in panic mode. Skips the tokens up to and
+        including the next ';' or the next balanced '{' '}' block, or up to
+        the next function header. Within a block it also stops at the '}'
+        closing the block, while at the top level it stops at 'struct' as well.
+
+        Arguments:
+            nested: Whether the error occurred within braces. (Default: True)
+        """
+        if not self._recover:
+            raise errors.ParserSyntaxError()
+        depth = 0
+        while self._look.tag is not None:
+            tag = self._look.tag
+            if tag == lexer.Tag.FUNCTION and self._at_function():
+                return
+            if depth == 0:
+                if tag == ';':
+                    self._advance_token()
+                    return
+                elif tag == '}' and nested:
+                    return
+                elif tag == lexer.Tag.STRUCT and not nested:
+                    return
+            if tag == '{':
+                depth = depth + 1
+            elif tag == '}' and depth > 0:
+                depth = depth - 1
+                if depth == 0:
+                    self._advance_token()
+                    if not nested:
+                        self._accept(';')
+                    return
+            self._advance_token()
+
     def _match(self, expected_tag, expected_value=None):
         """ Match Token
 
@@ -129,10 +229,13 @@ class Parser(gen.CodeGenerator):
             k: The look ahead count.
 
         """
+        if self._tokens is not None:
+            return self._tokens.token(self._cursor + k)
         last = k - len(self._lookahead)
         if last > 0:
             for i in range(last):
                 self._lookahead.append(self._lexer.scan())
+            self._ctx.line = self._lexer.line
         return self._lookahead[k-1]
 
     def _parse_program(self):
@@ -159,7 +262,11 @@ class Parser(gen.CodeGenerator):
                                     |   ε
         """
         while self._check(lexer.Tag.STRUCT):
-            id_obj = self._parse_struct_declaration()
+            try:
+                id_obj = self._parse_struct_declaration()
+            except errors.ParserSyntaxError:
+                self._synchronize(nested=False)
+                continue
             try:
                 self._ids.add(id_obj)
             except errors.ParserNameError as e:
@@ -191,14 +298,18 @@ class Parser(gen.CodeGenerator):
                                     |   ε
         """
         while self._accept(lexer.Tag.STRUCT):
-            token = self._look
-            self._match(lexer.Tag.ID)
-            id_obj = None
             try:
-                id_obj = self._ids.find(str(token))
-            except errors.ParserNameError as e:
-                self._name_error('struct has not been declared', str(token))
-            self._parse_struct_definition(id_obj)
+                token = self._look
+                self._match(lexer.Tag.ID)
+                id_obj = None
+                try:
+                    id_obj = self._ids.find(token)
+                except errors.ParserNameError as e:
+                    self._name_error('struct has not been declared', str(token))
+                    id_obj = ast.Identifier(token, ty.Struct(token))
+                self._parse_struct_definition(id_obj)
+            except errors.ParserSyntaxError:
+                self._synchronize(nested=False)
         return
 
 
@@ -230,7 +341,12 @@ class Parser(gen.CodeGenerator):
         la = self._lookk(1)
         va_list = []
         while la != None and la.tag == ':':
-            id_obj = self._parse_variable_declaration()
+            try:
+                id_obj = self._parse_variable_declaration()
+            except errors.ParserSyntaxError:
+                self._synchronize(nested=env is not self._ids)
+                la = self._lookk(1)
+                continue
             la = self._lookk(1)
             try:
                 env.add(id_obj)
@@ -267,7 +383,7 @@ class Parser(gen.CodeGenerator):
         """
         t = self._parse_type_specifier()
         types.append(t)
-        if self._check(','):
+        if self._accept(','):
             types = self._parse_type_specifiers(types)
         return types
 
@@ -294,6 +410,7 @@ class Parser(gen.CodeGenerator):
             return self._parse_array_specifier()
         elif ty.Type.is_pointer(self._look):
             return self._parse_pointer_specifier()
+        self._syntax_error('type')
 
 
     def _parse_basic_specifier(self):
@@ -313,6 +430,7 @@ class Parser(gen.CodeGenerator):
         elif self._accept(lexer.Tag.UNSIGNED):
             self._match(lexer.Tag.INT, 'int')
             return ty.Type.UnsignedInt
+        self._syntax_error('basic type')
 
     def _parse_struct_specifier(self):
         """ <struct_specifier>
@@ -326,11 +444,11 @@ class Parser(gen.CodeGenerator):
         self._match(lexer.Tag.STRUCT, 'struct')
         token = self._look
         self._match(lexer.Tag.ID, 'identifier')
-        id_obj = None
         try:
-            id_obj = self._ids.find(str(token))
+            id_obj = self._ids.find(token)
         except errors.ParserNameError:
             self._name_error('struct has not been declared', str(token))
+            return ty.Type.Error
         return id_obj.get_type()
 
 
@@ -395,7 +513,12 @@ class Parser(gen.CodeGenerator):
         """
         la = self._lookk(2)
         while self._check(lexer.Tag.FUNCTION) and la.tag == '(':
-            id_obj = self._parse_function_declaration()
+            try:
+                id_obj = self._parse_function_declaration()
+            except errors.ParserSyntaxError:
+                self._synchronize(nested=False)
+                la = self._lookk(2)
+                continue
             la = self._lookk(2)
             try:
                 self._ids.add(id_obj)
@@ -403,11 +526,11 @@ class Parser(gen.CodeGenerator):
                 self._name_error(str(e), str(id_obj))
 
             id_obj.get_type().get_identifier_table().init(self._ids, id_obj)
-            frame = il.Frame(id_obj)
+            frame = il.Frame(id_obj, self._ctx)
             #alloc parameters' space
             for param_obj in id_obj.get_type().get_protos():
                 frame.alloc_local(param_obj, is_param=True)
-            self._frames[str(id_obj)] = frame
+            self._frames[id_obj.get_word()] = frame
         return
 
     def _parse_function_declaration(self):
@@ -468,7 +591,7 @@ class Parser(gen.CodeGenerator):
             self._name_error(str(e), str(id_obj))
         params.append(id_obj)
         if self._accept(','):
-            params = self._parse_parameters(params, env)
+            params = self._parse_parameters(env, params)
         return params
 
 
@@ -507,15 +630,71 @@ class Parser(gen.CodeGenerator):
             function_definition_list -> function_defintion_list function_definition
                                     |   ε
         """
-        while self._look != None and self._accept(lexer.Tag.FUNCTION):
-            token = self._look
-            self._match(lexer.Tag.ID, 'identifier')
-            id_obj = None
+        while self._look.tag is not None:
             try:
-                id_obj = self._ids.find(str(token))
-            except errors.ParserNameError as e:
-                self._name_error('function has not been declared', str(token))
-            self._parse_function_definition(id_obj)
+                self._match(lexer.Tag.FUNCTION, 'function')
+                token = self._look
+                self._match(lexer.Tag.ID, 'identifier')
+                id_obj = None
+                try:
+                    id_obj = self._ids.find(token)
+                except errors.ParserNameError as e:
+                    self._name_error('function has not been declared', str(token))
+                    id_obj = self._undeclared_function(token)
+                if self._lazy:
+                    if id_obj.get_word() in self._frames:
+                        self._bodies[id_obj.get_word()] = self._cursor
+                        self._skipped = True
+                    self._skip_function_definition()
+                else:
+                    self._parse_function_definition(id_obj)
+            except errors.ParserSyntaxError:
+                if not self._recover:
+                    raise
+                while self._look.tag is not None and not self._at_function():
+                    self._advance_token()
+
+    def _undeclared_function(self, token):
+        """ Undeclared Function
+
+        Makes up an identifier with a scratch frame for a function defined
+        without a declaration, so that its body can still be checked.
+
+        """
+        func_type = ty.Function()
+        func_type.init([], ty.Type.Error)
+        id_obj = ast.Identifier(token, func_type)
+        func_type.get_identifier_table().init(self._ids, id_obj)
+        self._scratch[id_obj.get_word()] = il.Frame(id_obj, self._ctx)
+        return id_obj
+
+    def _skip_function_definition(self):
+        """ Skip Function Definition
+
+        Skips the compound statement of a function definition by matching
+        its braces in the token buffer, so that the body can be parsed later
+        on its own.
+
+        """
+        if not self._check('{'):
+            self._syntax_error('{')
+        tags    = self._tokens.tags
+        lbrace  = lexer.TokenBuffer.code('{')
+        rbrace  = lexer.TokenBuffer.code('}')
+        depth   = 0
+        i       = self._cursor
+        while i < self._last:
+            code = tags[i]
+            if code == lbrace:
+                depth = depth + 1
+            elif code == rbrace:
+                depth = depth - 1
+                if depth == 0:
+                    break
+            i = i + 1
+        self._cursor = i
+        self._advance_token()
+        self._match(';')
 
     def _parse_function_definition(self, func_obj):
         """ <function_definition>
@@ -537,12 +716,18 @@ class Parser(gen.CodeGenerator):
 
             statment_list -> statement_list statment
                         |   ε
+
+        The statements are collected in a loop into one flat block.
         """
-        stmt = self._parse_statement(env)
-        if self._check('}'):
-            return ast.Sequence(stmt, ast.Statement.Null)
-        else:
-            return ast.Sequence(stmt, self._parse_statement_list(env))
+        stmts = []
+        while not self._check('}') and self._look.tag is not None:
+            try:
+                stmts.append(self._parse_statement(env))
+            except errors.ParserSyntaxError:
+                self._synchronize()
+                if self._at_function():
+                    break
+        return ast.Block(stmts)
 
     def _parse_statement(self, env):
         """ <statement>
@@ -603,20 +788,20 @@ class Parser(gen.CodeGenerator):
         """
         if self._look.tag == lexer.Tag.WHILE:
             while_node = ast.While()
-            save_stmt  = ast.Statement.Enclosing
-            ast.Statement.Enclosing = while_node
+            save_stmt  = self._ctx.enclosing
+            self._ctx.enclosing = while_node
             self._match(lexer.Tag.WHILE, 'whild')
             self._match('(')
             expr = self._parse_logical_expression(env)
             self._match(')')
             stmt = self._parse_statement(env)
             while_node.init(expr, stmt)
-            ast.Statement.Enclosing = save_stmt
+            self._ctx.enclosing = save_stmt
             return while_node
         else:
             do_node = ast.Do()
-            save_stmt = ast.Statement.Enclosing
-            ast.Statement.Enclosing = do_node
+            save_stmt = self._ctx.enclosing
+            self._ctx.enclosing = do_node
             self._match(lexer.Tag.DO, 'do')
             stmt = self._parse_statement(env)
             self._match(lexer.Tag.WHILE ,'while')
@@ -625,7 +810,7 @@ class Parser(gen.CodeGenerator):
             self._match(')')
             self._match(';')
             do_node.init(expr, stmt)
-            ast.Statement.Enclosing = save_stmt
+            self._ctx.enclosing = save_stmt
             return do_node
 
     def _parse_jump_statement(self, env):
@@ -639,10 +824,15 @@ class Parser(gen.CodeGenerator):
                             |   'return' logical_expression ';'
         """
 
-        if self._accept(lexer.Tag.CONTINUE):
-            return ast.Continue()
-        elif self._accept(lexer.Tag.BREAK):
-            return ast.Break()
+        if self._check(lexer.Tag.CONTINUE) or self._check(lexer.Tag.BREAK):
+            token = self._look
+            self._advance_token()
+            if self._ctx.enclosing is None:
+                self._report(errors.Diagnostic.SYNTAX, '%s is not within a loop' % token)
+                return ast.Statement.Null
+            if token.tag == lexer.Tag.CONTINUE:
+                return ast.Continue(self._ctx.enclosing)
+            return ast.Break(self._ctx.enclosing)
         elif self._accept(lexer.Tag.RETURN):
             exp = None
             if not self._check(';'):
@@ -661,7 +851,7 @@ class Parser(gen.CodeGenerator):
         self._match('{')
         env = env.push_scope()
         id_obj = env.get_owner_id()
-        frame = self._frames.get(str(id_obj))
+        frame = self._frames.get(id_obj.get_word()) or self._scratch.get(id_obj.get_word())
         va_list = self._parse_variable_declaration_list(env)
         for local_obj in va_list:
             frame.alloc_local(local_obj)
@@ -713,6 +903,8 @@ class Parser(gen.CodeGenerator):
                                 |   logical_and_expression
         """
 
+        if self._pratt:
+            return self._parse_precedence_expression(env)
         logand = self._parse_logical_and_expression(env)
         while self._look.tag == lexer.Tag.OR:
             tok = self._look
@@ -891,6 +1083,35 @@ class Parser(gen.CodeGenerator):
             castexp = ast.Binary(tok , castexp, self._parse_multiplicative_expression(env))
         return castexp
 
+    def _parse_precedence_expression(self, env):
+        """ <logical_expression>
+
+        Parses the binary operators from <logical_expression> down to
+        <multiplicative_expression> with an operator stack driven by the
+        Parser.Precedence table, instead of one method per level. Operators
+        of one level group to the right, so the trees are the same as the
+        ones the recursive descent builds.
+
+        """
+        operands  = [self._parse_cast_expression(env)]
+        operators = []
+        while True:
+            entry = Parser.Precedence.get(self._look.tag)
+            if entry is None:
+                break
+            while operators and operators[-1][0] > entry[0]:
+                prec, node, tok = operators.pop()
+                right = operands.pop()
+                operands[-1] = node(tok, operands[-1], right)
+            operators.append((entry[0], entry[1], self._look))
+            self._advance_token()
+            operands.append(self._parse_cast_expression(env))
+        while operators:
+            prec, node, tok = operators.pop()
+            right = operands.pop()
+            operands[-1] = node(tok, operands[-1], right)
+        return operands[0]
+
     def _parse_cast_expression(self, env):
         """ <cast_expression>
 
@@ -962,9 +1183,9 @@ class Parser(gen.CodeGenerator):
         """
         token = self._look
         if self._accept(lexer.Tag.NUM):
-            return ast.Constant(token, ty.Type.Int)
+            return ast.Constant.of_int(token.value)
         elif self._accept(lexer.Tag.NULL):
-            return ast.Constant(lexer.Num(0), ty.Type.Int)
+            return ast.Constant.of_int(0)
         elif self._accept('('):
             logexp = self._parse_logical_expression(env)
             self._match(')')
@@ -972,9 +1193,11 @@ class Parser(gen.CodeGenerator):
         self._match(lexer.Tag.ID, 'identifier')
         id_obj = None
         try:
-            id_obj = env.find(str(token))
+            id_obj = env.find(token)
         except errors.ParserNameError as e:
             self._name_error('identifier has not been declared', str(token))
+            id_obj = ast.Identifier(token, ty.Type.Error)
+            env.add(id_obj)
         return id_obj
 
     def _parse_struct_offset(self, expr):
@@ -986,14 +1209,10 @@ class Parser(gen.CodeGenerator):
         self._match('.')
         token = self._look
         self._match(lexer.Tag.ID)
-        struct_type = expr.type()
-        struct_field = None
-        try:
-            struct_field = struct_type.get_identifier_table().find(str(token))
-        except errors.ParserNameError as e:
-            self._name_error('struct has no such field', str(str(token)))
-        offset = ast.Constant(lexer.Num(struct_field.get_offset()), ty.Type.Int)
-        return ast.Access(lexer.Word('.', lexer.Tag.INDEX), struct_field.get_type(), expr, offset)
+        struct_type = expr.get_type()
+        if type(struct_type) is not ty.Struct:
+            return self._poison_access(lexer.Word.DOT, expr, 'struct', struct_type)
+        return self._parse_field_access(lexer.Word.DOT, struct_type, expr, token)
 
     def _parse_ptr_offset(self, expr):
         """
@@ -1003,14 +1222,34 @@ class Parser(gen.CodeGenerator):
         self._match(lexer.Tag.PTR)
         token = self._look
         self._match(lexer.Tag.ID)
-        struct_type = expr.get_type().get_ref_type()
-        struct_field = None
+        ptr_type = expr.get_type()
+        if type(ptr_type) is not ty.Pointer or type(ptr_type.get_ref_type()) is not ty.Struct:
+            return self._poison_access(lexer.Word.ARROW, expr, 'pointer to struct', ptr_type)
+        return self._parse_field_access(lexer.Word.ARROW, ptr_type.get_ref_type(), expr, token)
+
+    def _parse_field_access(self, op, struct_type, expr, token):
+        """
+        Parses the access to the named field of a struct.
+
+        """
         try:
-            struct_field = struct_type.get_identifier_table().find(str(token))
+            struct_field = struct_type.get_identifier_table().find(token)
         except errors.ParserNameError:
             self._name_error('struct has no such field', str(token))
-        offset = ast.Constant(lexer.Num(struct_field.get_offset()), ty.Type.Int)
-        return ast.Access(lexer.Word('->', lexer.Tag.INDEX), struct_field.get_type(), expr, offset)
+            return self._poison_access(op, expr)
+        offset = ast.Constant.of_int(struct_field.get_offset())
+        return ast.Access(op, struct_field.get_type(), expr, offset)
+
+    def _poison_access(self, op, expr, expected=None, encountered=None):
+        """
+        Makes an access of the poison type for a bad access, reporting a
+        type error unless the accessed expression is already poisoned.
+
+        """
+        if expected is not None and encountered is not ty.Type.Error:
+            self._type_error(expected, str(encountered))
+        offset = ast.Constant.of_int(0)
+        return ast.Access(op, ty.Type.Error, expr, offset)
 
     def _parse_array_offset(self, expr, env):
         """
@@ -1020,14 +1259,17 @@ class Parser(gen.CodeGenerator):
         self._match('[')
         num = self._parse_logical_expression(env)
         self._match(']')
-        of_type = expr.get_type().get_of_type()
-        width = ast.Constant(lexer.Num(of_type.get_width()), ty.Type.Int)
+        array_type = expr.get_type()
+        if type(array_type) is not ty.Array:
+            return self._poison_access(lexer.Word.INDEX, expr, 'array', array_type)
+        of_type = array_type.get_of_type()
+        width = ast.Constant.of_int(of_type.get_width())
         expr_id = expr
-        offset = ast.Binary(lexer.Token('*'), num, width)
+        offset = ast.Binary(lexer.Token.MUL, num, width)
         if type(expr) is ast.Access:
             expr_id = expr.get_access_id()
-            offset = ast.Binary(lexer.Token('+'), expr.get_offset(), offset)
-        return ast.Access(lexer.Word('[]', lexer.Tag.INDEX), of_type, expr_id, offset)
+            offset = ast.Binary(lexer.Token.ADD, expr.get_offset(), offset)
+        return ast.Access(lexer.Word.INDEX, of_type, expr_id, offset)
 
     def _parse_funcall_expression(self, expr, env):
         """ <funcall_expression>
@@ -1087,14 +1329,74 @@ class Parser(gen.CodeGenerator):
         """ Parse Inter Language Frame
 
         Walks through the ast and generates the three address code from the input program.
+        Inlining waits for the bodies skipped in lazy mode, see inline_frames.
 
         """
-        for frame in self._frames.values():
-                frame_type = frame.get_frame_id().get_type()
-                statement = frame_type.get_statement()
-                statement.gen(frame.get_frame_start(), frame.get_frame_end(), frame)
-                frame.emit_end()
+        for word, frame in self._frames.items():
+            if word not in self._bodies:
+                self._gen_il_frame(frame)
+        if not self._bodies:
+            self.inline_frames()
+
+    def inline_frames(self):
+        """ Inline Frames
+
+        At optimization level 3 inlines the calls into the frames of the
+        whole program, once the code of every body is at hand.
+
+        """
+        if self._ctx.opt_level >= 3:
+            for frame in inline.Inliner(self._frames.values(), self._ctx.opt_level).run():
+                slots.pack(frame)
+
+    def _gen_il_frame(self, frame):
+        frame_type = frame.get_frame_id().get_type()
+        statement = frame_type.get_statement()
+        if statement is None:
+            return
+        frame.emit_label(frame.get_frame_start())
+        ast.lower(statement.gen(frame.get_frame_start(), frame.get_frame_end(), frame))
+        frame.emit_end()
+        opt.optimize(frame, self._ctx.opt_level)
+        slots.pack(frame)
 
+    def parse_function(self, word):
+        """ Parse Function Body
+
+        Parses a function body skipped in lazy mode and generates its three
+        address code. Bodies already parsed are not parsed again.
+
+        Arguments:
+            word: The interned word of the function name.
+        """
+        frame = self._frames.get(word)
+        cursor = self._bodies.pop(word, None)
+        if cursor is None:
+            return frame
+        look, saved = self._look, self._cursor
+        with self._ctx:
+            self._cursor = cursor - 1
+            self._advance_token()
+            try:
+                self._parse_function_definition(frame.get_frame_id())
+            except errors.ParserSyntaxError:
+                if not self._recover:
+                    raise
+            if not self._ctx.diagnostics:
+                self._gen_il_frame(frame)
+        self._look, self._cursor = look, saved
+        return frame
+
+    def merge_frame(self, frame):
+        """ Merge Frame
+
+        Takes the frame of a function body parsed elsewhere in place of the
+        skipped one.
+
+        """
+        word = frame.get_frame_id().get_word()
+        del self._bodies[word]
+        self._frames[word] = frame
     def _generate_runtime(self):
         """ Generate Runtime
 
@@ -1105,10 +1407,81 @@ class Parser(gen.CodeGenerator):
         pass
 
 
+    def get_context(self):
+        return self._ctx
+
+    def get_identifier_table(self):
+        return self._ids
+
+    def get_pending_functions(self):
+        return list(self._bodies.keys())
+
+    def get_frame(self, name):
+        return self.parse_function(lexer.InternTable.Shared.intern(name))
+
+    def get_frames(self):
+        """ Get Frames
+
+        Parses the bodies still skipped in lazy mode. Once the last of them
+        is parsed or merged, the diagnostics are sorted by line and, when an
+        error was reported, the code of every frame is dropped, as the
+        bodies parsed before the error were generated; otherwise the calls
+        are inlined.
+
+        """
+        for word in list(self._bodies.keys()):
+            self.parse_function(word)
+        if self._skipped:
+            self._skipped = False
+            self._ctx.diagnostics.sort(key=lambda diagnostic: diagnostic.line)
+            if self._ctx.diagnostics:
+                for frame in self._frames.values():
+                    frame.clear_code()
+            else:
+                self.inline_frames()
+        return self._frames
+
+    def get_static_area(self):
+        return self.staic_area
+
+    def get_diagnostics(self):
+        return self._ctx.diagnostics
+
     def parse(self):
-        self._parse_program()
-        self._parse_il_frame()
-        self._generate_runtime()
+        """ Parse
+
+        Parses the program and, when no error was reported, generates its
+        three address code.
+
+        Returns:
+            The list of diagnostics reported by the compilation.
+        """
+        with self._ctx:
+            self._parse_program()
+            if not self._ctx.diagnostics:
+                self._parse_il_frame()
+                self._generate_runtime()
+        return self._ctx.diagnostics
+
+Parser.Precedence = {
+    lexer.Tag.OR:   (1,     ast.Or),
+    lexer.Tag.AND:  (2,     ast.And),
+    '|':            (3,     ast.Binary),
+    '^':            (4,     ast.Binary),
+    '&':            (5,     ast.Binary),
+    lexer.Tag.EQ:   (6,     ast.Rel),
+    lexer.Tag.NE:   (6,     ast.Rel),
+    '<':            (7,     ast.Rel),
+    '>':            (7,     ast.Rel),
+    lexer.Tag.LE:   (7,     ast.Rel),
+    lexer.Tag.GE:   (7,     ast.Rel),
+    lexer.Tag.LS:   (8,     ast.Binary),
+    lexer.Tag.RS:   (8,     ast.Binary),
+    '+':            (9,     ast.Binary),
+    '-':            (9,     ast.Binary),
+    '*':            (10,    ast.Binary),
+    '/':            (10,    ast.Binary),
+}
 
 if __name__ == '__main__':
 
@@ -0,0 +1,168 @@
+__author__ = 'ZhangJingtian'
+import gc
+import io
+import ty
+import ast
+import lexer
+import context
+import pickle
+
+class Registry(object):
+    """Registry class
+
+    Numbers the objects a parser built before any function body: the
+    context, the type and word singletons and every global identifier with
+    its type, struct fields and parameters. Two parsers of the same program
+    number them alike, so frames pickled against one registry are loaded
+    against the other without copying the objects they share. Without a
+    parser only the singletons are numbered, which is enough to keep them
+    singletons across processes.
+
+    """
+    def __init__(self, p=None):
+        super(Registry, self).__init__()
+        self._objects = []
+        self._keys    = {}
+        for obj in (ast.Statement.Null,
+                    ty.Type.Int, ty.Type.UnsignedInt, ty.Type.Void,
+                    ty.Type.VoidPointer, ty.Type.Null, ty.Type.Error,
+                    lexer.Word.AND, lexer.Word.OR, lexer.Word.EQ, lexer.Word.NE,
+                    lexer.Word.LE, lexer.Word.GE, lexer.Word.RS, lexer.Word.LS,
+                    lexer.Word.PTR, lexer.Word.TEMP, lexer.Word.DOT, lexer.Word.ARROW,
+                    lexer.Word.INDEX, lexer.Word.CALL, lexer.Word.CAST,
+                    lexer.Token.ADD, lexer.Token.MUL, lexer.Token.GT):
+            self._register(obj)
+        if p is not None:
+            self._register(p.get_context())
+            for id_obj in p.get_identifier_table().get_id_objs():
+                self._register_id(id_obj)
+
+    def _register(self, obj):
+        if id(obj) in self._keys:
+            return False
+        self._keys[id(obj)] = len(self._objects)
+        self._objects.append(obj)
+        return True
+
+    def _register_id(self, id_obj):
+        if self._register(id_obj):
+            self._register_type(id_obj.get_type())
+
+    def _register_type(self, id_type):
+        """Register Type
+
+        Registers a type and the types and identifiers reachable from it.
+
+        """
+        if id_type is None or not self._register(id_type):
+            return
+        if type(id_type) is ty.Array:
+            self._register_type(id_type.get_of_type())
+        elif type(id_type) is ty.Pointer:
+            self._register_type(id_type.get_ref_type())
+        elif type(id_type) is ty.Struct:
+            for id_obj in id_type.get_identifier_table().get_id_objs():
+                self._register_id(id_obj)
+        elif type(id_type) is ty.Function:
+            for id_obj in id_type.get_protos() or ():
+                self._register_id(id_obj)
+            self._register_type(id_type.get_ret_type())
+
+    def key(self, obj):
+        return self._keys.get(id(obj))
+
+    def get(self, key):
+        return self._objects[key]
+
+class FramePickler(pickle.Pickler):
+    """FramePickler class
+
+    Pickles frames, writing registered objects and interned words as
+    references instead of copies. Only the classes that can be registered
+    go through the reducer, so the nodes and lines that make up most of a
+    frame are pickled at full speed.
+
+    """
+    Shared = (context.Context, lexer.Word, ty.Type, ty.Array, ty.Struct,
+              ty.Pointer, ty.Function, ast.Identifier, ast.Statement)
+
+    def __init__(self, f, registry):
+        super(FramePickler, self).__init__(f, pickle.HIGHEST_PROTOCOL)
+        self._registry = registry
+        self._words    = lexer.InternTable.Shared.words
+        self.dispatch_table = dict((cls, self._reduce) for cls in FramePickler.Shared)
+
+    def _reduce(self, obj):
+        if type(obj) is lexer.Word and self._words.get(obj.lexeme) is obj:
+            return _intern, (obj.lexeme,)
+        key = self._registry.key(obj)
+        if key is None:
+            return obj.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+        return _reference, (key,)
+
+class FrameUnpickler(pickle.Unpickler):
+    """FrameUnpickler class
+
+    Loads frames pickled by FramePickler, resolving their references
+    against the registry of the loading parser. Only the classes defined in
+    the compiler modules making up a compilation and the few functions
+    rebuilding arrays and words are loaded, anything else raises an
+    UnpicklingError, as a pickle could otherwise run any code it names.
+
+    """
+    Modules   = ('ast', 'il', 'ty', 'sym', 'lexer', 'context', 'errors', 'gen', 'compiler')
+    Callables = (('array', 'array'), ('array', '_array_reconstructor'), (__name__, '_intern'))
+
+    def __init__(self, f, registry):
+        super(FrameUnpickler, self).__init__(f)
+        self._registry = registry
+
+    def find_class(self, module, name):
+        if module == __name__ and name == '_reference':
+            return self._registry.get
+        if (module, name) in FrameUnpickler.Callables:
+            return super(FrameUnpickler, self).find_class(module, name)
+        if module in FrameUnpickler.Modules and '.' not in name:
+            obj = super(FrameUnpickler, self).find_class(module, name)
+            if isinstance(obj, type) and obj.__module__ == module:
+                return obj
+        raise pickle.UnpicklingError('%s.%s is not allowed in a frame pickle' % (module, name))
+
+def _intern(lexeme):
+    return lexer.InternTable.Shared.intern(lexeme)
+
+def _reference(key):
+    raise pickle.UnpicklingError('registry reference outside of FrameUnpickler')
+
+def dumps(frames, registry):
+    """Dump Frames
+
+    Pickles the frames against the registry. The cyclic garbage collector
+    is held off meanwhile, as the pickler memo grows with every object.
+
+    """
+    f = io.BytesIO()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        FramePickler(f, registry).dump(frames)
+    finally:
+        if enabled:
+            gc.enable()
+    return f.getvalue()
+
+def loads(data, registry):
+    """Load Frames
+
+    Loads pickled frames against the registry. The cyclic garbage collector
+    is held off meanwhile, since it would otherwise walk the whole heap
+    again and again as the many small objects of the frames are allocated.
+
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return FrameUnpickler(io.BytesIO(data), registry).load()
+    finally:
+        if enabled:
+            gc.enable()
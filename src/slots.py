@@ -0,0 +1,77 @@
+__author__ = 'ZhangJingtian'
+import heapq
+import dataflow
+from array import array
+
+def live_ranges(frame, liveness=None):
+    """Live Ranges
+
+    Gets the first and last code index at which every temporary of the
+    frame is live or defined, -1 for the temporaries no code names. A range
+    covers every code a temporary is live at in code order, loops included,
+    so temporaries with disjoint ranges never hold values at the same time.
+    A temporary read for the last time by a code is not live at it, so the
+    code may define another in the same place.
+
+    """
+    if liveness is None:
+        liveness = dataflow.Liveness(frame).solve()
+    variables = liveness.variables
+    symbols = variables.symbols
+    defs = variables.defs
+    count = variables.count - symbols
+    firsts = array('i', [-1]) * count
+    lasts  = array('i', [-1]) * count
+    for b in range(len(liveness.graph)):
+        for i, live in liveness.live_after(b):
+            present = live >> symbols
+            d = defs[i]
+            if d >= symbols:
+                present = present | 1 << (d - symbols)
+            for t in dataflow._bits(present):
+                if firsts[t] < 0 or i < firsts[t]:
+                    firsts[t] = i
+                if i > lasts[t]:
+                    lasts[t] = i
+    return firsts, lasts
+
+def pack(frame, liveness=None):
+    """Pack Temporaries
+
+    Lays the temporaries of the frame out in the temporary area after its
+    locals, letting temporaries of the same width and alignment whose live
+    ranges do not overlap share a slot. The slots are handed out by a linear
+    scan over the ranges in order of their start, reusing the slots of the
+    ranges that have ended. Temporaries no code names get no slot.
+
+    Returns:
+        The size of the temporary area with one slot per temporary, and
+        its size once packed.
+    """
+    temps = frame.get_tacode_table().temps
+    firsts, lasts = live_ranges(frame, liveness)
+    unpacked = 0
+    for temp in temps:
+        temp_type = temp.get_type()
+        unpacked = frame.align_offset(unpacked, temp_type.get_align()) + temp_type.get_width()
+    base = frame.get_temp_base()
+    size = 0
+    free = {}
+    active = []
+    order = sorted([t for t in range(len(temps)) if firsts[t] >= 0], key=firsts.__getitem__)
+    for t in order:
+        while active and active[0][0] < firsts[t]:
+            last, key, offset = heapq.heappop(active)
+            free[key].append(offset)
+        temp_type = temps[t].get_type()
+        key = (temp_type.get_width(), temp_type.get_align())
+        slots = free.setdefault(key, [])
+        if slots:
+            offset = slots.pop()
+        else:
+            offset = frame.align_offset(size, key[1])
+            size = offset + key[0]
+        temps[t].set_offset(base + offset)
+        heapq.heappush(active, (lasts[t], key, offset))
+    frame.set_temp_size(size)
+    return unpacked, size
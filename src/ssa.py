@@ -0,0 +1,518 @@
+__author__ = 'ZhangJingtian'
+import il
+import ty
+import dataflow
+
+class Phi(object):
+    """Phi class
+
+    A phi function at the start of a block: dst takes the arg of the edge
+    the block was entered by. The args follow Form.get_preds(block), and
+    var is the dataflow bit of the variable the phi merges.
+
+    """
+    __slots__ = ('block', 'var', 'dst', 'args')
+    def __init__(self, block, var, count):
+        super(Phi, self).__init__()
+        self.block = block
+        self.var   = var
+        self.dst   = il.Operand.NONE
+        self.args  = [il.Operand.NONE] * count
+
+class Form(object):
+    """Form class
+
+    The static single assignment form of the code of a frame. Building it
+    renames the temporaries and the locals kept out of memory so that each
+    is written by one code: every definition gets a temporary of its own,
+    a temporary keeping its name for its first, and the uses read the
+    definition dominating them. Where definitions meet, at the dominance
+    frontiers of the blocks defining a variable, a phi is placed if the
+    variable is live there. The phis are kept in lists beside the codes,
+    which are renamed in place; the locals and the parameters are only
+    read, for their values at the entry. destroy() turns the phis into
+    copies on the edges that enter their blocks and leaves the frame with
+    plain code again.
+
+    """
+    def __init__(self, frame):
+        super(Form, self).__init__()
+        self.frame = frame
+        self.table = frame.get_tacode_table()
+        self.graph = frame.get_cfg()
+        self.phis  = [[] for b in range(len(self.graph))]
+        variables = dataflow.Variables(frame)
+        liveness  = dataflow.Liveness(frame, variables).solve()
+        renamed = bytearray([1]) * variables.count
+        for v in range(variables.symbols):
+            renamed[v] = not variables.memory >> v & 1
+        self._place(variables, liveness, renamed)
+        self._rename(variables, renamed)
+        self.table.touch()
+
+    def get_preds(self, b):
+        """Get Predecessors
+
+        Gets the blocks the edges into block b come from, in the order of
+        the args of its phis. The entry is also entered from outside the
+        frame, which comes first as block -1.
+
+        """
+        if b == 0:
+            return [-1] + self.graph.preds[0]
+        return self.graph.preds[b]
+
+    def _place(self, variables, liveness, renamed):
+        """Place Phis
+
+        Places the phis of every renamed variable on the iterated dominance
+        frontier of its definitions, where the variable is live.
+
+        """
+        graph = self.graph
+        defs, starts = variables.defs, graph.starts
+        sites = {}
+        for b in graph.reverse_postorder():
+            for i in range(starts[b], starts[b + 1]):
+                d = defs[i]
+                if d >= 0 and renamed[d]:
+                    sites.setdefault(d, []).append(b)
+        frontiers = graph.frontiers()
+        for v, blocks in sites.items():
+            placed = set()
+            work = list(blocks)
+            while work:
+                x = work.pop()
+                for y in frontiers[x]:
+                    if y in placed or not liveness.ins[y] >> v & 1:
+                        continue
+                    placed.add(y)
+                    self.phis[y].append(Phi(y, v, len(self.get_preds(y))))
+                    work.append(y)
+
+    def _rename(self, variables, renamed):
+        """Rename
+
+        Walks the dominator tree with an explicit stack, keeping a stack of
+        the names of every variable: a block reads the names on top and
+        pushes the names it defines, which are popped once its subtree is
+        done.
+
+        """
+        graph, table = self.graph, self.table
+        if not len(graph):
+            return
+        ops, args1, args2, args3 = table.ops, table.arg1, table.arg2, table.arg3
+        defs, starts, bit = variables.defs, graph.starts, variables.bit
+        children = graph.dominator_tree()
+        names = {}
+        kept = set()
+        def top(v):
+            stack = names.get(v)
+            return stack[-1] if stack else variables.operand(v)
+        def push(v):
+            if v >= variables.symbols and v not in kept:
+                kept.add(v)
+                name = variables.operand(v)
+            else:
+                name = table.operand(self.frame.alloc_temp(table.get_type(variables.operand(v))))
+            names.setdefault(v, []).append(name)
+            return name
+        for phi in self.phis[0]:
+            phi.args[0] = variables.operand(phi.var)
+        pushed = [None] * len(graph)
+        stack = [(0, False)]
+        while stack:
+            b, leaving = stack.pop()
+            if leaving:
+                for v in pushed[b]:
+                    names[v].pop()
+                continue
+            defined = []
+            for phi in self.phis[b]:
+                phi.dst = push(phi.var)
+                defined.append(phi.var)
+            for i in range(starts[b], starts[b + 1]):
+                v = bit(args1[i])
+                if v >= 0 and renamed[v]:
+                    args1[i] = top(v)
+                v = bit(args2[i])
+                if v >= 0 and renamed[v]:
+                    args2[i] = top(v)
+                if ops[i] == il.Tacode.STORE or ops[i] == il.Tacode.STOREPTR:
+                    v = bit(args3[i])
+                    if v >= 0 and renamed[v]:
+                        args3[i] = top(v)
+                d = defs[i]
+                if d >= 0 and renamed[d]:
+                    args3[i] = push(d)
+                    defined.append(d)
+            for s in graph.succs[b]:
+                j = self.get_preds(s).index(b)
+                for phi in self.phis[s]:
+                    phi.args[j] = top(phi.var)
+            pushed[b] = defined
+            stack.append((b, True))
+            for c in reversed(children[b]):
+                stack.append((c, False))
+
+    def destroy(self):
+        """Destroy
+
+        Leaves the static single assignment form, emitting the codes again
+        with the copies of the phis on the edges into their blocks: before
+        the jump or at the end of a block with one successor, right after
+        a conditional jump for the edge falling through, and in a block of
+        their own after the codes for the edge a conditional jump takes,
+        shared by the jumps needing the same copies.
+        The copies of an edge are made in parallel, a temporary breaking
+        their cycles.
+
+        """
+        table, graph = self.table, self.graph
+        n = len(table)
+        ops, opers, args1, args2, args3 = table.ops, table.opers, table.arg1, table.arg2, table.arg3
+        labels  = [table.get_labels(i) for i in range(n)]
+        targets = dict((i, graph.block_of[table.places[args3[i]]])
+                       for i in range(n) if ops[i] in Form.Jumps)
+        count = len(graph)
+        table.reset()
+        stubs = []
+        shared = {}
+        if count and self.phis[0]:
+            self._copy(0, -1)
+        for b in range(count):
+            last = graph.starts[b + 1] - 1
+            for i in range(graph.starts[b], last + 1):
+                for label in labels[i]:
+                    table.place(label)
+                op, arg3 = ops[i], args3[i]
+                if op == il.Tacode.NOP:
+                    pass
+                elif i < last or op in Form.Leaving:
+                    table.append(op, opers[i], args1[i], args2[i], arg3)
+                elif op == il.Tacode.GOTO:
+                    self._copy(targets[i], b)
+                    table.append(op, opers[i], args1[i], args2[i], arg3)
+                elif op == il.Tacode.IFTRUE or op == il.Tacode.IFFALSE:
+                    moves = self._moves(targets[i], b)
+                    if moves:
+                        key = (targets[i], tuple(moves))
+                        label = shared.get(key)
+                        if label is None:
+                            label = shared[key] = table.new_label()
+                            stubs.append((label, targets[i], b, arg3))
+                        arg3 = label
+                    table.append(op, opers[i], args1[i], args2[i], arg3)
+                    if b + 1 < count:
+                        self._copy(b + 1, b)
+                else:
+                    table.append(op, opers[i], args1[i], args2[i], arg3)
+                if i == last and op not in Form.Leaving and op not in Form.Jumps and b + 1 < count:
+                    self._copy(b + 1, b)
+        for label, s, b, target in stubs:
+            table.place(label)
+            self._copy(s, b)
+            table.append(il.Tacode.GOTO, 0, il.Operand.NONE, il.Operand.NONE, target)
+        self.phis = [[] for b in range(count)]
+
+    def _moves(self, s, b):
+        j = self.get_preds(s).index(b)
+        return [(phi.dst, phi.args[j]) for phi in self.phis[s]
+                if phi.args[j] != phi.dst and phi.args[j] != il.Operand.NONE]
+
+    def _copy(self, s, b):
+        """Copy
+
+        Emits the copies of the phis of block s for the edge from block b,
+        in an order where no copy overwrites the source of a later one.
+
+        """
+        table = self.table
+        moves = self._moves(s, b)
+        while moves:
+            sources = set([src for dst, src in moves])
+            for k, (dst, src) in enumerate(moves):
+                if dst not in sources:
+                    table.append(il.Tacode.ASSIGN, 0, src, il.Operand.NONE, dst)
+                    del moves[k]
+                    break
+            else:
+                dst = moves[0][0]
+                temp = table.operand(self.frame.alloc_temp(table.get_type(dst)))
+                table.append(il.Tacode.ASSIGN, 0, dst, il.Operand.NONE, temp)
+                moves = [(d, temp if src == dst else src) for d, src in moves]
+
+class ConstantPropagation(object):
+    """ConstantPropagation class
+
+    Sparse conditional constant propagation over the static single
+    assignment form, after Wegman and Zadeck. Every temporary starts
+    unknown and only falls to a constant or to varying, and a block is only
+    evaluated once an edge into it is found executable, so a branch on a
+    known condition keeps the code behind its other edge out of the
+    values. The symbols, the loads, the loadrets and the temporaries not of
+    type int are varying; the arithmetic is folded on 32 bit ints as the
+    target does.
+
+    rewrite() then puts the constants in place of the temporaries holding
+    them, turns the conditional jumps taking one edge into a goto or drops
+    them, and drops the phis of constants and of blocks never executed.
+    The codes and blocks left without use are for dead code elimination.
+
+    """
+    TOP      = 0
+    CONSTANT = 1
+    BOTTOM   = 2
+
+    def __init__(self, form):
+        super(ConstantPropagation, self).__init__()
+        self.form = form
+        table = form.table
+        count = len(table.temps)
+        self.states = bytearray(count)
+        self.values = [0] * count
+        self.executable = bytearray(len(form.graph))
+        self._edges = set()
+        self._users = [[] for t in range(count)]
+        self._phi_users = [[] for t in range(count)]
+        defined = bytearray(count)
+        ops, args1, args2, args3 = table.ops, table.arg1, table.arg2, table.arg3
+        for i in range(len(table)):
+            op = ops[i]
+            for arg in (args1[i], args2[i]):
+                if arg >= 0 and arg & 3 == il.Operand.TEMP:
+                    self._users[arg >> 2].append(i)
+            arg = args3[i]
+            if arg >= 0 and arg & 3 == il.Operand.TEMP:
+                if op == il.Tacode.STORE or op == il.Tacode.STOREPTR:
+                    self._users[arg >> 2].append(i)
+                elif op in dataflow.Variables.Defining:
+                    defined[arg >> 2] = 1
+        for phis in form.phis:
+            for phi in phis:
+                defined[phi.dst >> 2] = 1
+                for arg in phi.args:
+                    if arg >= 0 and arg & 3 == il.Operand.TEMP:
+                        self._phi_users[arg >> 2].append(phi)
+        for t in range(count):
+            if not defined[t] or table.temps[t].get_type() is not ty.Type.Int:
+                self.states[t] = ConstantPropagation.BOTTOM
+
+    def solve(self):
+        form = self.form
+        graph = form.graph
+        if not len(graph):
+            return self
+        self._flow = [(-1, 0)]
+        self._changed = []
+        while self._flow or self._changed:
+            while self._flow:
+                p, b = self._flow.pop()
+                if (p, b) in self._edges:
+                    continue
+                self._edges.add((p, b))
+                for phi in form.phis[b]:
+                    self._visit_phi(phi)
+                if not self.executable[b]:
+                    self.executable[b] = 1
+                    for i in range(graph.starts[b], graph.starts[b + 1]):
+                        self._visit(i)
+            while self._changed:
+                t = self._changed.pop()
+                for phi in self._phi_users[t]:
+                    if self.executable[phi.block]:
+                        self._visit_phi(phi)
+                for i in self._users[t]:
+                    if self.executable[graph.block_of[i]]:
+                        self._visit(i)
+        return self
+
+    def get_value(self, arg):
+        """Get Value
+
+        Gets the state of an operand and its value when it is constant.
+
+        """
+        kind = arg & 3
+        if kind == il.Operand.CONST:
+            return ConstantPropagation.CONSTANT, self.form.table.consts[arg >> 2]
+        if kind == il.Operand.TEMP:
+            return self.states[arg >> 2], self.values[arg >> 2]
+        return ConstantPropagation.BOTTOM, 0
+
+    def _set(self, arg, state, value):
+        if arg < 0 or arg & 3 != il.Operand.TEMP:
+            return
+        t = arg >> 2
+        old = self.states[t]
+        if old == ConstantPropagation.BOTTOM or state == ConstantPropagation.TOP:
+            return
+        if old == ConstantPropagation.CONSTANT:
+            if state == ConstantPropagation.CONSTANT and value == self.values[t]:
+                return
+            state = ConstantPropagation.BOTTOM
+        self.states[t] = state
+        self.values[t] = value
+        self._changed.append(t)
+
+    def _fold(self, oper, arg1, arg2):
+        state1, value1 = self.get_value(arg1)
+        state2, value2 = self.get_value(arg2)
+        if state1 == ConstantPropagation.BOTTOM or state2 == ConstantPropagation.BOTTOM:
+            return ConstantPropagation.BOTTOM, 0
+        if state1 == ConstantPropagation.TOP or state2 == ConstantPropagation.TOP:
+            return ConstantPropagation.TOP, 0
+        fold = Folds.get(il.Tacode.Operators[oper])
+        value = fold(value1, value2) if fold is not None else None
+        if value is None:
+            return ConstantPropagation.BOTTOM, 0
+        return ConstantPropagation.CONSTANT, _wrap(value)
+
+    def _visit_phi(self, phi):
+        state, value = ConstantPropagation.TOP, 0
+        for p, arg in zip(self.form.get_preds(phi.block), phi.args):
+            if (p, phi.block) not in self._edges:
+                continue
+            arg_state, arg_value = self.get_value(arg)
+            if arg_state == ConstantPropagation.TOP:
+                continue
+            if state == ConstantPropagation.TOP:
+                state, value = arg_state, arg_value
+            elif arg_state == ConstantPropagation.BOTTOM or arg_value != value:
+                state = ConstantPropagation.BOTTOM
+                break
+        self._set(phi.dst, state, value)
+
+    def _visit(self, i):
+        table, graph = self.form.table, self.form.graph
+        op, arg1, arg3 = table.ops[i], table.arg1[i], table.arg3[i]
+        if op == il.Tacode.ASSIGN:
+            state, value = self.get_value(arg1)
+            self._set(arg3, state, value)
+        elif op == il.Tacode.BINARY:
+            self._set(arg3, *self._fold(table.opers[i], arg1, table.arg2[i]))
+        elif op == il.Tacode.UNARY:
+            state, value = self.get_value(arg1)
+            if table.opers[i] == ConstantPropagation.NEGATE:
+                self._set(arg3, state, _wrap(-value))
+            else:
+                self._set(arg3, ConstantPropagation.BOTTOM, 0)
+        elif op == il.Tacode.LOAD or op == il.Tacode.LDRET:
+            self._set(arg3, ConstantPropagation.BOTTOM, 0)
+        b = graph.block_of[i]
+        if i != graph.starts[b + 1] - 1:
+            return
+        if op == il.Tacode.GOTO:
+            self._flow.append((b, graph.get_block(arg3)))
+        elif op == il.Tacode.IFTRUE or op == il.Tacode.IFFALSE:
+            state, value = self._fold(table.opers[i], arg1, table.arg2[i])
+            if state == ConstantPropagation.TOP:
+                return
+            if state == ConstantPropagation.BOTTOM or (value != 0) == (op == il.Tacode.IFTRUE):
+                self._flow.append((b, graph.get_block(arg3)))
+            if state == ConstantPropagation.BOTTOM or (value != 0) != (op == il.Tacode.IFTRUE):
+                if b + 1 < len(graph):
+                    self._flow.append((b, b + 1))
+        elif op not in Form.Leaving and b + 1 < len(graph):
+            self._flow.append((b, b + 1))
+
+    def rewrite(self):
+        """Rewrite
+
+        Rewrites the code with the constants found.
+
+        Returns:
+            The number of operands replaced by constants and of conditional
+            jumps resolved.
+        """
+        form = self.form
+        table, graph = form.table, form.graph
+        ops, args1, args2, args3 = table.ops, table.arg1, table.arg2, table.arg3
+        changes = 0
+        for b in range(len(graph)):
+            if not self.executable[b]:
+                form.phis[b] = []
+                continue
+            last = graph.starts[b + 1] - 1
+            for i in range(graph.starts[b], last + 1):
+                for args in (args1, args2):
+                    constant = self._constant(args[i])
+                    if constant is not None:
+                        args[i] = constant
+                        changes = changes + 1
+                if ops[i] == il.Tacode.STORE or ops[i] == il.Tacode.STOREPTR:
+                    constant = self._constant(args3[i])
+                    if constant is not None:
+                        args3[i] = constant
+                        changes = changes + 1
+            op = ops[last]
+            if op == il.Tacode.IFTRUE or op == il.Tacode.IFFALSE:
+                target = graph.get_block(args3[last])
+                taken = (b, target) in self._edges
+                falls = (b, b + 1) in self._edges
+                if target == b + 1:
+                    pass
+                elif taken and not falls:
+                    ops[last], table.opers[last] = il.Tacode.GOTO, 0
+                    args1[last] = args2[last] = il.Operand.NONE
+                    changes = changes + 1
+                elif falls and not taken:
+                    table.remove(last)
+                    changes = changes + 1
+            phis = []
+            for phi in form.phis[b]:
+                if self.states[phi.dst >> 2] == ConstantPropagation.CONSTANT:
+                    continue
+                for j, arg in enumerate(phi.args):
+                    constant = self._constant(arg)
+                    if constant is not None:
+                        phi.args[j] = constant
+                phis.append(phi)
+            form.phis[b] = phis
+        table.touch()
+        return changes
+
+    def _constant(self, arg):
+        if arg < 0 or arg & 3 != il.Operand.TEMP:
+            return None
+        t = arg >> 2
+        if self.states[t] != ConstantPropagation.CONSTANT:
+            return None
+        return self.form.table.constant(self.values[t])
+
+def _wrap(value):
+    return ((value + 0x80000000) & 0xffffffff) - 0x80000000
+
+def _divide(x, y):
+    if y == 0:
+        return None
+    q = abs(x) // abs(y)
+    return q if (x < 0) == (y < 0) else -q
+
+def _remainder(x, y):
+    if y == 0:
+        return None
+    return x - y * _divide(x, y)
+
+Form.Jumps = (il.Tacode.GOTO, il.Tacode.IFTRUE, il.Tacode.IFFALSE)
+Form.Leaving = (il.Tacode.RETURN, il.Tacode.TAILCALL)
+ConstantPropagation.NEGATE = il.Tacode.OperatorIds['-']
+Folds = {
+    '+':  lambda x, y: x + y,
+    '-':  lambda x, y: x - y,
+    '*':  lambda x, y: x * y,
+    '/':  _divide,
+    '%':  _remainder,
+    '<<': lambda x, y: x << y if 0 <= y < 32 else None,
+    '>>': lambda x, y: x >> y if 0 <= y < 32 else None,
+    '&':  lambda x, y: x & y,
+    '|':  lambda x, y: x | y,
+    '^':  lambda x, y: x ^ y,
+    '<':  lambda x, y: int(x < y),
+    '>':  lambda x, y: int(x > y),
+    '<=': lambda x, y: int(x <= y),
+    '>=': lambda x, y: int(x >= y),
+    '==': lambda x, y: int(x == y),
+    '!=': lambda x, y: int(x != y),
+}
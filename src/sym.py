@@ -19,36 +19,37 @@ class IdentifierTable(object):
     def add(self, id_obj):
         """Add identifier to Scope
 
-        Adds a new identfier to the current scope.
+        Adds a new identfier to the current scope, keyed on its interned word.
 
         """
-        if self._table.get(str(id_obj)) is not None:
+        word = id_obj.get_word()
+        if self._table.get(word) is not None:
             raise errors.ParserNameError('name already declared at this scope')
-        self._table[str(id_obj)] = id_obj
+        self._table[word] = id_obj
 
-    def find(self, name):
+    def find(self, word):
         """Find Identifier in Scope
 
-        Searches for the given identifier in the chained scope.
+        Searches for the identifier of the given word in the chained scope.
 
         Raises:
             ParserNameError if the given identifier is not found in any valid scope.
 
         """
-        id_obj = self.lookup(name)
+        id_obj = self.lookup(word)
         if id_obj is None:
             raise errors.ParserNameError()
         return id_obj
 
-    def lookup(self, name):
+    def lookup(self, word):
         """Look up Identifier in Scope
 
-        Searches for the given identifier in the chained scope.
+        Searches for the identifier of the given word in the chained scope.
 
         """
         tab = self
         while tab is not None:
-            id_obj = tab._table.get(name)
+            id_obj = tab._table.get(word)
             if id_obj is not None:
                 return id_obj
             tab = tab._prev
@@ -11,14 +11,16 @@ class Type(lexer.Word):
     @classmethod
     def numeric(cls, ty):
         if (ty is Type.Int) or (ty is Type.UnsignedInt) or (type(ty) is Pointer) \
-            or (ty is Type.Null) or (type(ty) is Function):
+            or (ty is Type.Null) or (type(ty) is Function) or (ty is Type.Error):
             return True
         return False
 
 
     @classmethod
     def max(cls, ty1, ty2):
-        if (not cls.numeric(ty1)) or (not cls.numeric(ty2)):
+        if ty1 is Type.Error or ty2 is Type.Error:
+            return Type.Error
+        elif (not cls.numeric(ty1)) or (not cls.numeric(ty2)):
             return None
         elif ty1 is Type.UnsignedInt or ty2 is Type.UnsignedInt:
             return Type.UnsignedInt
@@ -131,10 +133,15 @@ class Function(Type):
     def get_statement(self):
         return self._stmt
 
+    def __getstate__(self):
+        # the body is left out, the frame of the function holds its code
+        state = self.__dict__.copy()
+        state['_stmt'] = None
+        return state
+
 Type.Int            =   Type("int",             lexer.Tag.INT,      4, 4)
 Type.UnsignedInt    =   Type("unsigned int",    lexer.Tag.INT,      4, 4)
 Type.Void           =   Type("",                lexer.Tag.VOID,     0, 0)
 Type.VoidPointer    =   Type("T*",              lexer.Tag.POINTER,  4, 4)
 Type.Null           =   Type("null",            lexer.Tag.NULL,     0, 0)
-
-
+Type.Error          =   Type("error",           lexer.Tag.ERROR,    4, 4)